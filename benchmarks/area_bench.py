@@ -0,0 +1,68 @@
+"""Compare a per-room pyproj geodesic area loop against the batched Room.compute_areas.
+
+The loop is how areas were computed before the batched pass: one
+Geod.polygon_area_perimeter call per room. pyproj is a development
+requirement only, so it is imported here rather than by the package.
+
+Run from the repository root with: python -m benchmarks.area_bench [num_rooms]
+"""
+
+import random
+import sys
+import time
+
+from pyproj import Geod
+
+from db.geometry import borders_array
+from db.models import Room
+
+
+def generate_rooms(num: int, seed: int = 0) -> list[Room]:
+	"""Generate unsaved rooms with small random polygons around Copenhagen."""
+	rng = random.Random(seed)
+	rooms = []
+	for i in range(num):
+		lon, lat = 12.5 + rng.random() * 0.01, 55.6 + rng.random() * 0.01
+		borders = [
+			[lon + rng.uniform(-2e-4, 2e-4), lat + rng.uniform(-1e-4, 1e-4)]
+			for _ in range(rng.randint(4, 12))
+		]
+		rooms.append(
+			Room(
+				name=f'Room {i}',
+				type='OFFICE',
+				crowd_factor=0.5,
+				popularity_factor=0.5,
+				area=0.0,
+				longitude=lon,
+				latitude=lat,
+				floor=1,
+				borders=borders,
+			)
+		)
+	return rooms
+
+
+def main(num: int = 10_000):
+	rooms = generate_rooms(num)
+	geod = Geod(ellps='WGS84')
+
+	start = time.perf_counter()
+	for room in rooms:
+		points = borders_array(room.borders)
+		area, _ = geod.polygon_area_perimeter(points[:, 0], points[:, 1])
+		round(abs(area), 2)
+	loop_time = time.perf_counter() - start
+
+	start = time.perf_counter()
+	Room.compute_areas(rooms)
+	batch_time = time.perf_counter() - start
+
+	print(f'rooms: {num}')
+	print(f'pyproj Geod loop:   {num / loop_time:12.0f} rooms/sec')
+	print(f'Room.compute_areas: {num / batch_time:12.0f} rooms/sec')
+	print(f'speedup: {loop_time / batch_time:.1f}x')
+
+
+if __name__ == '__main__':
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
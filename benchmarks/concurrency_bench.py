@@ -0,0 +1,110 @@
+"""Stress concurrent updates of one room from several processes against MongoDB.
+
+Each process adds 1 to the room's occupants, or its area for read-modify-write
+modes, many times. Afterwards the stored total shows whether updates were lost:
+  naive     load, modify and save(); concurrent saves overwrite each other
+  atomic    Room.add_occupants, a single server-side $inc
+  guarded   Room.update_with_retry, a version-checked save retried on conflict
+
+mongomock lives inside one process and does not apply writes atomically, so this
+needs a server. Run from the repository root with:
+	python -m benchmarks.concurrency_bench mongodb://localhost/bench --processes 8 --updates 500
+Running it drops the room collection of that database.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+from mongoengine import connect, disconnect
+
+from db.models import Room
+
+MODES = ('naive', 'atomic', 'guarded')
+
+
+def increment_area(room: Room):
+	room.area += 1
+
+
+def worker(uri: str, room_id, mode: str, updates: int, start):
+	# A client inherited from the parent process must not be reused after fork
+	disconnect()
+	connect(host=uri, uuidRepresentation='standard')
+	start.wait()
+	room = Room.objects.get(pk=room_id)
+	for _ in range(updates):
+		if mode == 'atomic':
+			room.add_occupants(1)
+		elif mode == 'guarded':
+			Room.update_with_retry(room_id, increment_area, retries=1000)
+		else:
+			room = Room.objects.get(pk=room_id)
+			increment_area(room)
+			room.save()
+	disconnect()
+
+
+def run(uri: str, mode: str, processes: int, updates: int) -> dict:
+	Room.objects.delete()
+	room = Room(
+		name='Stress',
+		type='LOBBY',
+		crowd_factor=1.0,
+		popularity_factor=1.0,
+		area=0.0,
+		longitude=12.5,
+		latitude=55.6,
+		floor=1,
+		borders=[[12.5, 55.6], [12.5001, 55.6], [12.5001, 55.6001]],
+	).save()
+	start = multiprocessing.Event()
+	workers = [
+		multiprocessing.Process(target=worker, args=(uri, room.pk, mode, updates, start))
+		for _ in range(processes)
+	]
+	for process in workers:
+		process.start()
+	began = time.perf_counter()
+	start.set()
+	for process in workers:
+		process.join()
+	seconds = time.perf_counter() - began
+	room.reload()
+	total = processes * updates
+	applied = room.occupants if mode == 'atomic' else room.area
+	return {
+		'mode': mode,
+		'updates': total,
+		'lost': total - applied,
+		'seconds': seconds,
+		'updates_per_sec': total / seconds,
+	}
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('uri', help='MongoDB URI of a scratch database')
+	parser.add_argument('--processes', type=int, default=8)
+	parser.add_argument('--updates', type=int, default=500, help='Updates per process')
+	parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+	args = parser.parse_args(argv)
+
+	disconnect()
+	connect(host=args.uri, uuidRepresentation='standard')
+	failed = False
+	for mode in args.modes:
+		result = run(args.uri, mode, args.processes, args.updates)
+		print(
+			f'{mode:8} {result["updates"]:>8} updates {result["lost"]:>8.0f} lost '
+			f'{result["updates_per_sec"]:10.0f} updates/sec'
+		)
+		failed |= mode != 'naive' and result['lost'] != 0
+	Room.objects.delete()
+	disconnect()
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""Time a streaming GeoJSON floor plan import and measure its peak memory.
+
+Writes a FeatureCollection of grid rooms to a temporary file, then times
+reading and mapping the features alone, with the peak Python memory traced
+next to the file size, and the full import into mongomock, whose upserts scan
+the whole collection and dominate the write time.
+
+Run from the repository root with: python -m benchmarks.import_bench [rooms] [batch_size]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import mongomock
+from mongoengine import connect, disconnect
+
+from benchmarks.suite import generate_building
+from db.importer import feature_room, import_geojson, read_geojson
+from db.models import Room
+from db.testing import patch_mongomock
+
+
+def write_plan(path: str, num_rooms: int):
+	"""Write generated rooms as GeoJSON features, one at a time."""
+	rooms, _ = generate_building(num_rooms)
+	with open(path, 'w') as file:
+		file.write('{"type": "FeatureCollection", "features": [\n')
+		for i, room in enumerate(rooms):
+			feature = {
+				'type': 'Feature',
+				'properties': {
+					'name': room.name,
+					'type': room.type,
+					'floor': room.floor,
+					'crowd_factor': room.crowd_factor,
+					'popularity_factor': room.popularity_factor,
+				},
+				'geometry': {'type': 'Polygon', 'coordinates': [room.borders + room.borders[:1]]},
+			}
+			file.write((',\n' if i else '') + json.dumps(feature))
+		file.write('\n]}\n')
+
+
+def parse(path: str) -> int:
+	count = 0
+	with open(path) as file:
+		for feature in read_geojson(file):
+			feature_room(feature)
+			count += 1
+	return count
+
+
+def main(num_rooms: int = 2000, batch_size: int = 500):
+	patch_mongomock()
+	disconnect()
+	connect(
+		db='import_bench',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, 'plan.geojson')
+		write_plan(path, num_rooms)
+		size = os.path.getsize(path)
+		start = time.perf_counter()
+		parse(path)
+		seconds = time.perf_counter() - start
+		tracemalloc.start()
+		parse(path)
+		_, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		report = import_geojson(path, batch_size=batch_size)
+	print(f'rooms: {num_rooms}, batch size: {batch_size}, file: {size / 1e6:.2f} MB')
+	print(f'read and map: {num_rooms / seconds:.0f} rows/sec, peak memory {peak / 1e6:.2f} MB')
+	print(
+		f'import: {report.rows_per_sec:.0f} rows/sec, inserted {report.inserted}, '
+		f'rejected {len(report.rejected)}'
+	)
+	Room.objects.delete()
+	disconnect()
+
+
+if __name__ == '__main__':
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+		int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+	)
@@ -0,0 +1,59 @@
+"""Time BuildingGraph.load and Router queries on a synthetic building.
+
+Short routes join rooms a random walk of a few sensors apart; cross-building
+routes go from a room on the lowest floor to one on the highest floor (see
+benchmarks.suite.route_pairs). Uses an in-memory mongomock database.
+
+Run from the repository root with: python -m benchmarks.routing_bench [num_rooms] [queries]
+"""
+
+import sys
+import time
+
+import mongomock
+from mongoengine import connect, disconnect
+
+from benchmarks.suite import generate_building, insert_building, route_pairs
+from db.graph import BuildingGraph
+from db.routing import Router
+
+
+def routes_per_sec(router: Router, pairs: list) -> float:
+	start = time.perf_counter()
+	results = router.routes(pairs)
+	seconds = time.perf_counter() - start
+	assert all(route is not None for route in results)
+	return len(pairs) / seconds
+
+
+def main(num_rooms: int = 10_000, queries: int = 100):
+	disconnect()
+	connect(
+		db='routing_bench',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	insert_building(*generate_building(num_rooms, connect_rows=True))
+
+	start = time.perf_counter()
+	graph = BuildingGraph.load()
+	load_time = time.perf_counter() - start
+	start = time.perf_counter()
+	router = Router(graph)
+	router_time = time.perf_counter() - start
+	short, cross = route_pairs(graph, queries)
+
+	print(f'rooms: {graph.n_rooms}, sensors: {graph.n_sensors}')
+	print(f'BuildingGraph.load: {load_time:10.3f} s')
+	print(f'Router (landmarks): {router_time:10.3f} s')
+	print(f'short routes:       {routes_per_sec(router, short):10.0f} routes/sec')
+	print(f'cross-building:     {routes_per_sec(router, cross):10.0f} routes/sec')
+	disconnect()
+
+
+if __name__ == '__main__':
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+		int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+	)
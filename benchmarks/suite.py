@@ -0,0 +1,312 @@
+"""Benchmark suite for model validation, saves, queries, sensor resolution, areas and routing.
+
+Generates synthetic buildings at several scales, times each operation and writes
+the results as JSON so runs on different commits can be compared.
+
+Run from the repository root with:
+	python -m benchmarks.suite                              # mongomock, 100 / 10k / 100k rooms
+	python -m benchmarks.suite --uri mongodb://localhost/bench --scales 100 10000
+	python -m benchmarks.suite --compare old.json new.json
+
+mongomock scans its whole collection for every upsert, so against mongomock the
+write benchmarks are capped at --sample records; against mongod they use every room.
+Running against --uri drops the room and sensor collections of that database.
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import UTC, datetime
+
+import mongomock
+import numpy as np
+from mongoengine import connect, disconnect
+
+from db.graph import BuildingGraph
+from db.models import Room, Sensor
+from db.models.room import ROOM_TYPES
+from db.routing import Router
+from db.testing import patch_mongomock
+
+DEFAULT_SCALES = (100, 10_000, 100_000)
+# Sensors between the two rooms of a short route, at most
+SHORT_ROUTE_STEPS = 10
+
+
+def generate_building(
+	num_rooms: int, seed: int = 0, connect_rows: bool = False
+) -> tuple[list[Room], list[Sensor]]:
+	"""Unsaved rooms on a grid over three floors, with sensors between neighbours.
+
+	Each floor holds a square grid of rooms; sensors join horizontally adjacent
+	rooms and stack vertical sensors between the same cell on consecutive floors.
+	With connect_rows, sensors also join adjacent rows, so every room is reachable.
+	"""
+	rng = random.Random(seed)
+	per_floor = math.ceil(num_rooms / 3)
+	side = math.ceil(math.sqrt(per_floor))
+	step = 2e-4
+	rooms = []
+	grid = {}
+	for i in range(num_rooms):
+		floor, cell = divmod(i, per_floor)
+		row, column = divmod(cell, side)
+		lon, lat = 12.5 + column * step, 55.6 + row * step
+		borders = [
+			[lon + rng.uniform(-0.4, 0.4) * step, lat + rng.uniform(-0.4, 0.4) * step]
+			for _ in range(rng.randint(4, 8))
+		]
+		room = Room(
+			name=f'Room {i}',
+			type=rng.choice(ROOM_TYPES),
+			crowd_factor=round(rng.uniform(0.1, 2.0), 2),
+			popularity_factor=round(rng.uniform(0.1, 2.0), 2),
+			occupants=float(rng.randint(0, 50)),
+			longitude=lon,
+			latitude=lat,
+			floor=floor + 1,
+			borders=borders,
+		)
+		rooms.append(room)
+		grid[floor, row, column] = room
+
+	sensors = []
+	for (floor, row, column), room in grid.items():
+		for neighbour, is_vertical in (
+			(grid.get((floor, row, column + 1)), False),
+			(grid.get((floor, row + 1, column)) if connect_rows else None, False),
+			(grid.get((floor + 1, row, column)), True),
+		):
+			if neighbour is not None:
+				sensors.append(
+					Sensor(
+						name=f'Sensor {len(sensors)}',
+						rooms=[room, neighbour],
+						latitude=room.latitude,
+						longitude=room.longitude,
+						is_vertical=is_vertical,
+					)
+				)
+	return rooms, sensors
+
+
+def route_pairs(graph: BuildingGraph, count: int, seed: int = 0) -> tuple[list, list]:
+	"""Short and cross-building lists of count (source_id, target_id) pairs each.
+
+	Short routes join rooms a random walk of a few sensors apart; cross-building
+	routes go from a room on the lowest floor to one on the highest floor.
+	"""
+	rng = random.Random(seed)
+	floors = graph.rooms['floor']
+	bottom = np.flatnonzero(floors == floors.min()).tolist()
+	top = np.flatnonzero(floors == floors.max()).tolist()
+	room_ids = graph.room_ids
+
+	short = []
+	while len(short) < count:
+		source = room_ids[rng.randrange(graph.n_rooms)]
+		target = source
+		for _ in range(SHORT_ROUTE_STEPS):
+			neighbors = graph.neighbors(target)
+			if not neighbors:
+				break
+			target = rng.choice(neighbors)
+		short.append((source, target))
+	cross = [(room_ids[rng.choice(bottom)], room_ids[rng.choice(top)]) for _ in range(count)]
+	return short, cross
+
+
+def timed(results: list, scale: int, name: str, ops: int, function, repeat: int = 1):
+	"""Run function repeat times, record the best time for ops operations and return its result."""
+	best = math.inf
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		best = min(best, time.perf_counter() - start)
+	results.append(
+		{
+			'scale': scale,
+			'name': name,
+			'ops': ops,
+			'seconds': best,
+			'ops_per_sec': ops / best if best > 0 else math.inf,
+		}
+	)
+	print(f'{scale:>8} {name:28} {ops:>8} ops {best:10.4f} s {ops / best:14.0f} ops/sec')
+	return result
+
+
+def clear_collections():
+	Room.objects.delete()
+	Sensor.objects.delete()
+
+
+def insert_building(rooms: list[Room], sensors: list[Sensor]):
+	"""Store a generated building quickly with insert_many, bypassing validation."""
+	for room in rooms:
+		room.update_geometry()
+	Room._get_collection().insert_many([room.to_mongo() for room in rooms])
+	if sensors:
+		Sensor._get_collection().insert_many([sensor.to_mongo() for sensor in sensors])
+
+
+def run_scale(scale: int, sample: int, write_limit: int | None, repeat: int) -> list:
+	results = []
+	rooms, sensors = generate_building(scale)
+	writes = scale if write_limit is None else min(scale, write_limit)
+	sample = min(scale, sample)
+
+	def fresh_rooms(count: int) -> list[Room]:
+		return generate_building(count, seed=scale)[0]
+
+	# Validation and area computation on unsaved rooms
+	batch = fresh_rooms(scale)
+	timed(results, scale, 'validate', scale, lambda: [room.validate() for room in batch])
+	batch = fresh_rooms(scale)
+	timed(results, scale, 'validate_batch', scale, lambda: Room._validate_batch(batch))
+	timed(
+		results,
+		scale,
+		'compute_area',
+		scale,
+		lambda: [room.compute_area() for room in rooms],
+		repeat,
+	)
+	timed(results, scale, 'compute_areas', scale, lambda: Room.compute_areas(rooms), repeat)
+
+	# Writes, on an empty collection
+	clear_collections()
+	batch = fresh_rooms(sample)
+	timed(results, scale, 'save', sample, lambda: [room.save() for room in batch])
+	clear_collections()
+	batch = fresh_rooms(writes)
+	timed(results, scale, 'bulk_upsert', writes, lambda: Room.bulk_upsert(batch))
+
+	# Reads, on the full building
+	clear_collections()
+	insert_building(rooms, sensors)
+	queries = [(floor, room_type) for floor in (1, 2, 3) for room_type in ROOM_TYPES[:3]]
+	timed(
+		results,
+		scale,
+		'query_floor',
+		3,
+		lambda: [list(Room.objects(floor=floor)) for floor in (1, 2, 3)],
+		repeat,
+	)
+	timed(
+		results,
+		scale,
+		'query_floor_type',
+		len(queries),
+		lambda: [list(Room.objects(floor=floor, type=room_type)) for floor, room_type in queries],
+		repeat,
+	)
+
+	sensor_sample = min(sample, len(sensors))
+
+	def dereference_each():
+		for sensor in Sensor.objects.limit(sensor_sample):
+			list(sensor.rooms)
+
+	timed(results, scale, 'sensor_rooms_dereference', sensor_sample, dereference_each, repeat)
+	timed(
+		results,
+		scale,
+		'sensor_rooms_prefetch',
+		sensor_sample,
+		lambda: Sensor.prefetch_rooms(Sensor.objects.limit(sensor_sample)),
+		repeat,
+	)
+
+	# Routing, on a building where every room is reachable
+	clear_collections()
+	insert_building(*generate_building(scale, connect_rows=True))
+	graph = timed(results, scale, 'graph_load', 1, BuildingGraph.load)
+	router = Router(graph)
+	short, cross = route_pairs(graph, sample)
+	timed(results, scale, 'route_short', len(short), lambda: router.routes(short), repeat)
+	timed(results, scale, 'route_cross', len(cross), lambda: router.routes(cross), repeat)
+	clear_collections()
+	return results
+
+
+def environment(backend: str) -> dict:
+	try:
+		commit = subprocess.run(
+			['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		commit = None
+	return {
+		'commit': commit,
+		'backend': backend,
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'timestamp': datetime.now(UTC).isoformat(),
+	}
+
+
+def compare(old_path: str, new_path: str):
+	"""Print the speed ratio of every benchmark present in both result files."""
+	with open(old_path) as old_file, open(new_path) as new_file:
+		old, new = json.load(old_file), json.load(new_file)
+	old_results = {(item['scale'], item['name']): item for item in old['results']}
+	print(f'{old["environment"]["commit"]} -> {new["environment"]["commit"]}')
+	for item in new['results']:
+		before = old_results.get((item['scale'], item['name']))
+		if before is None:
+			continue
+		ratio = item['ops_per_sec'] / before['ops_per_sec']
+		print(f'{item["scale"]:>8} {item["name"]:28} {ratio:8.2f}x')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+	parser.add_argument('--uri', help='MongoDB URI to benchmark instead of mongomock')
+	parser.add_argument(
+		'--sample',
+		type=int,
+		help='Records for per-operation benchmarks (default: 1000 on mongod, 100 on mongomock)',
+	)
+	parser.add_argument('--repeat', type=int, default=3, help='Runs of each read benchmark')
+	parser.add_argument('--output', default='benchmark-results.json')
+	parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+	args = parser.parse_args(argv)
+
+	if args.compare:
+		compare(*args.compare)
+		return
+
+	disconnect()
+	if args.uri:
+		connect(host=args.uri, uuidRepresentation='standard')
+		backend, write_limit = 'mongod', None
+		sample = args.sample or 1000
+	else:
+		patch_mongomock()
+		connect(
+			db='benchmark',
+			host='mongodb://localhost',
+			mongo_client_class=mongomock.MongoClient,
+			uuidRepresentation='standard',
+		)
+		sample = args.sample or 100
+		backend, write_limit = 'mongomock', sample
+
+	results = []
+	for scale in args.scales:
+		results.extend(run_scale(scale, sample, write_limit, args.repeat))
+	with open(args.output, 'w') as file:
+		json.dump({'environment': environment(backend), 'results': results}, file, indent=2)
+	print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
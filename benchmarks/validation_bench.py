@@ -0,0 +1,98 @@
+"""Time Room validation for rooms with large borders.
+
+Covers a new room, a loaded room after an occupancy-only change and a loaded
+room after a borders change, with borders stored as nested lists and packed.
+
+Run from the repository root with: python -m benchmarks.validation_bench [vertices] [runs]
+"""
+
+import math
+import sys
+import time
+
+import bson
+import mongomock
+import numpy as np
+from mongoengine import connect, disconnect
+
+from db.models import Room
+
+
+def make_room(vertices: int, packed: bool = False) -> Room:
+	"""An unsaved room whose borders are a circle with the given number of vertices."""
+	borders = [
+		[
+			12.5 + 1e-3 * math.cos(2 * math.pi * i / vertices),
+			55.6 + 1e-3 * math.sin(2 * math.pi * i / vertices),
+		]
+		for i in range(vertices)
+	]
+	return Room(
+		name='Hall',
+		type='EXHIBITION',
+		crowd_factor=0.5,
+		popularity_factor=0.5,
+		longitude=12.5,
+		latitude=55.6,
+		floor=1,
+		borders=np.array(borders) if packed else borders,
+	)
+
+
+def best_of(runs: int, prepare, action) -> float:
+	"""Fastest of several runs of action(prepare()), timing only the action."""
+	best = math.inf
+	for _ in range(runs):
+		subject = prepare()
+		start = time.perf_counter()
+		action(subject)
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main(vertices: int = 10_000, runs: int = 5):
+	disconnect()
+	connect(
+		db='validation_bench',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	print(f'vertices: {vertices}')
+	for packed in (False, True):
+		saved = make_room(vertices, packed).save()
+		document = Room._get_collection().find_one({'_id': saved.pk})
+
+		def loaded(document: dict = document) -> Room:
+			return Room._from_son(document)
+
+		def change_occupants(room: Room) -> Room:
+			room.occupants = 12.0
+			return room
+
+		def move_borders(room: Room, packed: bool = packed) -> Room:
+			if packed:
+				room.borders = room.borders + [1e-6, 0.0]
+			else:
+				room.borders[0] = [room.borders[0][0] + 1e-6, room.borders[0][1]]
+			return room
+
+		cases = {
+			'new room': (lambda packed=packed: make_room(vertices, packed), Room.validate),
+			'decode': (lambda document=document: document, Room._from_son),
+			'loaded, occupants changed': (lambda: change_occupants(loaded()), Room.validate),
+			'loaded, borders changed': (lambda: move_borders(loaded()), Room.validate),
+			'loaded, occupants saved': (lambda: change_occupants(loaded()), Room.save),
+		}
+		size = len(bson.encode(document))
+		print(f'{"packed" if packed else "nested lists"}, document size {size} bytes')
+		for name, (prepare, action) in cases.items():
+			print(f'  {name:28} {best_of(runs, prepare, action) * 1000:10.3f} ms')
+	disconnect()
+
+
+if __name__ == '__main__':
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+		int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+	)
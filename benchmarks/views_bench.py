@@ -0,0 +1,82 @@
+"""Compare Room.objects() against RoomView.find() for read-only listings.
+
+Reports rows/sec and retained memory per room. Uses an in-memory mongomock
+database unless a connection string is given. The rooms are written to a
+separate views_bench_rooms collection and only the rooms the benchmark inserted
+are deleted afterwards, so the room collection of that database is not touched.
+
+Run from the repository root with: python -m benchmarks.views_bench [num_rooms] [mongo_url]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+import mongomock
+from mongoengine import connect, disconnect
+from mongoengine.context_managers import switch_collection
+
+from benchmarks.area_bench import generate_rooms
+from db.models import Room
+from db.views import RoomView
+
+# Kept apart from the room collection, in case the benchmark runs against a real database
+COLLECTION = 'views_bench_rooms'
+
+
+def measure(load) -> tuple[float, float]:
+	"""Seconds to run load() and bytes it retains, measured in separate runs."""
+	gc.collect()
+	start = time.perf_counter()
+	load()
+	elapsed = time.perf_counter() - start
+
+	gc.collect()
+	tracemalloc.start()
+	rows = load()
+	retained, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	del rows
+	return elapsed, retained
+
+
+def main(num: int = 10_000, uri: str | None = None):
+	disconnect()
+	if uri:
+		connect(host=uri, uuidRepresentation='standard')
+	else:
+		connect(
+			db='views_bench',
+			host='mongodb://localhost',
+			mongo_client_class=mongomock.MongoClient,
+			uuidRepresentation='standard',
+		)
+	rooms = generate_rooms(num)
+	for room in rooms:
+		room.validate()
+	with switch_collection(Room, COLLECTION):
+		collection = Room._get_collection()
+		ids = collection.insert_many([room.to_mongo() for room in rooms]).inserted_ids
+		del rooms
+		try:
+			results = {
+				'Room.objects()': measure(lambda: list(Room.objects())),
+				'Room.objects().only()': measure(
+					lambda: list(Room.objects().only('name', 'floor', 'occupants', 'area'))
+				),
+				'RoomView.find()': measure(RoomView.find),
+			}
+		finally:
+			collection.delete_many({'_id': {'$in': ids}})
+
+	print(f'rooms: {num}')
+	for name, (elapsed, retained) in results.items():
+		print(f'{name:24} {num / elapsed:12.0f} rows/sec {retained / num:10.0f} bytes/room')
+
+
+if __name__ == '__main__':
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+		sys.argv[2] if len(sys.argv) > 2 else None,
+	)
@@ -1,2 +1,22 @@
-from .database import Database as Database
-from .models import Room as Room, Sensor as Sensor
+import importlib
+
+# Top-level exports, imported on first access so `import db` stays cheap
+_EXPORTS = {
+	'Database': '.database',
+	'Room': '.models',
+	'Sensor': '.models',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+	if name not in _EXPORTS:
+		raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+	value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+	globals()[name] = value
+	return value
+
+
+def __dir__():
+	return sorted(set(globals()) | set(__all__))
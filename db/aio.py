@@ -0,0 +1,153 @@
+from itertools import islice
+
+from mongoengine import DEFAULT_CONNECTION_NAME
+from mongoengine.queryset import transform
+from pymongo.errors import BulkWriteError
+
+from .database import Database
+from .ingestion import occupancy_update
+from .models import BulkResult, Room, Sensor
+
+
+class AsyncModel:
+	"""asyncio access to a model's collection through Database.connect_async.
+
+	Documents are built from the same mongoengine fields and validated with the
+	same rules as the synchronous models; filters and updates use mongoengine
+	keyword syntax (e.g. floor=2, type__in=[...], inc__occupants=1).
+
+	Example:
+		rooms = AsyncModel(Room)
+		room = await rooms.get(room_id)
+		busy = await rooms.find(floor=2, occupants__gte=10)
+	"""
+
+	def __init__(self, model, alias: str = DEFAULT_CONNECTION_NAME):
+		self.model = model
+		self.alias = alias
+
+	@property
+	def collection(self):
+		return Database.async_database(self.alias)[self.model._get_collection_name()]
+
+	async def get(self, pk):
+		"""The document with the given primary key, or None."""
+		son = await self.collection.find_one({'_id': pk})
+		return None if son is None else self.model._from_son(son, created=False)
+
+	async def find(self, limit: int = 0, **filters) -> list:
+		"""Documents matching mongoengine-style filters."""
+		cursor = self.collection.find(transform.query(self.model, **filters), limit=limit)
+		return [self.model._from_son(son, created=False) for son in await cursor.to_list(None)]
+
+	async def count(self, **filters) -> int:
+		return await self.collection.count_documents(transform.query(self.model, **filters))
+
+	async def save(self, document):
+		"""Validate and upsert a document, like Document.save().
+
+		New documents are upserted whole, like in bulk_upsert; loaded ones only
+		$set/$unset the fields changed since they were loaded, so concurrent writes
+		to other fields survive.
+		"""
+		await self._resolve_references([document])
+		document.validate()
+		if document._created:
+			await self.collection.bulk_write([self.model._upsert_operation(document)])
+			document._mark_saved()
+		elif update := document._get_update_doc():
+			await self.collection.update_one({'_id': document.pk}, update, upsert=True)
+			document._mark_saved(update)
+		else:
+			document._clear_changed_fields()
+		self.model._after_write([document.pk])
+		return document
+
+	async def delete(self, document) -> int:
+		result = await self.collection.delete_one({'_id': document.pk})
+		self.model._after_write([document.pk])
+		return result.deleted_count
+
+	async def update(self, filters: dict, **update) -> int:
+		"""Apply a mongoengine-style update to all matching documents.
+
+		Returns:
+			count (int): Number of modified documents.
+		"""
+		self.model._before_update(update)
+		result = await self.collection.update_many(
+			transform.query(self.model, **filters), transform.update(self.model, **update)
+		)
+		self.model._after_write(None)
+		return result.modified_count
+
+	async def bulk_upsert(self, records, chunk_size: int = 1000) -> BulkResult:
+		"""Async counterpart of BulkMixin.bulk_upsert with the same validation."""
+		if chunk_size < 1:
+			raise ValueError('chunk_size must be at least 1')
+		result = BulkResult()
+		records = iter(records)
+		start = 0
+		while chunk := list(islice(records, chunk_size)):
+			await self._bulk_upsert_chunk(chunk, start, result)
+			start += len(chunk)
+		result.errors.sort(key=lambda pair: pair[0])
+		return result
+
+	async def _bulk_upsert_chunk(self, chunk, start: int, result: BulkResult):
+		documents, indices = self.model._build_chunk(chunk, start, result)
+		await self._resolve_references(documents)
+		valid, operations = self.model._validate_chunk(documents, indices, result)
+		if not operations:
+			return
+		try:
+			outcome = await self.collection.bulk_write(operations, ordered=False)
+		except BulkWriteError as error:
+			self.model._record_write(valid, result, error=error)
+		else:
+			self.model._record_write(valid, result, outcome=outcome)
+		self.model._after_write([document.pk for document, _ in valid])
+
+	async def _resolve_references(self, documents: list):
+		"""Resolve the rooms of sensors with one async query before they are validated.
+
+		Validation would otherwise dereference them over the synchronous connection.
+		"""
+		if issubclass(self.model, Sensor):
+			await _prefetch_rooms(documents, self.alias)
+
+
+async def add_occupants(deltas: dict, alias: str = DEFAULT_CONNECTION_NAME) -> int:
+	"""Apply room_id -> delta occupancy changes atomically, floored at zero.
+
+	Returns:
+		count (int): Number of room updates sent.
+	"""
+	operations = [occupancy_update(room_id, delta) for room_id, delta in deltas.items() if delta]
+	if operations:
+		await AsyncModel(Room, alias).collection.bulk_write(operations, ordered=False)
+		Room.invalidate_cache(deltas)
+	return len(operations)
+
+
+async def load_sensors_with_rooms(alias: str = DEFAULT_CONNECTION_NAME, **filters) -> list:
+	"""Sensors matching the filters with their rooms resolved, in two queries.
+
+	References to rooms that no longer exist are left unresolved, as with
+	Sensor.load_with_rooms.
+	"""
+	return await _prefetch_rooms(await AsyncModel(Sensor, alias).find(**filters), alias)
+
+
+async def _prefetch_rooms(sensors: list, alias: str) -> list:
+	"""Async counterpart of Sensor.prefetch_rooms, with one $in query for all rooms."""
+	room_ids = {
+		Sensor._room_id(ref)
+		for sensor in sensors
+		if not getattr(sensor._data.get('rooms'), '_dereferenced', False)
+		for ref in sensor._data.get('rooms') or ()
+		if not isinstance(ref, Room)
+	}
+	rooms = await AsyncModel(Room, alias).find(pk__in=list(room_ids)) if room_ids else []
+	# Rooms not found are gone; a synchronous query for them would block the event loop
+	return Sensor.prefetch_rooms(sensors, rooms=rooms, fetch_missing=False)
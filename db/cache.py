@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from .models import Room
+
+
+class RoomCache:
+	"""Opt-in, in-process read-through cache of Room documents by id and by floor.
+
+	Entries are evicted least recently used once max_size is reached, and expire
+	ttl seconds after they were loaded. Room.save()/delete(), Room.objects updates,
+	bulk upserts and occupancy flushes made through this package invalidate the
+	affected entries; writes from other processes are only seen after the TTL.
+
+	Cached rooms are shared between callers, so treat them as read-only.
+
+	Example:
+		cache = RoomCache(max_size=2000, ttl=30)
+		room = cache.get(room_id)
+		rooms = cache.by_floor(2)
+	"""
+
+	def __init__(self, max_size: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+		"""
+		Args:
+			max_size (int): Maximum number of cached entries (rooms and floors).
+			ttl (float): Seconds an entry stays valid after it was loaded.
+			clock: Callable returning the current time in seconds.
+		"""
+		if max_size < 1:
+			raise ValueError('max_size must be at least 1')
+		self.max_size = max_size
+		self.ttl = ttl
+		self.clock = clock
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+		# Bumped on every invalidation so loads racing a write are not stored
+		self._generation = 0
+		Room._caches.add(self)
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def get(self, room_id) -> Room | None:
+		"""The room with the given id, or None if it does not exist."""
+		room_id = ObjectId(room_id)
+		found, room = self._lookup(('id', room_id))
+		if found:
+			return room
+		generation = self._generation
+		room = Room.objects(pk=room_id).first()
+		if room is not None:
+			self._store(('id', room_id), room, generation)
+		return room
+
+	def get_many(self, room_ids) -> dict:
+		"""Rooms by id for the given ids, loading all misses with one query.
+
+		Returns:
+			rooms (dict): room id -> Room for the ids that exist.
+		"""
+		rooms = {}
+		missing = []
+		for room_id in map(ObjectId, room_ids):
+			found, room = self._lookup(('id', room_id))
+			if found:
+				rooms[room_id] = room
+			else:
+				missing.append(room_id)
+		if missing:
+			generation = self._generation
+			for room in Room.objects(pk__in=missing):
+				rooms[room.pk] = room
+				self._store(('id', room.pk), room, generation)
+		return rooms
+
+	def by_floor(self, floor: int) -> list[Room]:
+		"""All rooms on a floor."""
+		found, rooms = self._lookup(('floor', floor))
+		if found:
+			return rooms
+		generation = self._generation
+		rooms = list(Room.objects(floor=floor))
+		self._store(('floor', floor), rooms, generation)
+		for room in rooms:
+			self._store(('id', room.pk), room, generation)
+		return rooms
+
+	def invalidate(self, room_ids=None):
+		"""Drop the given rooms, or everything when room_ids is None.
+
+		Floor listings are always dropped, since a room may have moved between floors.
+		"""
+		with self._lock:
+			self._generation += 1
+			if room_ids is None:
+				self._entries.clear()
+				return
+			for room_id in room_ids:
+				self._entries.pop(('id', ObjectId(room_id)), None)
+			for key in [key for key in self._entries if key[0] == 'floor']:
+				del self._entries[key]
+
+	def clear(self):
+		"""Drop all entries and reset the counters."""
+		self.invalidate()
+		self.hits = self.misses = self.evictions = 0
+
+	def stats(self) -> dict:
+		"""Hit/miss counters and current size, for sizing the cache."""
+		lookups = self.hits + self.misses
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'hit_ratio': self.hits / lookups if lookups else 0.0,
+			'evictions': self.evictions,
+			'size': len(self._entries),
+			'max_size': self.max_size,
+		}
+
+	def _lookup(self, key) -> tuple[bool, object]:
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None:
+				expires, value = entry
+				if expires > self.clock():
+					self._entries.move_to_end(key)
+					self.hits += 1
+					return True, value
+				del self._entries[key]
+			self.misses += 1
+			return False, None
+
+	def _store(self, key, value, generation: int):
+		with self._lock:
+			if generation != self._generation:
+				return
+			self._entries[key] = (self.clock() + self.ttl, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_size:
+				self._entries.popitem(last=False)
+				self.evictions += 1
@@ -1,19 +1,232 @@
 import os
+from typing import ClassVar
+
 from dotenv import load_dotenv
-from mongoengine import connect
+from mongoengine import DEFAULT_CONNECTION_NAME, connect, disconnect
+from mongoengine import connection as mongoengine_connection
+from mongoengine.connection import ConnectionFailure
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+from .models import OccupancyBucket, Room, Sensor
+
+# Keyword arguments accepted by Database, mapped to their pymongo option names
+DRIVER_OPTIONS = {
+	'max_pool_size': 'maxPoolSize',
+	'min_pool_size': 'minPoolSize',
+	'max_idle_time_ms': 'maxIdleTimeMS',
+	'server_selection_timeout_ms': 'serverSelectionTimeoutMS',
+	'connect_timeout_ms': 'connectTimeoutMS',
+	'socket_timeout_ms': 'socketTimeoutMS',
+	'read_preference': 'readPreference',
+}
+
+
+def driver_options(options: dict) -> dict:
+	"""Rename known Database options to pymongo names and drop unset ones."""
+	return {
+		DRIVER_OPTIONS.get(key, key): value for key, value in options.items() if value is not None
+	}
+
+
+def read_preference_from_name(value):
+	"""pymongo read preference for a name such as 'secondaryPreferred'; objects pass through.
+
+	mongoengine.connect always passes its own read_preference=Primary(), which
+	overrides a readPreference string, so sync connections need the object.
+	"""
+	if isinstance(value, str):
+		return make_read_preference(read_pref_mode_from_name(value), None)
+	return value
 
 
 class Database:
 	_connected = False
+	# Connection settings per alias, kept so forked workers can reconnect
+	_settings: ClassVar[dict] = {}
+	# asyncio clients and their settings per alias
+	_async_clients: ClassVar[dict] = {}
+	_async_settings: ClassVar[dict] = {}
+	# QueryMonitor per alias, see db.monitoring
+	_monitors: ClassVar[dict] = {}
+
+	def __init__(
+		self,
+		uri=None,
+		alias: str = DEFAULT_CONNECTION_NAME,
+		max_pool_size: int | None = None,
+		min_pool_size: int | None = None,
+		max_idle_time_ms: int | None = None,
+		server_selection_timeout_ms: int | None = None,
+		connect_timeout_ms: int | None = None,
+		socket_timeout_ms: int | None = None,
+		read_preference: str | None = None,
+		monitor=None,
+		**options,
+	):
+		"""Connect an alias to MongoDB, once per process.
 
-	def __init__(self, uri=None):
-		if not Database._connected:
-			load_dotenv(override=True)
-			self.uri = uri if uri else os.getenv('MONGO_URL')
+		Args:
+			uri (str): Connection string; defaults to the MONGO_URL environment variable.
+			alias (str): mongoengine alias, e.g. 'analytics' for a secondary-read connection
+				used through Room.objects.using('analytics').
+			max_pool_size, min_pool_size, max_idle_time_ms: Connection pool sizing.
+			server_selection_timeout_ms, connect_timeout_ms, socket_timeout_ms: Timeouts.
+			read_preference (str): e.g. 'primary', 'secondaryPreferred', 'nearest', or a
+				pymongo read preference object.
+			monitor (QueryMonitor): Records the commands and pool events of this alias.
+			options: Any other keyword arguments accepted by mongoengine.connect.
+		"""
+		if alias in Database._settings:
+			return
+		load_dotenv(override=True)
+		self.uri = uri if uri else os.getenv('MONGO_URL')
 
-			if not self.uri:
-				raise ValueError('MONGO_URL is not set!')
+		if not self.uri:
+			raise ValueError('MONGO_URL is not set!')
 
-			connect(host=self.uri)
+		settings = {
+			'host': self.uri,
+			'alias': alias,
+			**driver_options(
+				{
+					'max_pool_size': max_pool_size,
+					'min_pool_size': min_pool_size,
+					'max_idle_time_ms': max_idle_time_ms,
+					'server_selection_timeout_ms': server_selection_timeout_ms,
+					'connect_timeout_ms': connect_timeout_ms,
+					'socket_timeout_ms': socket_timeout_ms,
+				}
+			),
+			**options,
+		}
+		if read_preference is not None:
+			settings['read_preference'] = read_preference_from_name(read_preference)
+		if monitor is not None:
+			settings['event_listeners'] = [*settings.get('event_listeners', ()), monitor]
+			Database._monitors[alias] = monitor
+		connect(**settings)
+		Database._settings[alias] = settings
+		if alias == DEFAULT_CONNECTION_NAME:
 			Database._connected = True
 			print('✔️ Connected to MongoDB')
+		else:
+			print(f'✔️ Connected to MongoDB ({alias})')
+
+	@staticmethod
+	async def connect_async(
+		uri=None,
+		alias: str = DEFAULT_CONNECTION_NAME,
+		db: str | None = None,
+		mongo_client_class=None,
+		monitor=None,
+		**options,
+	):
+		"""Connect an asyncio client for an alias, once per process, and return it.
+
+		Takes the same pool, timeout and read preference options as Database().
+		Models are reached through db.aio.AsyncModel.
+
+		Args:
+			uri (str): Connection string; defaults to the MONGO_URL environment variable.
+			alias (str): Name of the connection, shared with db.aio.AsyncModel.
+			db (str): Database name; defaults to the one in the connection string.
+			mongo_client_class: Client class to use instead of pymongo.AsyncMongoClient.
+			monitor (QueryMonitor): Records the commands and pool events of this alias.
+		"""
+		if alias in Database._async_clients:
+			return Database._async_clients[alias]
+		load_dotenv(override=True)
+		uri = uri if uri else os.getenv('MONGO_URL')
+		if not uri:
+			raise ValueError('MONGO_URL is not set!')
+		if monitor is not None:
+			options['event_listeners'] = [*options.get('event_listeners', ()), monitor]
+			Database._monitors[alias] = monitor
+		Database._async_settings[alias] = {
+			'uri': uri,
+			'db': db,
+			'mongo_client_class': mongo_client_class,
+			'options': driver_options(options),
+		}
+		client = Database.async_client(alias)
+		await client.aconnect()
+		return client
+
+	@staticmethod
+	def async_client(alias: str = DEFAULT_CONNECTION_NAME):
+		"""The asyncio client of an alias, created from its settings if needed."""
+		client = Database._async_clients.get(alias)
+		if client is None:
+			settings = Database._async_settings.get(alias)
+			if settings is None:
+				raise ConnectionFailure(
+					f'No async connection for alias {alias!r}; call connect_async'
+				)
+			if settings['mongo_client_class'] is None:
+				from pymongo import AsyncMongoClient
+
+				client_class = AsyncMongoClient
+			else:
+				client_class = settings['mongo_client_class']
+			client = client_class(settings['uri'], **settings['options'])
+			Database._async_clients[alias] = client
+		return client
+
+	@staticmethod
+	def async_database(alias: str = DEFAULT_CONNECTION_NAME):
+		"""The asyncio database object of an alias."""
+		client = Database.async_client(alias)
+		name = Database._async_settings[alias]['db']
+		return client[name] if name else client.get_default_database(default='test')
+
+	@staticmethod
+	async def disconnect_async(alias: str = DEFAULT_CONNECTION_NAME):
+		"""Close an asyncio client so the next connect_async call creates it again."""
+		client = Database._async_clients.pop(alias, None)
+		Database._async_settings.pop(alias, None)
+		if client is not None:
+			await client.close()
+
+	@staticmethod
+	def get_monitor(alias: str = DEFAULT_CONNECTION_NAME):
+		"""The QueryMonitor an alias was connected with, or None."""
+		return Database._monitors.get(alias)
+
+	@staticmethod
+	def disconnect(alias: str = DEFAULT_CONNECTION_NAME):
+		"""Close an alias so the next Database() call connects it again."""
+		disconnect(alias)
+		Database._settings.pop(alias, None)
+		Database._monitors.pop(alias, None)
+		if alias == DEFAULT_CONNECTION_NAME:
+			Database._connected = False
+
+	@staticmethod
+	def reconnect_after_fork():
+		"""Replace the clients inherited from the parent process with fresh ones.
+
+		Runs automatically in forked children. The inherited clients are dropped
+		without being closed, since closing them would touch sockets the parent
+		is still using.
+		"""
+		# Forget every inherited client first; aliases with equal settings share one
+		for alias in Database._settings:
+			mongoengine_connection._connections.pop(alias, None)
+		for alias, settings in Database._settings.items():
+			disconnect(alias)
+			connect(**settings)
+		# asyncio clients are recreated lazily from their settings
+		Database._async_clients.clear()
+
+	@staticmethod
+	def ensure_indexes():
+		"""Create the indexes declared on all models.
+
+		Models do not create indexes on first use, so run this once on deploy or startup.
+		"""
+		for model in (Room, Sensor, OccupancyBucket):
+			model.ensure_indexes()
+
+
+if hasattr(os, 'register_at_fork'):
+	os.register_at_fork(after_in_child=Database.reconnect_after_fork)
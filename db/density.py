@@ -0,0 +1,184 @@
+import time
+from typing import NamedTuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from .models import Room
+
+# Room fields returned with each ranked room, and those read to compute density
+RESULT_FIELDS = ('name', 'type', 'floor', 'occupants', 'area')
+DENSITY_FIELDS = RESULT_FIELDS + ('crowd_factor',)
+# OperationFailure codes meaning the server cannot run the pipeline at all: command not
+# found or not supported, unknown expression operator, unknown pipeline stage
+UNSUPPORTED_CODES = frozenset({59, 115, 168, 15999, 40324})
+
+
+class RoomDensity(NamedTuple):
+	id: ObjectId
+	name: str
+	type: str
+	floor: int
+	occupants: float
+	area: float
+	density: float
+
+
+class DensityRanker:
+	"""Ranks rooms by crowd density: occupants * crowd_factor / max(area, min_area).
+
+	Ranking runs as an aggregation pipeline so only the top-k rooms leave the
+	server. If the server (or mongomock) does not support the pipeline, the ranker
+	switches to a vectorised ranking over an in-process snapshot of all rooms;
+	other server errors only use the snapshot for that call. The snapshot is
+	reloaded after ttl seconds, or when rooms are written through this package.
+
+	Example:
+		ranker = DensityRanker()
+		busiest = ranker.top(5, floor=2)
+	"""
+
+	def __init__(
+		self,
+		min_area: float = 1.0,
+		ttl: float = 5.0,
+		server_side: bool = True,
+		clock=time.monotonic,
+	):
+		"""
+		Args:
+			min_area (float): Lower bound on room area, to keep density finite.
+			ttl (float): Seconds the fallback snapshot stays valid.
+			server_side (bool): Try the aggregation pipeline before the fallback.
+			clock: Callable returning the current time in seconds.
+		"""
+		self.min_area = min_area
+		self.ttl = ttl
+		self.server_side = server_side
+		self.clock = clock
+		self._snapshot = None
+		self._loaded_at = None
+		Room.add_write_listener(self.invalidate)
+
+	def top(self, k: int = 10, floor: int | None = None, type: str | None = None) -> list:
+		"""The k most crowded rooms, optionally on one floor and of one type.
+
+		Returns:
+			rooms (list[RoomDensity]): Highest density first, ties by id.
+		"""
+		if k < 1:
+			return []
+		if self.server_side:
+			try:
+				return self._top_pipeline(k, floor, type)
+			except NotImplementedError:
+				self.server_side = False
+			except OperationFailure as error:
+				# Remember only an unsupported pipeline; timeouts or failovers may pass
+				if error.code in UNSUPPORTED_CODES:
+					self.server_side = False
+		return self._top_snapshot(k, floor, type)
+
+	def pipeline(self, k: int, floor: int | None = None, type: str | None = None) -> list:
+		"""The aggregation pipeline used by top()."""
+		return [
+			{'$match': _filters(floor, type)},
+			{
+				'$project': {
+					**dict.fromkeys(RESULT_FIELDS, 1),
+					'density': {
+						'$divide': [
+							{
+								'$multiply': [
+									{'$ifNull': ['$occupants', 0]},
+									{'$ifNull': ['$crowd_factor', 1]},
+								]
+							},
+							{'$max': [{'$ifNull': ['$area', 0]}, self.min_area]},
+						]
+					},
+				}
+			},
+			{'$sort': {'density': -1, '_id': 1}},
+			{'$limit': k},
+		]
+
+	def invalidate(self, room_ids=None):
+		"""Drop the fallback snapshot so the next fallback ranking reloads it."""
+		self._loaded_at = None
+
+	def _top_pipeline(self, k: int, floor, type) -> list:
+		cursor = Room._get_collection().aggregate(self.pipeline(k, floor, type))
+		return [
+			RoomDensity(
+				document['_id'],
+				document.get('name'),
+				document.get('type'),
+				document.get('floor'),
+				document.get('occupants'),
+				document.get('area'),
+				document['density'],
+			)
+			for document in cursor
+		]
+
+	def _top_snapshot(self, k: int, floor, type) -> list:
+		snapshot = self._load_snapshot()
+		selected = np.ones(len(snapshot['id']), dtype=bool)
+		if floor is not None:
+			selected &= snapshot['floor'] == floor
+		if type is not None:
+			selected &= snapshot['type'] == type
+		candidates = np.flatnonzero(selected)
+		# The snapshot is sorted by id, so a stable sort breaks ties by id
+		order = candidates[np.argsort(-snapshot['density'][candidates], kind='stable')[:k]]
+		return [
+			RoomDensity(
+				snapshot['id'][i],
+				snapshot['name'][i],
+				snapshot['type'][i],
+				snapshot['floor'][i],
+				snapshot['occupants'][i],
+				snapshot['area'][i],
+				float(snapshot['density'][i]),
+			)
+			for i in order.tolist()
+		]
+
+	def _load_snapshot(self) -> dict:
+		now = self.clock()
+		if self._loaded_at is not None and now - self._loaded_at < self.ttl:
+			return self._snapshot
+		documents = list(
+			Room._get_collection().find({}, dict.fromkeys(DENSITY_FIELDS, 1)).sort('_id', 1)
+		)
+		snapshot = {'id': [document['_id'] for document in documents]}
+		for field in RESULT_FIELDS:
+			snapshot[field] = np.array(
+				[document.get(field) for document in documents], dtype=object
+			)
+		occupants = np.array(
+			[document.get('occupants') or 0 for document in documents], dtype=np.float64
+		)
+		crowd_factor = np.array(
+			[_value(document.get('crowd_factor'), 1) for document in documents], dtype=np.float64
+		)
+		area = np.array([document.get('area') or 0 for document in documents], dtype=np.float64)
+		snapshot['density'] = occupants * crowd_factor / np.maximum(area, self.min_area)
+		self._snapshot = snapshot
+		self._loaded_at = now
+		return snapshot
+
+
+def _filters(floor: int | None, type: str | None) -> dict:
+	query = {}
+	if floor is not None:
+		query['floor'] = floor
+	if type is not None:
+		query['type'] = type
+	return query
+
+
+def _value(value, default):
+	return default if value is None else value
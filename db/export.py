@@ -0,0 +1,187 @@
+import os
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+
+from .geometry import pack_borders
+from .models import Room, Sensor
+
+# Missing numeric values are exported as NaN; a missing floor as 0
+ROOM_DTYPE = np.dtype(
+	[
+		('id', 'U24'),
+		('name', object),
+		('type', object),
+		('floor', np.int64),
+		('occupants', np.float64),
+		('area', np.float64),
+		('crowd_factor', np.float64),
+		('popularity_factor', np.float64),
+		('longitude', np.float64),
+		('latitude', np.float64),
+		('centroid_longitude', np.float64),
+		('centroid_latitude', np.float64),
+	]
+)
+SENSOR_DTYPE = np.dtype(
+	[
+		('id', 'U24'),
+		('name', object),
+		('room_a', 'U24'),
+		('room_b', 'U24'),
+		('latitude', np.float64),
+		('longitude', np.float64),
+		('is_vertical', bool),
+	]
+)
+
+
+class RoomColumns(NamedTuple):
+	"""Rooms as columns; the borders of rooms[i] are coords[offsets[i]:offsets[i + 1]]."""
+
+	rooms: np.ndarray
+	coords: np.ndarray
+	offsets: np.ndarray
+
+
+def room_batches(batch_size: int = 10_000, **filters):
+	"""Stream rooms matching mongoengine-style filters as RoomColumns batches."""
+	fields = ROOM_DTYPE.names[1:]
+	projection = {**dict.fromkeys(fields, 1), 'borders': 1}
+	for documents in _batches(Room, projection, batch_size, filters):
+		rooms = np.empty(len(documents), dtype=ROOM_DTYPE)
+		rooms['id'] = [str(document['_id']) for document in documents]
+		rooms['floor'] = [document.get('floor') or 0 for document in documents]
+		for field in fields:
+			if field != 'floor':
+				rooms[field] = [_number(document.get(field)) for document in documents]
+		coords, offsets = pack_borders(document.get('borders') or [] for document in documents)
+		yield RoomColumns(rooms, coords, offsets)
+
+
+def sensor_batches(batch_size: int = 10_000, **filters):
+	"""Stream sensors matching mongoengine-style filters as SENSOR_DTYPE arrays."""
+	projection = {'name': 1, 'rooms': 1, 'latitude': 1, 'longitude': 1, 'is_vertical': 1}
+	for documents in _batches(Sensor, projection, batch_size, filters):
+		sensors = np.empty(len(documents), dtype=SENSOR_DTYPE)
+		sensors['id'] = [str(document['_id']) for document in documents]
+		sensors['name'] = [document.get('name') for document in documents]
+		rooms = [(list(document.get('rooms') or []) + [None, None])[:2] for document in documents]
+		sensors['room_a'] = [str(pair[0] or '') for pair in rooms]
+		sensors['room_b'] = [str(pair[1] or '') for pair in rooms]
+		for field in ('latitude', 'longitude'):
+			sensors[field] = [_number(document.get(field)) for document in documents]
+		sensors['is_vertical'] = [bool(document.get('is_vertical')) for document in documents]
+		yield sensors
+
+
+def export_rooms(batch_size: int = 10_000, **filters) -> RoomColumns:
+	"""All rooms matching the filters as one RoomColumns snapshot."""
+	batches = list(room_batches(batch_size, **filters))
+	if not batches:
+		return _empty_rooms()
+	offsets = [batches[0].offsets]
+	end = batches[0].offsets[-1]
+	for batch in batches[1:]:
+		offsets.append(batch.offsets[1:] + end)
+		end += batch.offsets[-1]
+	return RoomColumns(
+		np.concatenate([batch.rooms for batch in batches]),
+		np.concatenate([batch.coords for batch in batches]),
+		np.concatenate(offsets),
+	)
+
+
+def export_sensors(batch_size: int = 10_000, **filters) -> np.ndarray:
+	"""All sensors matching the filters as one SENSOR_DTYPE array."""
+	batches = list(sensor_batches(batch_size, **filters))
+	return np.concatenate(batches) if batches else np.empty(0, dtype=SENSOR_DTYPE)
+
+
+def rooms_to_arrow(columns: RoomColumns):
+	"""Convert RoomColumns to a pyarrow Table with borders as list<[lon, lat]>."""
+	pa = _pyarrow()
+	table = _structured_to_arrow(pa, columns.rooms)
+	points = pa.FixedSizeListArray.from_arrays(pa.array(columns.coords.ravel()), 2)
+	borders = pa.LargeListArray.from_arrays(pa.array(columns.offsets, pa.int64()), points)
+	return table.append_column('borders', borders)
+
+
+def sensors_to_arrow(sensors: np.ndarray):
+	"""Convert a SENSOR_DTYPE array to a pyarrow Table."""
+	return _structured_to_arrow(_pyarrow(), sensors)
+
+
+def write_parquet(directory: str, batch_size: int = 10_000) -> tuple[str, str]:
+	"""Stream all rooms and sensors to rooms.parquet and sensors.parquet.
+
+	Batches are written as they are read, so memory use stays bounded by batch_size.
+
+	Returns:
+		paths (tuple[str, str]): Paths of the rooms and sensors files.
+	"""
+	pq = _pyarrow('parquet')
+	os.makedirs(directory, exist_ok=True)
+	paths = (os.path.join(directory, 'rooms.parquet'), os.path.join(directory, 'sensors.parquet'))
+	_write_tables(
+		pq,
+		paths[0],
+		rooms_to_arrow(_empty_rooms()).schema,
+		(rooms_to_arrow(batch) for batch in room_batches(batch_size)),
+	)
+	_write_tables(
+		pq,
+		paths[1],
+		sensors_to_arrow(np.empty(0, dtype=SENSOR_DTYPE)).schema,
+		(sensors_to_arrow(batch) for batch in sensor_batches(batch_size)),
+	)
+	return paths
+
+
+def _batches(model, projection: dict, batch_size: int, filters: dict):
+	if batch_size < 1:
+		raise ValueError('batch_size must be at least 1')
+	cursor = model._get_collection().find(
+		model.objects(**filters)._query, projection, batch_size=batch_size
+	)
+	while documents := list(islice(cursor, batch_size)):
+		yield documents
+
+
+def _empty_rooms() -> RoomColumns:
+	return RoomColumns(np.empty(0, dtype=ROOM_DTYPE), np.empty((0, 2)), np.zeros(1, dtype=np.int64))
+
+
+def _write_tables(pq, path: str, schema, tables):
+	with pq.ParquetWriter(path, schema) as writer:
+		for table in tables:
+			writer.write_table(table)
+
+
+def _number(value) -> float:
+	return np.nan if value is None else value
+
+
+def _structured_to_arrow(pa, array: np.ndarray):
+	columns = {}
+	for name in array.dtype.names:
+		column = array[name]
+		if column.dtype == object or column.dtype.kind == 'U':
+			columns[name] = pa.array(column.tolist(), pa.string())
+		else:
+			columns[name] = pa.array(column)
+	return pa.table(columns)
+
+
+def _pyarrow(module: str | None = None):
+	"""Import pyarrow (or one of its submodules), which is an optional dependency."""
+	try:
+		import pyarrow
+		import pyarrow.parquet
+	except ImportError as error:
+		raise ImportError(
+			'Arrow and Parquet export need pyarrow: '
+			'pip install "indoor_crowded_region_detection_database[arrow]"'
+		) from error
+	return pyarrow.parquet if module == 'parquet' else pyarrow
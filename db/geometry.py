@@ -0,0 +1,182 @@
+import numpy as np
+
+# WGS84 ellipsoid (standard for lat/lon): semi-major axis and squared eccentricity
+WGS84_A = 6_378_137.0
+WGS84_ES = 0.00669437999014133
+
+# Packed borders are little-endian float64 [lon, lat] pairs back to back
+BORDERS_DTYPE = np.dtype('<f8')
+
+
+def borders_array(borders) -> np.ndarray:
+	"""Borders as an (n, 2) float64 array, from [lon, lat] pairs or packed bytes.
+
+	Packed bytes are viewed in place instead of copied, so that result is read-only.
+	"""
+	if isinstance(borders, bytes):
+		return np.frombuffer(borders, dtype=BORDERS_DTYPE).reshape(-1, 2)
+	return np.asarray(borders if borders is not None else (), dtype=np.float64).reshape(-1, 2)
+
+
+def pack_borders(borders_list) -> tuple[np.ndarray, np.ndarray]:
+	"""Pack many [lon, lat] border lists into flat coordinates plus offsets.
+
+	Args:
+		borders_list: Iterable of borders, each [longitude, latitude] pairs or packed bytes.
+	Returns:
+		coords (np.ndarray): (n, 2) float64 array with all vertices back to back.
+		offsets (np.ndarray): (m + 1,) int64 array; polygon i is coords[offsets[i]:offsets[i + 1]].
+	"""
+	chunks = []
+	counts = []
+	for borders in borders_list:
+		points = borders_array(borders)
+		chunks.append(points)
+		counts.append(len(points))
+	offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+	np.cumsum(counts, out=offsets[1:])
+	coords = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.float64)
+	return coords, offsets
+
+
+def _authalic_sin(sin_lat: np.ndarray, e: float) -> np.ndarray:
+	"""Unnormalised authalic q(phi) for the given sin(latitude) values."""
+	e_sin = e * sin_lat
+	return (1 - e * e) * (
+		sin_lat / (1 - e_sin * e_sin) - np.log((1 - e_sin) / (1 + e_sin)) / (2 * e)
+	)
+
+
+def polygon_areas(coords: np.ndarray, offsets: np.ndarray, geod=None) -> np.ndarray:
+	"""Computes unsigned areas in square meters for packed lon/lat polygons.
+
+	Latitudes are mapped to the authalic (equal-area) sphere of the ellipsoid and
+	the spherical excess of every edge is summed per polygon, so all polygons are
+	handled in a handful of array operations. For room-sized polygons the result
+	agrees with pyproj's ``Geod.polygon_area_perimeter`` to a relative 1e-5.
+	Polygons with fewer than three vertices get an area of 0.0. ``geod`` selects
+	another ellipsoid from any object with ``a`` and ``es``, such as a pyproj.Geod;
+	WGS84 is the default.
+	"""
+	counts = np.diff(offsets)
+	n_polygons = len(counts)
+	if len(coords) == 0:
+		return np.zeros(n_polygons, dtype=np.float64)
+
+	lons = coords[:, 0]
+	lats = coords[:, 1]
+	a, es = (WGS84_A, WGS84_ES) if geod is None else (geod.a, geod.es)
+	e = np.sqrt(es)
+	q_pole = _authalic_sin(np.ones(1), e)[0]
+	sin_beta = np.clip(_authalic_sin(np.sin(np.radians(lats)), e) / q_pole, -1.0, 1.0)
+	tan_half_beta = np.tan(np.arcsin(sin_beta) / 2)
+
+	next_index = _next_vertex(offsets, len(coords))
+
+	# Longitude steps straight from the degree values; shifting by 180 before
+	# wrapping would throw away the precision small rooms depend on
+	delta = lons[next_index] - lons
+	delta = np.where(delta > 180, delta - 360, np.where(delta < -180, delta + 360, delta))
+	t1 = tan_half_beta
+	t2 = tan_half_beta[next_index]
+	excess = 2 * np.arctan2(np.tan(np.radians(delta) / 2) * (t1 + t2), 1 + t1 * t2)
+
+	polygon_ids = np.repeat(np.arange(n_polygons), counts)
+	total = np.bincount(polygon_ids, weights=excess, minlength=n_polygons)
+	authalic_radius_sq = a * a * q_pole / 2
+	areas = np.abs(total) * authalic_radius_sq
+	areas[counts < 3] = 0.0
+	return areas
+
+
+def _next_vertex(offsets: np.ndarray, n_vertices: int) -> np.ndarray:
+	"""Index of the next vertex, wrapping the last vertex of each polygon to its first."""
+	counts = np.diff(offsets)
+	next_index = np.arange(1, n_vertices + 1)
+	non_empty = counts > 0
+	next_index[offsets[1:][non_empty] - 1] = offsets[:-1][non_empty]
+	return next_index
+
+
+def polygon_centroids(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+	"""Computes [lon, lat] centroids for packed polygons.
+
+	Uses the planar area-weighted centroid in lon/lat, which is accurate at room
+	scale. Degenerate polygons (no enclosed area) fall back to the vertex mean,
+	and empty polygons get NaN.
+	"""
+	counts = np.diff(offsets)
+	n_polygons = len(counts)
+	centroids = np.full((n_polygons, 2), np.nan)
+	if len(coords) == 0:
+		return centroids
+
+	polygon_ids = np.repeat(np.arange(n_polygons), counts)
+	non_empty = counts > 0
+	# Work relative to each polygon's first vertex to keep the cross products precise
+	origin = np.zeros((n_polygons, 2))
+	origin[non_empty] = coords[offsets[:-1][non_empty]]
+	local = coords - origin[polygon_ids]
+	following = local[_next_vertex(offsets, len(coords))]
+	cross = local[:, 0] * following[:, 1] - following[:, 0] * local[:, 1]
+
+	double_area = np.bincount(polygon_ids, weights=cross, minlength=n_polygons)
+	sum_x = np.bincount(
+		polygon_ids, weights=(local[:, 0] + following[:, 0]) * cross, minlength=n_polygons
+	)
+	sum_y = np.bincount(
+		polygon_ids, weights=(local[:, 1] + following[:, 1]) * cross, minlength=n_polygons
+	)
+	mean_x = np.bincount(polygon_ids, weights=local[:, 0], minlength=n_polygons)
+	mean_y = np.bincount(polygon_ids, weights=local[:, 1], minlength=n_polygons)
+
+	extent = np.zeros(n_polygons)
+	np.maximum.at(extent, polygon_ids, np.abs(local).max(axis=1))
+	has_area = np.abs(double_area) > 1e-12 * extent * extent
+	with np.errstate(divide='ignore', invalid='ignore'):
+		cx = np.where(has_area, sum_x / (3 * double_area), mean_x / counts)
+		cy = np.where(has_area, sum_y / (3 * double_area), mean_y / counts)
+	centroids[non_empty, 0] = cx[non_empty] + origin[non_empty, 0]
+	centroids[non_empty, 1] = cy[non_empty] + origin[non_empty, 1]
+	return centroids
+
+
+def bounding_boxes(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+	"""Computes [min_lon, min_lat, max_lon, max_lat] boxes for packed polygons.
+
+	Empty polygons get NaN.
+	"""
+	counts = np.diff(offsets)
+	boxes = np.full((len(counts), 4), np.nan)
+	non_empty = counts > 0
+	if non_empty.any():
+		starts = offsets[:-1][non_empty]
+		boxes[non_empty, :2] = np.minimum.reduceat(coords, starts, axis=0)
+		boxes[non_empty, 2:] = np.maximum.reduceat(coords, starts, axis=0)
+	return boxes
+
+
+# Mean Earth radius in meters, for spherical distances
+EARTH_RADIUS = 6_371_008.8
+
+
+def haversine(lon1, lat1, lon2, lat2):
+	"""Great-circle distance in meters between lon/lat points; accepts arrays."""
+	lon1, lat1, lon2, lat2 = (np.radians(value) for value in (lon1, lat1, lon2, lat2))
+	a = (
+		np.sin((lat2 - lat1) / 2) ** 2
+		+ np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+	)
+	return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def points_in_polygon(xs: np.ndarray, ys: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+	"""Even-odd ray casting test of many points against one (n, 2) lon/lat polygon."""
+	xs = np.asarray(xs, dtype=np.float64)[:, None]
+	ys = np.asarray(ys, dtype=np.float64)[:, None]
+	x1, y1 = polygon[:, 0], polygon[:, 1]
+	x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+	crosses = (y1 > ys) != (y2 > ys)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		x_at_y = x1 + (ys - y1) * (x2 - x1) / (y2 - y1)
+	return np.count_nonzero(crosses & (xs < x_at_y), axis=1) % 2 == 1
@@ -0,0 +1,188 @@
+import numpy as np
+
+from .models import Room, Sensor
+
+# Room fields kept as per-room arrays on the graph
+ROOM_FIELDS = (
+	'floor',
+	'occupants',
+	'area',
+	'crowd_factor',
+	'popularity_factor',
+	'longitude',
+	'latitude',
+)
+ROOM_PROJECTION = {field: 1 for field in ROOM_FIELDS}
+SENSOR_PROJECTION = {'rooms': 1, 'is_vertical': 1}
+
+
+class BuildingGraph:
+	"""In-memory snapshot of the room graph defined by the sensors.
+
+	Every sensor connects its two rooms in both directions. Adjacency is stored
+	in CSR form: the neighbours of room index i are indices[indptr[i]:indptr[i + 1]],
+	and edge_sensor / edge_vertical hold the sensor index and is_vertical flag of
+	each of those directed edges. Room attributes are kept as arrays indexed by
+	room index, so routing and crowd analysis never go back to Mongo per hop.
+	"""
+
+	def __init__(self):
+		self.room_ids = []
+		self.room_index = {}
+		self.rooms = {field: np.empty(0) for field in ROOM_FIELDS}
+		self.sensor_ids = []
+		self.sensor_index = {}
+		# Per sensor: the two room indices and is_vertical
+		self._sensor_rooms = np.empty((0, 2), dtype=np.int64)
+		self._sensor_vertical = np.empty(0, dtype=bool)
+		self.indptr = np.zeros(1, dtype=np.int64)
+		self.indices = np.empty(0, dtype=np.int64)
+		self.edge_sensor = np.empty(0, dtype=np.int64)
+		self.edge_vertical = np.empty(0, dtype=bool)
+
+	@classmethod
+	def load(cls) -> 'BuildingGraph':
+		"""Build a graph from all rooms and sensors with one query per collection."""
+		graph = cls()
+		graph._add_rooms(Room._get_collection().find({}, ROOM_PROJECTION))
+		graph._set_sensors(Sensor._get_collection().find({}, SENSOR_PROJECTION))
+		return graph
+
+	@property
+	def n_rooms(self) -> int:
+		return len(self.room_ids)
+
+	@property
+	def n_sensors(self) -> int:
+		return len(self.sensor_ids)
+
+	def neighbors(self, room_id) -> list:
+		"""Ids of the rooms directly connected to the given room."""
+		i = self.room_index[room_id]
+		return [self.room_ids[j] for j in self.indices[self.indptr[i] : self.indptr[i + 1]]]
+
+	def refresh_rooms(self, room_ids=None):
+		"""Reload room attributes (e.g. occupants) for some or all rooms in one query.
+
+		Rooms no longer found are dropped with their sensors, which renumbers the
+		rooms after them.
+		"""
+		if room_ids is None:
+			query, expected = {}, set(self.room_ids)
+		else:
+			room_ids = list(room_ids)
+			query, expected = {'_id': {'$in': room_ids}}, set(room_ids) & self.room_index.keys()
+		documents = list(Room._get_collection().find(query, ROOM_PROJECTION))
+		self._remove_rooms(expected - {document['_id'] for document in documents})
+		self._add_rooms(doc for doc in documents if doc['_id'] not in self.room_index)
+		for document in documents:
+			i = self.room_index[document['_id']]
+			for field in ROOM_FIELDS:
+				self.rooms[field][i] = self._room_value(document, field)
+
+	def refresh_sensors(self, sensor_ids):
+		"""Re-read the given sensors and patch their edges; deleted ones are dropped."""
+		sensor_ids = set(sensor_ids)
+		documents = list(
+			Sensor._get_collection().find({'_id': {'$in': list(sensor_ids)}}, SENSOR_PROJECTION)
+		)
+		keep = [i for i, sensor_id in enumerate(self.sensor_ids) if sensor_id not in sensor_ids]
+		kept_ids = [self.sensor_ids[i] for i in keep]
+		kept_rooms = self._sensor_rooms[keep]
+		kept_vertical = self._sensor_vertical[keep]
+
+		unknown = {
+			room_id
+			for document in documents
+			for room_id in document.get('rooms') or ()
+			if room_id not in self.room_index
+		}
+		if unknown:
+			self._add_rooms(
+				Room._get_collection().find({'_id': {'$in': list(unknown)}}, ROOM_PROJECTION)
+			)
+		new_ids, new_rooms, new_vertical = self._parse_sensors(documents)
+		self._store_sensors(
+			kept_ids + new_ids,
+			np.concatenate([kept_rooms, new_rooms]),
+			np.concatenate([kept_vertical, new_vertical]),
+		)
+
+	@staticmethod
+	def _room_value(document: dict, field: str) -> float:
+		value = document.get(field)
+		return np.nan if value is None else value
+
+	def _add_rooms(self, documents):
+		documents = list(documents)
+		if not documents:
+			return
+		for document in documents:
+			self.room_index[document['_id']] = len(self.room_ids)
+			self.room_ids.append(document['_id'])
+		for field in ROOM_FIELDS:
+			values = np.array([self._room_value(doc, field) for doc in documents], dtype=np.float64)
+			self.rooms[field] = np.concatenate([self.rooms[field], values])
+		# New rooms start without edges
+		self.indptr = np.concatenate(
+			[self.indptr, np.full(len(documents), self.indptr[-1], dtype=np.int64)]
+		)
+
+	def _remove_rooms(self, room_ids: set):
+		"""Drop rooms and the sensors attached to them."""
+		if not room_ids:
+			return
+		keep = np.array([room_id not in room_ids for room_id in self.room_ids], dtype=bool)
+		# Old room index -> index among the kept rooms
+		new_index = np.cumsum(keep) - 1
+		self.room_ids = [room_id for room_id, kept in zip(self.room_ids, keep) if kept]
+		self.room_index = {room_id: i for i, room_id in enumerate(self.room_ids)}
+		for field in ROOM_FIELDS:
+			self.rooms[field] = self.rooms[field][keep]
+
+		kept_sensors = keep[self._sensor_rooms].all(axis=1)
+		self._store_sensors(
+			[sensor_id for sensor_id, kept in zip(self.sensor_ids, kept_sensors) if kept],
+			new_index[self._sensor_rooms[kept_sensors]],
+			self._sensor_vertical[kept_sensors],
+		)
+
+	def _parse_sensors(self, documents):
+		ids = []
+		pairs = []
+		vertical = []
+		for document in documents:
+			rooms = document.get('rooms') or []
+			# Sensors pointing at missing rooms cannot form an edge
+			if len(rooms) != 2 or not all(room_id in self.room_index for room_id in rooms):
+				continue
+			ids.append(document['_id'])
+			pairs.append((self.room_index[rooms[0]], self.room_index[rooms[1]]))
+			vertical.append(bool(document.get('is_vertical')))
+		return (
+			ids,
+			np.array(pairs, dtype=np.int64).reshape(-1, 2),
+			np.array(vertical, dtype=bool),
+		)
+
+	def _set_sensors(self, documents):
+		self._store_sensors(*self._parse_sensors(documents))
+
+	def _store_sensors(self, ids: list, pairs: np.ndarray, vertical: np.ndarray):
+		self.sensor_ids = ids
+		self.sensor_index = {sensor_id: i for i, sensor_id in enumerate(ids)}
+		self._sensor_rooms = pairs
+		self._sensor_vertical = vertical
+
+		# Each sensor is an undirected edge, stored once per direction
+		sensor_numbers = np.arange(len(ids), dtype=np.int64)
+		sources = np.concatenate([pairs[:, 0], pairs[:, 1]])
+		targets = np.concatenate([pairs[:, 1], pairs[:, 0]])
+		edge_sensor = np.concatenate([sensor_numbers, sensor_numbers])
+		order = np.argsort(sources, kind='stable')
+
+		self.indices = targets[order]
+		self.edge_sensor = edge_sensor[order]
+		self.edge_vertical = vertical[self.edge_sensor]
+		self.indptr = np.zeros(self.n_rooms + 1, dtype=np.int64)
+		np.cumsum(np.bincount(sources, minlength=self.n_rooms), out=self.indptr[1:])
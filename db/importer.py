@@ -0,0 +1,429 @@
+import contextlib
+import csv
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from bson import ObjectId
+
+from .geometry import pack_borders, polygon_centroids
+from .models import Room
+
+# Room fields read from feature properties or CSV columns, with their conversion
+PROPERTY_FIELDS = {
+	'name': str,
+	'type': lambda value: str(value).strip().upper(),
+	'floor': lambda value: _integer(value),
+	'crowd_factor': float,
+	'popularity_factor': float,
+	'occupants': float,
+	'area': float,
+}
+
+_WHITESPACE = re.compile(r'\s*')
+# Characters that delimit JSON values inside arrays/objects, and at the level being read
+_NESTED = re.compile(r'["{}\[\]]')
+_TOP_LEVEL = re.compile(r'["{}\[\],:]')
+# String characters up to the closing quote, or a backslash that ends the text
+_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.DOTALL)
+# Characters that may follow a complete value
+_VALUE_END = frozenset(',:]} \t\r\n')
+_WKT_POLYGON = re.compile(r'\s*POLYGON\s*\(\s*\(([^()]*)\)', re.IGNORECASE)
+
+
+class MalformedFeature(NamedTuple):
+	"""Yielded by read_geojson in place of a feature that could not be read."""
+
+	reason: str
+
+
+@dataclass
+class ImportReport:
+	"""Outcome of a floor plan import.
+
+	rejected holds (index, reason) pairs, where index is the position of the
+	feature or CSV data row in the file, counting from 0.
+	"""
+
+	read: int = 0
+	inserted: int = 0
+	updated: int = 0
+	rejected: list[tuple[int, str]] = field(default_factory=list)
+	seconds: float = 0.0
+
+	@property
+	def rows_per_sec(self) -> float:
+		return self.read / self.seconds if self.seconds > 0 else 0.0
+
+
+def import_geojson(source, max_feature_size: int = 1 << 24, **options) -> ImportReport:
+	"""Import the room polygons of a GeoJSON FeatureCollection, streaming the file.
+
+	Args:
+		source: Path of the file, or a text file object.
+		max_feature_size (int): Characters a feature may take; longer or malformed
+			features are rejected without stopping the import.
+		**options: Passed to import_features.
+	"""
+	with _open(source) as file:
+		return import_features(read_geojson(file, max_feature_size=max_feature_size), **options)
+
+
+def import_csv(source, **options) -> ImportReport:
+	"""Import rooms from a CSV file with one row per room, streaming the file.
+
+	Columns are read like feature properties. The outline is taken from a
+	geometry column, holding a GeoJSON geometry or a WKT POLYGON, or from a
+	borders column holding a JSON list of [longitude, latitude] pairs.
+
+	Args:
+		source: Path of the file, or a text file object.
+		**options: Passed to import_features.
+	"""
+	with _open(source) as file:
+		return import_features(read_csv(file), **options)
+
+
+def import_features(
+	features, batch_size: int = 1000, defaults=None, fields=None, packed: bool = False
+) -> ImportReport:
+	"""Map features to rooms, then validate and upsert them batch by batch.
+
+	Only one batch of rooms is held at a time. Features that cannot be mapped or
+	fail validation are reported in ImportReport.rejected and skipped.
+
+	Args:
+		features: Iterable of GeoJSON-like feature dicts.
+		batch_size (int): Rooms validated and written per bulk write.
+		defaults (dict): Room field values for properties a feature lacks,
+			e.g. {'crowd_factor': 1.0, 'popularity_factor': 1.0}.
+		fields (dict): Room field -> property name, for properties named differently,
+			e.g. {'floor': 'level'}.
+		packed (bool): Store borders packed as a NumPy array instead of as lists.
+	Returns:
+		report (ImportReport): Counts, rejected features and throughput.
+	"""
+	if batch_size < 1:
+		raise ValueError('batch_size must be at least 1')
+	report = ImportReport()
+	start = time.perf_counter()
+	batch = []
+	indices = []
+	for index, feature in enumerate(features):
+		report.read += 1
+		if isinstance(feature, MalformedFeature):
+			report.rejected.append((index, feature.reason))
+			continue
+		try:
+			batch.append(feature_room(feature, defaults, fields, packed))
+			indices.append(index)
+		except (TypeError, ValueError, KeyError, IndexError) as error:
+			report.rejected.append((index, str(error)))
+		if len(batch) >= batch_size:
+			_write(batch, indices, report)
+			batch, indices = [], []
+	if batch:
+		_write(batch, indices, report)
+	report.rejected.sort(key=lambda pair: pair[0])
+	report.seconds = time.perf_counter() - start
+	return report
+
+
+def feature_room(feature: dict, defaults=None, fields=None, packed: bool = False) -> dict:
+	"""Room field values of a GeoJSON feature, ready for Room(**values) or Room.bulk_upsert.
+
+	borders is the outer ring of the polygon without its closing vertex, longitude
+	and latitude its centroid; area is left to Room to compute from the borders
+	unless the feature has one. Features with a valid ObjectId as id keep it, so
+	importing a file again updates its rooms instead of duplicating them.
+
+	Raises:
+		TypeError: The feature has no geometry object.
+		ValueError: The geometry or a property cannot be converted.
+	"""
+	properties = feature.get('properties') or {}
+	fields = fields or {}
+	values = dict(defaults or {})
+	for name, convert in PROPERTY_FIELDS.items():
+		value = properties.get(fields.get(name, name))
+		if value is not None and value != '':
+			try:
+				values[name] = convert(value)
+			except (TypeError, ValueError):
+				raise ValueError(f'Invalid {name}: {value!r}') from None
+
+	ring = _outer_ring(feature.get('geometry'))
+	coords, offsets = pack_borders([ring])
+	values['longitude'], values['latitude'] = polygon_centroids(coords, offsets)[0].tolist()
+	values['borders'] = coords if packed else coords.tolist()
+
+	room_id = feature.get('id', properties.get('id'))
+	if isinstance(room_id, str) and ObjectId.is_valid(room_id):
+		values['_id'] = ObjectId(room_id)
+	return values
+
+
+def read_geojson(file, chunk_size: int = 1 << 16, max_feature_size: int = 1 << 24):
+	"""Yield the features of a GeoJSON FeatureCollection one at a time.
+
+	The file is decoded incrementally, so memory holds one feature and one read
+	chunk rather than the whole collection. Other top-level members are skipped.
+	A feature that is not valid JSON, or longer than max_feature_size characters,
+	is yielded as a MalformedFeature and reading goes on with the next one.
+	"""
+	stream = _JsonStream(file, chunk_size)
+	stream.expect('{')
+	while not stream.consume('}'):
+		key = stream.value(max_feature_size)
+		stream.expect(':')
+		if key == 'features':
+			stream.expect('[')
+			if not stream.consume(']'):
+				yield stream.element(max_feature_size)
+				while not stream.consume(']'):
+					stream.expect(',')
+					yield stream.element(max_feature_size)
+		else:
+			stream.skip()
+		stream.consume(',')
+
+
+def read_csv(file):
+	"""Yield the rows of a CSV file as features, leaving the geometry text unparsed."""
+	for row in csv.DictReader(file):
+		geometry = row.pop('geometry', None) or row.pop('borders', None)
+		yield {'properties': row, 'geometry': geometry}
+
+
+def _write(batch: list, indices: list, report: ImportReport):
+	result = Room.bulk_upsert(batch, chunk_size=len(batch))
+	report.inserted += result.inserted
+	report.updated += result.updated
+	report.rejected.extend((indices[index], str(error)) for index, error in result.errors)
+
+
+def _outer_ring(geometry) -> list:
+	"""The outer ring of a Polygon (or single-polygon MultiPolygon), as given in any format."""
+	if isinstance(geometry, str):
+		geometry = _parse_geometry(geometry)
+	if isinstance(geometry, list):
+		ring = geometry
+	elif not isinstance(geometry, dict):
+		raise TypeError('Feature has no geometry')
+	elif geometry.get('type') == 'Polygon':
+		ring = geometry['coordinates'][0]
+	elif geometry.get('type') == 'MultiPolygon' and len(geometry['coordinates']) == 1:
+		ring = geometry['coordinates'][0][0]
+	else:
+		raise ValueError(f'Unsupported geometry type: {geometry.get("type")!r}')
+	ring = [[float(lon), float(lat)] for lon, lat, *_ in ring]
+	if len(ring) > 1 and ring[0] == ring[-1]:
+		ring.pop()
+	if len(ring) < 3:
+		raise ValueError('Polygon needs at least three distinct vertices')
+	return ring
+
+
+def _parse_geometry(text: str):
+	"""A GeoJSON geometry or [[lon, lat], ...] list in JSON, or a WKT POLYGON."""
+	match = _WKT_POLYGON.match(text)
+	if match:
+		return [point.split() for point in match.group(1).split(',')]
+	try:
+		return json.loads(text)
+	except json.JSONDecodeError:
+		raise ValueError(f'Unreadable geometry: {text[:40]!r}') from None
+
+
+def _integer(value) -> int:
+	number = float(value)
+	if not number.is_integer():
+		raise ValueError(value)
+	return int(number)
+
+
+@contextlib.contextmanager
+def _open(source):
+	if isinstance(source, (str, os.PathLike)):
+		with open(source, encoding='utf-8', newline='') as file:
+			yield file
+	else:
+		yield source
+
+
+class _MalformedValue(ValueError):
+	"""A value that could be skipped, but not decoded."""
+
+
+class _ValueScanner:
+	"""Finds where a JSON value ends in text fed one piece at a time.
+
+	Nesting depth and an open string carry over from one piece to the next, so
+	every character is scanned once however the value is split.
+	"""
+
+	__slots__ = ('depth', 'escaped', 'in_string')
+
+	def __init__(self):
+		self.depth = 0
+		self.in_string = False
+		self.escaped = False
+
+	def end(self, text: str, position: int) -> int | None:
+		"""Index just past the value in text, or None if it goes on past the end of text."""
+		while True:
+			if self.in_string:
+				if self.escaped:
+					if position == len(text):
+						return None
+					position += 1
+					self.escaped = False
+				position = _STRING_BODY.match(text, position).end()
+				if position == len(text):
+					return None
+				if text[position] == '\\':
+					# A backslash ending the text escapes the first character of the next piece
+					self.escaped = True
+					return None
+				self.in_string = False
+				position += 1
+				continue
+			match = (_NESTED if self.depth else _TOP_LEVEL).search(text, position)
+			if match is None:
+				return None
+			char = match.group()
+			position = match.end()
+			if char == '"':
+				self.in_string = True
+			elif char in '{[':
+				self.depth += 1
+			elif char in '}]' and self.depth > 1:
+				self.depth -= 1
+			else:
+				# A value closed at the top level, or one ended by ',', ':' or the enclosing ']'
+				return position if self.depth else match.start()
+
+
+class _JsonStream:
+	"""Incremental JSON reader over a text file, decoding one value at a time."""
+
+	def __init__(self, file, chunk_size: int):
+		self.file = file
+		self.chunk_size = chunk_size
+		self.decoder = json.JSONDecoder()
+		self.buffer = ''
+		self.pos = 0
+		self.eof = False
+
+	def _read(self) -> str:
+		"""The next chunk of the file, or '' at its end."""
+		if self.eof:
+			return ''
+		chunk = self.file.read(self.chunk_size)
+		if not chunk:
+			self.eof = True
+		return chunk
+
+	def _skip_whitespace(self):
+		while True:
+			self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+			if self.pos < len(self.buffer):
+				return
+			# Everything buffered is consumed, so the next chunk replaces it
+			chunk = self._read()
+			if not chunk:
+				return
+			self.buffer, self.pos = chunk, 0
+
+	def consume(self, char: str) -> bool:
+		self._skip_whitespace()
+		if self.buffer.startswith(char, self.pos):
+			self.pos += 1
+			return True
+		return False
+
+	def expect(self, char: str):
+		if not self.consume(char):
+			found = self.buffer[self.pos : self.pos + 20] or 'end of file'
+			raise ValueError(f'Invalid GeoJSON: expected {char!r}, found {found!r}')
+
+	def element(self, max_size: int):
+		"""Decode the next value, or return a MalformedFeature and move past it."""
+		try:
+			return self.value(max_size)
+		except _MalformedValue as error:
+			return MalformedFeature(str(error))
+
+	def value(self, max_size: int):
+		"""Decode the next value, moving past it even if it is malformed.
+
+		A value longer than max_size characters is skipped without being held in memory.
+
+		Raises:
+			ValueError: The value is not valid JSON or is too long, or the file ends inside it.
+		"""
+		self._skip_whitespace()
+		try:
+			value, end = self.decoder.raw_decode(self.buffer, self.pos)
+			# A number cut at the end of a chunk decodes short, e.g. 1. of 1.5, so a
+			# value only counts once the character after it shows it is complete
+			if self.buffer[end : end + 1] in _VALUE_END if end < len(self.buffer) else self.eof:
+				self.pos = end
+				return value
+		except json.JSONDecodeError:
+			pass  # Incomplete or malformed; find where the value ends to tell which
+		text = self._scan(max_size)
+		if text is None:
+			raise _MalformedValue(f'Invalid GeoJSON: value longer than {max_size} characters')
+		try:
+			return json.loads(text)
+		except json.JSONDecodeError as error:
+			raise _MalformedValue(f'Invalid GeoJSON: {error}') from None
+
+	def skip(self):
+		"""Move past the next value without decoding or buffering it."""
+		self._skip_whitespace()
+		self._scan(0)
+
+	def _scan(self, max_size: int) -> str | None:
+		"""Move past the value starting at self.pos, reading as needed, and return its text.
+
+		Chunks read on the way are collected and joined once the value ends, so a
+		value spanning many chunks is not copied per chunk. A value longer than
+		max_size returns None and is dropped as scanning goes on instead of kept.
+
+		Raises:
+			ValueError: The file ends inside the value.
+		"""
+		scanner = _ValueScanner()
+		end = scanner.end(self.buffer, self.pos)
+		if end is not None:
+			start, self.pos = self.pos, end
+			return self.buffer[start:end] if end - start <= max_size else None
+
+		pieces = [self.buffer[self.pos :]]
+		size = len(pieces[0])
+		while True:
+			if size > max_size:
+				pieces.clear()
+			chunk = self._read()
+			if not chunk:
+				if scanner.depth or scanner.in_string:
+					raise ValueError('Invalid GeoJSON: unexpected end of file')
+				# A bare value running to the end of the file
+				self.buffer, self.pos = '', 0
+				return ''.join(pieces) if size <= max_size else None
+			end = scanner.end(chunk, 0)
+			size += len(chunk) if end is None else end
+			if end is None:
+				if size <= max_size:
+					pieces.append(chunk)
+				continue
+			self.buffer, self.pos = chunk, end
+			if size > max_size:
+				return None
+			pieces.append(chunk[:end])
+			return ''.join(pieces)
@@ -0,0 +1,285 @@
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .models import Room, Sensor
+from .models.room import occupants_change
+
+logger = logging.getLogger(__name__)
+
+# Event directions: people moving from rooms[0] to rooms[1] of a sensor, or back
+FORWARD = 0
+BACKWARD = 1
+
+
+def occupancy_update(room_id, delta: float) -> UpdateOne:
+	"""Build an atomic update adding delta to a room's occupants, floored at zero."""
+	return UpdateOne({'_id': room_id}, occupants_change(delta))
+
+
+def flush_occupancy(deltas: dict) -> int:
+	"""Apply room_id -> delta occupancy changes with one unordered bulk write.
+
+	Returns:
+		count (int): Number of room updates sent.
+	"""
+	operations = [occupancy_update(room_id, delta) for room_id, delta in deltas.items() if delta]
+	if operations:
+		Room._get_collection().bulk_write(operations, ordered=False)
+		Room.invalidate_cache(deltas)
+	return len(operations)
+
+
+class SensorEventIngestor:
+	"""Turns sensor crossing events into batched, atomic Room.occupants updates.
+
+	Events are coalesced per sensor while the batching window is open. On flush
+	the sensors are resolved to their room pairs with a single query, the net
+	flows are summed per room, and every room gets one $inc in a bulk write.
+	The room deltas go through an OccupancyBuffer, so deltas whose write failed
+	stay buffered and are written by the next flush.
+	"""
+
+	def __init__(self, window: float = 1.0, max_events: int = 10_000, clock=time.monotonic):
+		"""
+		Args:
+			window (float): Seconds to accumulate events before flushing.
+			max_events (int): Number of buffered events that forces a flush.
+			clock: Callable returning the current time in seconds.
+		"""
+		self.window = window
+		self.max_events = max_events
+		self.clock = clock
+		self.unknown_sensors = set()
+		self._flows = defaultdict(float)
+		self._events = 0
+		self._window_start = None
+		self._sensor_rooms = {}
+		# Only flushed by flush(), which keeps the window and size limits
+		self._pending = OccupancyBuffer(window=math.inf, max_events=math.inf)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.flush()
+
+	def add(self, sensor_id, direction: int, count: float = 1) -> int:
+		"""Buffer one event, flushing if the window or size limit was reached.
+
+		Returns:
+			count (int): Number of room updates written by a triggered flush, else 0.
+		"""
+		if direction not in (FORWARD, BACKWARD):
+			raise ValueError('direction must be FORWARD (0) or BACKWARD (1)')
+		if count < 0:
+			raise ValueError('count must be non-negative')
+		now = self.clock()
+		if self._window_start is None:
+			self._window_start = now
+		self._flows[ObjectId(sensor_id)] += count if direction == FORWARD else -count
+		self._events += 1
+		if self._events >= self.max_events or now - self._window_start >= self.window:
+			return self.flush()
+		return 0
+
+	def ingest(self, events) -> int:
+		"""Consume a stream of (sensor_id, direction, count) events and flush the rest.
+
+		Returns:
+			count (int): Number of room updates written.
+		"""
+		written = 0
+		for sensor_id, direction, count in events:
+			written += self.add(sensor_id, direction, count)
+		return written + self.flush()
+
+	def flush(self) -> int:
+		"""Write all buffered flows to the rooms.
+
+		Flows that could not be written, because resolving the sensors or the
+		bulk write failed, stay buffered for the next flush.
+
+		Returns:
+			count (int): Number of room updates written.
+		"""
+		flows = self._flows
+		self._flows = defaultdict(float)
+		self._events = 0
+		self._window_start = None
+
+		try:
+			self._resolve([sensor_id for sensor_id in flows if sensor_id not in self._sensor_rooms])
+		except Exception:
+			for sensor_id, flow in flows.items():
+				self._flows[sensor_id] += flow
+			raise
+		for sensor_id, flow in flows.items():
+			rooms = self._sensor_rooms.get(sensor_id)
+			if rooms is None:
+				self.unknown_sensors.add(sensor_id)
+				continue
+			self._pending.add(rooms[0], -flow)
+			self._pending.add(rooms[1], flow)
+		return self._pending.flush()
+
+	def forget(self, sensor_id=None):
+		"""Drop cached sensor -> rooms mappings, e.g. after sensors were re-wired."""
+		if sensor_id is None:
+			self._sensor_rooms.clear()
+		else:
+			self._sensor_rooms.pop(ObjectId(sensor_id), None)
+
+	def _resolve(self, sensor_ids: list):
+		if not sensor_ids:
+			return
+		cursor = Sensor._get_collection().find({'_id': {'$in': sensor_ids}}, {'rooms': 1})
+		for document in cursor:
+			rooms = document.get('rooms') or []
+			if len(rooms) == 2:
+				self._sensor_rooms[document['_id']] = (rooms[0], rooms[1])
+
+
+class OccupancyBuffer:
+	"""Write-behind buffer that coalesces Room.occupants deltas per room.
+
+	Deltas are summed in memory and written with flush_occupancy, one update per
+	room in a single bulk write, once the window has passed or max_events deltas
+	are buffered. After start() a background thread also flushes every window
+	seconds, so changes are not held back when events stop. occupants() reads
+	include the deltas not written yet. Use it as a context manager, or call
+	close(), to flush on shutdown.
+
+	Example:
+		with OccupancyBuffer(window=0.5).start() as buffer:
+			buffer.add(room_id, 1)
+	"""
+
+	def __init__(self, window: float = 1.0, max_events: int = 10_000, clock=time.monotonic):
+		"""
+		Args:
+			window (float): Seconds to accumulate deltas before flushing.
+			max_events (int): Number of buffered deltas that forces a flush.
+			clock: Callable returning the current time in seconds.
+		"""
+		self.window = window
+		self.max_events = max_events
+		self.clock = clock
+		self._lock = threading.Lock()
+		# Held while writing, so reads never see a delta both stored and pending
+		self._flush_lock = threading.Lock()
+		self._deltas = defaultdict(float)
+		self._events = 0
+		self._window_start = None
+		self._stop = threading.Event()
+		self._thread = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def add(self, room_id, delta: float) -> int:
+		"""Buffer an occupancy change, flushing if the window or size limit was reached.
+
+		Returns:
+			count (int): Number of room updates written by a triggered flush, else 0.
+		"""
+		room_id = ObjectId(room_id)
+		with self._lock:
+			now = self.clock()
+			if self._window_start is None:
+				self._window_start = now
+			self._deltas[room_id] += delta
+			self._events += 1
+			due = self._events >= self.max_events or now - self._window_start >= self.window
+		return self.flush() if due else 0
+
+	def pending(self, room_id) -> float:
+		"""The buffered delta of a room that is not written yet."""
+		with self._lock:
+			return self._deltas.get(ObjectId(room_id), 0.0)
+
+	def occupants(self, room_ids) -> dict:
+		"""Stored occupants of the rooms plus their buffered deltas, floored at zero.
+
+		Returns:
+			occupants (dict): room id -> occupants; unknown rooms are left out.
+		"""
+		room_ids = [ObjectId(room_id) for room_id in room_ids]
+		with self._flush_lock:
+			cursor = Room._get_collection().find({'_id': {'$in': room_ids}}, {'occupants': 1})
+			stored = {document['_id']: document.get('occupants') or 0.0 for document in cursor}
+			with self._lock:
+				return {
+					room_id: max(0.0, value + self._deltas.get(room_id, 0.0))
+					for room_id, value in stored.items()
+				}
+
+	def flush(self) -> int:
+		"""Write all buffered deltas to the rooms.
+
+		Deltas whose update failed stay buffered for the next flush.
+
+		Returns:
+			count (int): Number of room updates written.
+		"""
+		with self._flush_lock:
+			with self._lock:
+				deltas = self._deltas
+				self._deltas = defaultdict(float)
+				self._events = 0
+				self._window_start = None
+			try:
+				return flush_occupancy(deltas)
+			except BulkWriteError as error:
+				# Only the failed updates; the others were applied
+				sent = [(room_id, delta) for room_id, delta in deltas.items() if delta]
+				failed = [sent[item['index']] for item in error.details.get('writeErrors', ())]
+				self._restore(failed)
+				raise
+			except Exception:
+				self._restore(deltas.items())
+				raise
+
+	def start(self) -> 'OccupancyBuffer':
+		"""Flush every window seconds from a daemon thread until close()."""
+		if self._thread is None:
+			self._stop.clear()
+			self._thread = threading.Thread(target=self._run, name='occupancy-buffer', daemon=True)
+			self._thread.start()
+			atexit.register(self.close)
+		return self
+
+	def close(self) -> int:
+		"""Stop the background thread, if started, and flush the remaining deltas.
+
+		Returns:
+			count (int): Number of room updates written by the final flush.
+		"""
+		if self._thread is not None:
+			self._stop.set()
+			self._thread.join()
+			self._thread = None
+			atexit.unregister(self.close)
+		return self.flush()
+
+	def _run(self):
+		while not self._stop.wait(self.window):
+			try:
+				self.flush()
+			except Exception:
+				logger.exception('Occupancy flush failed, deltas kept for the next flush')
+
+	def _restore(self, deltas):
+		with self._lock:
+			for room_id, delta in deltas:
+				self._deltas[room_id] += delta
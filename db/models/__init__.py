@@ -1,4 +1,6 @@
+from .bulk import BulkResult
+from .occupancy import OccupancyBucket, OccupancyPoint, OccupancySample
 from .room import Room
 from .sensor import Sensor
 
-__all__ = ["Room", "Sensor"]
+__all__ = ["BulkResult", "OccupancyBucket", "OccupancyPoint", "OccupancySample", "Room", "Sensor"]
@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from itertools import islice
+
+from mongoengine import ValidationError
+from mongoengine.errors import FieldDoesNotExist
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+
+@dataclass
+class BulkResult:
+	"""Outcome of a bulk upsert.
+
+	errors holds (index, error) pairs, where index is the position of the
+	rejected record in the input iterable.
+	"""
+
+	inserted: int = 0
+	updated: int = 0
+	errors: list[tuple[int, Exception]] = field(default_factory=list)
+
+
+class BulkMixin:
+	"""Adds batched, validated upserts to a Document class."""
+
+	@classmethod
+	def bulk_upsert(cls, records, chunk_size: int = 1000) -> BulkResult:
+		"""Validate and upsert many documents by _id with unordered bulk writes.
+
+		Args:
+			records: Iterable of documents of this class, or dicts of their fields.
+			chunk_size (int): Number of records validated and written per round trip.
+		Returns:
+			result (BulkResult): Counts of inserted/updated documents and per-record errors.
+		"""
+		if chunk_size < 1:
+			raise ValueError('chunk_size must be at least 1')
+		result = BulkResult()
+		collection = cls._get_collection()
+		records = iter(records)
+		start = 0
+		while chunk := list(islice(records, chunk_size)):
+			cls._bulk_upsert_chunk(collection, chunk, start, result)
+			start += len(chunk)
+		result.errors.sort(key=lambda pair: pair[0])
+		return result
+
+	@classmethod
+	def _bulk_upsert_chunk(cls, collection, chunk, start: int, result: BulkResult):
+		valid, operations = cls._prepare_chunk(chunk, start, result)
+		if not operations:
+			return
+		try:
+			outcome = collection.bulk_write(operations, ordered=False)
+		except BulkWriteError as error:
+			cls._record_write(valid, result, error=error)
+		else:
+			cls._record_write(valid, result, outcome=outcome)
+		cls._after_write([document.pk for document, _ in valid])
+
+	@classmethod
+	def _prepare_chunk(cls, chunk, start: int, result: BulkResult):
+		"""Build and validate a chunk, returning (document, index) pairs and their upserts."""
+		return cls._validate_chunk(*cls._build_chunk(chunk, start, result), result)
+
+	@classmethod
+	def _build_chunk(cls, chunk, start: int, result: BulkResult) -> tuple[list, list]:
+		"""Documents built from a chunk of records and their input indices."""
+		documents = []
+		indices = []
+		for offset, record in enumerate(chunk):
+			try:
+				documents.append(record if isinstance(record, cls) else cls(**record))
+				indices.append(start + offset)
+			except (FieldDoesNotExist, TypeError, ValueError, ValidationError) as error:
+				result.errors.append((start + offset, error))
+		return documents, indices
+
+	@classmethod
+	def _validate_chunk(cls, documents: list, indices: list, result: BulkResult):
+		"""Validate built documents, returning (document, index) pairs and their upserts."""
+		valid = []
+		for document, index, error in zip(documents, indices, cls._validate_batch(documents)):
+			if error is None:
+				valid.append((document, index))
+			else:
+				result.errors.append((index, error))
+		operations = [cls._upsert_operation(document) for document, _ in valid]
+		return valid, operations
+
+	@classmethod
+	def _upsert_operation(cls, document):
+		"""The bulk write operation storing a document under its _id, inserting it if missing."""
+		return ReplaceOne({'_id': document.pk}, document.to_mongo(), upsert=True)
+
+	@staticmethod
+	def _record_write(valid, result: BulkResult, outcome=None, error=None):
+		"""Add a bulk write outcome (or BulkWriteError) to the result."""
+		failed = set()
+		if error is None:
+			inserted, updated = outcome.upserted_count, outcome.matched_count
+		else:
+			details = error.details
+			inserted, updated = details['nUpserted'], details['nMatched']
+			for write_error in details['writeErrors']:
+				failed.add(write_error['index'])
+				result.errors.append(
+					(valid[write_error['index']][1], ValidationError(write_error['errmsg']))
+				)
+		result.inserted += inserted
+		result.updated += updated
+
+		for position, (document, _) in enumerate(valid):
+			if position not in failed:
+				document._mark_saved()
+
+	def _mark_saved(self, update: dict | None = None):
+		"""Mark the document as stored, after an upsert of it or after the given update."""
+		self._created = False
+		self._clear_changed_fields()
+
+	@classmethod
+	def _after_write(cls, ids: list | None):
+		"""Called with the ids of documents written around Document.save, or None if unknown."""
+
+	@classmethod
+	def _before_update(cls, update: dict):
+		"""Called with the keyword arguments of a mongoengine-style update before it is sent."""
+
+	@classmethod
+	def _validate_batch(cls, documents) -> list:
+		"""Validate documents, returning an error or None for each one."""
+		errors = []
+		for document in documents:
+			try:
+				document.validate()
+				errors.append(None)
+			except ValidationError as error:
+				errors.append(error)
+		return errors
@@ -0,0 +1,72 @@
+import numpy as np
+from bson import Binary
+from mongoengine import ListField
+
+from ..geometry import BORDERS_DTYPE, borders_array
+
+
+class BordersField(ListField):
+	"""[lon, lat] borders stored as nested arrays or packed into one BSON Binary.
+
+	NumPy arrays are stored packed, as little-endian float64 pairs, and packed
+	values load as read-only (n, 2) arrays viewing the stored bytes. Lists keep the
+	nested array format, so both formats can live in the same collection.
+	"""
+
+	def __set__(self, instance, value):
+		if isinstance(value, np.ndarray):
+			value = freeze_borders(value)
+		super().__set__(instance, value)
+
+	def to_python(self, value):
+		if isinstance(value, bytes):
+			return borders_array(value)
+		if isinstance(value, np.ndarray):
+			return freeze_borders(value)
+		return super().to_python(value)
+
+	def to_mongo(self, value, use_db_field=True, fields=None):
+		if isinstance(value, np.ndarray):
+			return encode_borders(value)
+		return super().to_mongo(value, use_db_field, fields)
+
+	def prepare_query_value(self, op, value):
+		# Queryset updates and filters store and match arrays packed, like to_mongo
+		if isinstance(value, np.ndarray):
+			return encode_borders(value)
+		return super().prepare_query_value(op, value)
+
+	def validate(self, value):
+		if isinstance(value, np.ndarray):
+			if not valid_borders_array(value, self.min_length or 0):
+				self.error('Packed borders must be an (n, 2) array of finite floats')
+			return
+		super().validate(value)
+
+
+def encode_borders(borders) -> Binary:
+	"""Pack borders into a BSON Binary of little-endian float64 [lon, lat] pairs."""
+	return Binary(np.ascontiguousarray(borders, dtype=BORDERS_DTYPE).tobytes())
+
+
+def freeze_borders(borders: np.ndarray) -> np.ndarray:
+	"""Read-only float64 array of the borders, copied unless it already is one.
+
+	In-place edits would not be tracked as changes, so assigned arrays are frozen.
+	"""
+	if borders.dtype == BORDERS_DTYPE and not borders.flags.writeable:
+		return borders
+	frozen = np.array(borders, dtype=BORDERS_DTYPE)
+	frozen.setflags(write=False)
+	return frozen
+
+
+def valid_borders_array(borders: np.ndarray, min_length: int = 3) -> bool:
+	"""Whether the array holds at least min_length finite float [lon, lat] pairs."""
+	return (
+		borders.dtype.kind == 'f'
+		and borders.ndim == 2
+		and borders.shape[1] == 2
+		and len(borders) >= min_length
+		and bool(np.isfinite(borders).all())
+	)
@@ -0,0 +1,186 @@
+from datetime import UTC, datetime, timedelta
+from typing import ClassVar, NamedTuple
+
+from bson import ObjectId
+from mongoengine import (
+	DateTimeField,
+	Document,
+	EmbeddedDocument,
+	EmbeddedDocumentField,
+	EmbeddedDocumentListField,
+	FloatField,
+	IntField,
+	MapField,
+	ObjectIdField,
+	ReferenceField,
+)
+from pymongo import UpdateOne
+
+from .room import Room
+
+# Every bucket holds the samples of one room for one hour
+BUCKET_SECONDS = 3600
+# Bucket field read for each resolution
+RESOLUTION_FIELDS = {'raw': 'samples', 'minute': 'minutes', 'hour': 'hour'}
+RESOLUTIONS = tuple(RESOLUTION_FIELDS)
+PERIODS = {
+	'raw': timedelta(0),
+	'minute': timedelta(minutes=1),
+	'hour': timedelta(seconds=BUCKET_SECONDS),
+}
+
+
+class OccupancySample(EmbeddedDocument):
+	"""One occupancy reading of the room that owns the bucket."""
+
+	timestamp = DateTimeField(required=True)
+	occupants = FloatField(required=True, min_value=0)
+
+
+class Rollup(EmbeddedDocument):
+	"""Count, sum, min and max of the samples in a minute or hour."""
+
+	count = IntField(default=0)
+	total = FloatField(default=0)
+	min = FloatField()
+	max = FloatField()
+
+
+class OccupancyPoint(NamedTuple):
+	timestamp: datetime
+	min: float
+	max: float
+	avg: float
+	count: int
+
+
+class OccupancyBucket(Document):
+	"""Occupancy history of one room for one hour, with minute and hour rollups.
+
+	Samples are appended with a single upsert that also updates the rollups, so
+	minute and hour queries never read the raw samples.
+	"""
+
+	_id = ObjectIdField(required=False, primary_key=True, default=ObjectId)
+	room = ReferenceField(Room, dbref=False, required=True)
+	start = DateTimeField(required=True)
+	samples = EmbeddedDocumentListField(OccupancySample)
+	# Minute of the hour ('0' to '59') -> rollup of its samples
+	minutes = MapField(EmbeddedDocumentField(Rollup))
+	hour = EmbeddedDocumentField(Rollup)
+
+	meta: ClassVar[dict] = {
+		'indexes': [{'fields': ['room', 'start'], 'unique': True}],
+		'auto_create_index': False,
+	}
+
+	@classmethod
+	def record(cls, room_id, occupants: float, timestamp: datetime | None = None):
+		"""Store one occupancy sample for a room, defaulting to now."""
+		cls.record_many([(room_id, occupants, timestamp)])
+
+	@classmethod
+	def record_many(cls, samples) -> int:
+		"""Store (room_id, occupants, timestamp) samples with one unordered bulk write.
+
+		Returns:
+			count (int): Number of samples written.
+		"""
+		operations = [cls._sample_update(*sample) for sample in samples]
+		if operations:
+			cls._get_collection().bulk_write(operations, ordered=False)
+		return len(operations)
+
+	@classmethod
+	def series(
+		cls, room_ids, start: datetime, end: datetime, resolution: str = 'minute'
+	) -> dict[ObjectId, list[OccupancyPoint]]:
+		"""Occupancy of rooms in [start, end) at 'raw', 'minute' or 'hour' resolution.
+
+		Only the buckets overlapping the range are read, and only their rollups
+		unless raw samples are asked for. Rollup points are returned when their
+		minute or hour overlaps the range; raw points have min == max == avg.
+
+		Returns:
+			series (dict): room id -> points sorted by timestamp; rooms without data are empty.
+		"""
+		if resolution not in RESOLUTIONS:
+			raise ValueError('resolution must be one of: ' + ', '.join(RESOLUTIONS))
+		room_ids = [ObjectId(room_id) for room_id in room_ids]
+		start, end = _utc(start), _utc(end)
+		query = {
+			'room': {'$in': room_ids},
+			'start': {'$gte': _bucket_start(start), '$lt': end},
+		}
+		projection = {'room': 1, 'start': 1, RESOLUTION_FIELDS[resolution]: 1}
+
+		period = PERIODS[resolution]
+		series = {room_id: [] for room_id in room_ids}
+		for bucket in cls._get_collection().find(query, projection):
+			series[bucket['room']].extend(
+				point
+				for point in _points(bucket, resolution)
+				if _overlaps(point.timestamp, period, start, end)
+			)
+		for points in series.values():
+			points.sort()
+		return series
+
+	@staticmethod
+	def _sample_update(room_id, occupants: float, timestamp: datetime | None) -> UpdateOne:
+		if occupants is None or occupants < 0:
+			raise ValueError('occupants must be a non-negative number')
+		occupants = float(occupants)
+		timestamp = _utc(timestamp or datetime.now(UTC))
+		minute = f'minutes.{timestamp.minute}'
+		return UpdateOne(
+			{'room': ObjectId(room_id), 'start': _bucket_start(timestamp)},
+			{
+				'$push': {'samples': {'timestamp': timestamp, 'occupants': occupants}},
+				'$inc': {
+					'hour.count': 1,
+					'hour.total': occupants,
+					f'{minute}.count': 1,
+					f'{minute}.total': occupants,
+				},
+				'$min': {'hour.min': occupants, f'{minute}.min': occupants},
+				'$max': {'hour.max': occupants, f'{minute}.max': occupants},
+			},
+			upsert=True,
+		)
+
+
+def _utc(timestamp: datetime) -> datetime:
+	"""Naive UTC datetime, as stored by MongoDB."""
+	if timestamp.tzinfo is not None:
+		timestamp = timestamp.astimezone(UTC).replace(tzinfo=None)
+	# MongoDB keeps millisecond precision
+	return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+def _bucket_start(timestamp: datetime) -> datetime:
+	return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _overlaps(timestamp: datetime, period: timedelta, start: datetime, end: datetime) -> bool:
+	"""Whether [timestamp, timestamp + period) overlaps [start, end); raw samples are instants."""
+	if not period:
+		return start <= timestamp < end
+	return timestamp < end and timestamp + period > start
+
+
+def _rollup_point(timestamp: datetime, rollup: dict) -> OccupancyPoint:
+	count = rollup['count']
+	return OccupancyPoint(timestamp, rollup['min'], rollup['max'], rollup['total'] / count, count)
+
+
+def _points(bucket: dict, resolution: str):
+	if resolution == 'raw':
+		for sample in bucket.get('samples') or ():
+			occupants = sample['occupants']
+			yield OccupancyPoint(sample['timestamp'], occupants, occupants, occupants, 1)
+	elif resolution == 'minute':
+		for minute, rollup in (bucket.get('minutes') or {}).items():
+			yield _rollup_point(bucket['start'] + timedelta(minutes=int(minute)), rollup)
+	elif bucket.get('hour'):
+		yield _rollup_point(bucket['start'], bucket['hour'])
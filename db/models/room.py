@@ -6,119 +6,655 @@ from mongoengine import (
 	ValidationError,
 	ObjectIdField,
 	ListField,
+	PointField,
 )
+import inspect
+import random
+import time
+import weakref
+from itertools import islice
+from typing import ClassVar
+
+import numpy as np
+from mongoengine.base.document import NON_FIELD_ERRORS
+from mongoengine.context_managers import set_write_concern
+from mongoengine.errors import InvalidQueryError, SaveConditionError
+from mongoengine.queryset import QuerySet
+from mongoengine.queryset.transform import UPDATE_OPERATORS
 from bson import ObjectId
-from pyproj import Geod
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from .bulk import BulkMixin
+from .fields import BordersField, encode_borders, valid_borders_array
+from ..geometry import (
+	borders_array,
+	bounding_boxes,
+	pack_borders,
+	polygon_areas,
+	polygon_centroids,
+)
 
 # Define allowed room types as a constant variable
 ROOM_TYPES = ('MEETING', 'LOBBY', 'OFFICE', 'EXHIBITION', 'RESTROOM', 'SHOP', 'RESTAURANT')
+BORDERS_ERROR = 'Borders must be a list of lists containing two floats'
+# The location 2dsphere index rejects points outside these, so borders are held to them
+BORDERS_LIMITS = (180.0, 90.0)
+BORDERS_RANGE_ERROR = 'Borders must lie within longitude -180 to 180 and latitude -90 to 90'
+# Fields derived from borders by update_geometry
+GEOMETRY_FIELDS = (
+	'area',
+	'centroid_longitude',
+	'centroid_latitude',
+	'min_longitude',
+	'min_latitude',
+	'max_longitude',
+	'max_latitude',
+	'location',
+)
+# Checks the field declarations cannot express, as field -> (validator method, message)
+ROOM_RULES = {
+	'name': ('validate_non_empty', 'Name cannot be empty'),
+}
+
+
+def occupants_change(delta: float):
+	"""Update adding delta to a room's occupants, floored at zero, and bumping its version."""
+	if delta >= 0:
+		return {'$inc': {'occupants': delta, 'version': 1}}
+	# Pipeline update so the floor is applied server-side in the same operation
+	return [
+		{
+			'$set': {
+				'occupants': {'$max': [0, {'$add': [{'$ifNull': ['$occupants', 0]}, delta]}]},
+				'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]},
+			}
+		}
+	]
+
+
+def _bump_version(update: dict):
+	"""Add a version increment to queryset update arguments that do not touch version."""
+	if '__raw__' not in update and not any('version' in key.split('__') for key in update):
+		update['inc__version'] = 1
+
+
+class RoomQuerySet(QuerySet):
+	"""QuerySet that drops cached rooms after updates and deletes made through it.
+
+	Updates also bump the version of the rooms they change, see Room.save_if_current,
+	and set the geometry derived from borders they replace.
+	"""
+
+	def update(self, *args, **kwargs):
+		Room._before_update(kwargs)
+		result = super().update(*args, **kwargs)
+		# The affected ids are unknown without another query, so drop everything
+		Room.invalidate_cache()
+		return result
 
+	def modify(self, *args, **kwargs):
+		Room._before_update(kwargs)
+		result = super().modify(*args, **kwargs)
+		Room.invalidate_cache()
+		return result
 
-class Room(Document):
+	def delete(self, *args, _from_doc_delete=False, **kwargs):
+		result = super().delete(*args, _from_doc_delete=_from_doc_delete, **kwargs)
+		# Room.delete() invalidates its own id
+		if not _from_doc_delete:
+			Room.invalidate_cache()
+		return result
+
+
+class Room(BulkMixin, Document):
 	_id = ObjectIdField(required=False, primary_key=True, default=ObjectId)
 	name = StringField(required=True)
 	type = StringField(required=True, choices=ROOM_TYPES)
 	crowd_factor = FloatField(required=True, min_value=0.1, max_value=2.0)
 	popularity_factor = FloatField(required=True, min_value=0.1, max_value=2.0)
 	occupants = FloatField(min_value=0, default=0)
+	# Derived from borders on save unless set explicitly; clean() runs before the required check
 	area = FloatField(required=True, min_value=0)
-	longitude = FloatField(required=True, min_value=0)
-	latitude = FloatField(required=True, min_value=0)
+	longitude = FloatField(required=True, min_value=-BORDERS_LIMITS[0], max_value=BORDERS_LIMITS[0])
+	latitude = FloatField(required=True, min_value=-BORDERS_LIMITS[1], max_value=BORDERS_LIMITS[1])
 	floor = IntField(required=True, min_value=1, max_value=3)
-	borders = ListField(
+	# Lists are stored as nested arrays, NumPy arrays packed into one Binary
+	borders = BordersField(
 		ListField(FloatField(required=True), required=True, min_length=2, max_length=2),
 		required=True,
 		min_length=3,
 	)
+	# Derived geometry, maintained from borders on save
+	centroid_longitude = FloatField()
+	centroid_latitude = FloatField()
+	min_longitude = FloatField()
+	min_latitude = FloatField()
+	max_longitude = FloatField()
+	max_latitude = FloatField()
+	# GeoJSON point at the centroid, for $near / $geoWithin queries
+	location = PointField(auto_index=False)
+	# Incremented by every write to a stored room made through this package, see
+	# save_if_current; rooms stored without it count as 0, bulk upserts insert at 1
+	version = IntField(min_value=0, default=0)
+
+	meta: ClassVar[dict] = {
+		'indexes': [
+			'name',
+			'type',
+			('floor', 'type'),
+			'(location',
+		],
+		# Created explicitly through Database.ensure_indexes instead of on first query
+		'auto_create_index': False,
+		'queryset_class': RoomQuerySet,
+	}
+
+	# Live db.cache.RoomCache instances, told about writes made through this package
+	_caches = weakref.WeakSet()
+	# Callbacks registered with add_write_listener, bound methods as weakref.WeakMethod
+	_write_listeners: ClassVar[list] = []
+	# Whether area holds the value _set_geometry derived, rather than one assigned to it
+	_area_derived = False
+
+	def __setattr__(self, name, value):
+		if name == 'area':
+			self._area_derived = False
+		super().__setattr__(name, value)
+
+	@classmethod
+	def invalidate_cache(cls, room_ids=None):
+		"""Drop the given rooms, or all rooms, from every RoomCache and tell the write listeners."""
+		for cache in list(cls._caches):
+			cache.invalidate(room_ids)
+		for listener in cls._write_listeners:
+			callback = listener() if isinstance(listener, weakref.WeakMethod) else listener
+			if callback is not None:
+				callback(room_ids)
+
+	@classmethod
+	def add_write_listener(cls, callback):
+		"""Call callback(room_ids) after rooms are written through this package.
+
+		room_ids lists the written rooms, or is None when they are unknown. Bound
+		methods are held weakly, so a listener does not keep its object alive.
+		"""
+		if inspect.ismethod(callback):
+			callback = weakref.WeakMethod(callback)
+		# Replaced rather than appended, so a concurrent invalidation sees a complete list;
+		# listeners whose object is gone are dropped here
+		cls._write_listeners = [
+			*(
+				listener
+				for listener in cls._write_listeners
+				if not isinstance(listener, weakref.WeakMethod) or listener() is not None
+			),
+			callback,
+		]
+
+	@classmethod
+	def _after_write(cls, room_ids: list | None):
+		cls.invalidate_cache(room_ids)
+
+	def save(self, *args, **kwargs):
+		# An explicitly assigned version is stored as is instead of incremented
+		bump = not self._created and bool(self._changed_fields)
+		bump = bump and 'version' not in self._changed_names()
+		result = super().save(*args, **kwargs)
+		if bump:
+			# The update incremented the stored version, so it is at least this
+			self._data['version'] = (self.version or 0) + 1
+		Room.invalidate_cache([self.pk])
+		return result
+
+	def _get_update_doc(self) -> dict:
+		"""The $set/$unset of the changed fields, incrementing the version server-side.
+
+		A $set of the loaded version + 1 could repeat a number written by a concurrent
+		$inc for a different state, letting a stale save_if_current through.
+		"""
+		update = super()._get_update_doc()
+		if update and 'version' not in update.get('$set', {}):
+			update['$inc'] = {'version': 1}
+		return update
+
+	def _save_create(self, doc, force_insert, write_concern):
+		"""Insert a new room; if its _id is already stored, overwrite that room as an update.
+
+		mongoengine would replace the stored room with this one's version, so a stale
+		save_if_current of the replaced room could still pass.
+		"""
+		try:
+			return super()._save_create(doc, True, write_concern)
+		except DuplicateKeyError:
+			if force_insert:
+				raise
+		with set_write_concern(self._get_collection(), write_concern) as collection:
+			stored = collection.find_one_and_update(
+				{'_id': doc['_id']},
+				self._replacement_update(doc),
+				projection={'version': 1},
+				upsert=True,
+				return_document=ReturnDocument.AFTER,
+			)
+		self._data['version'] = stored['version']
+		return doc['_id']
+
+	@classmethod
+	def _replacement_update(cls, doc) -> dict:
+		"""An update making a stored room equal to doc, except that its version is incremented."""
+		doc = dict(doc)
+		doc.pop('_id', None)
+		doc.pop('version', None)
+		update = {'$set': doc, '$inc': {'version': 1}}
+		unset = {
+			field.db_field: ''
+			for field in cls._fields.values()
+			if field.db_field not in doc and field.db_field not in ('_id', 'version')
+		}
+		if unset:
+			update['$unset'] = unset
+		return update
+
+	@classmethod
+	def _upsert_operation(cls, document):
+		return UpdateOne(
+			{'_id': document.pk}, cls._replacement_update(document.to_mongo()), upsert=True
+		)
+
+	def _mark_saved(self, update: dict | None = None):
+		# Upserts always increment the stored version, updates unless they set it
+		if update is None or 'version' in update.get('$inc', {}):
+			self._data['version'] = (self.version or 0) + 1
+		super()._mark_saved(update)
+
+	@classmethod
+	def _before_update(cls, update: dict):
+		cls._derive_geometry(update)
+		_bump_version(update)
+
+	@classmethod
+	def _derive_geometry(cls, update: dict):
+		"""Add the geometry of borders replaced by queryset update arguments.
+
+		Every matched room gets the same borders, so their geometry is computed once.
+		Partial border updates (push__borders, set__borders__0, ...) would leave it
+		stale and raise InvalidQueryError.
+		"""
+		fields = {}
+		for key, value in update.items():
+			path = key.split('__')
+			operator = path.pop(0) if path[0] in UPDATE_OPERATORS else 'set'
+			if path[0] == 'borders' and (operator != 'set' or len(path) > 1):
+				raise InvalidQueryError('Borders can only be replaced as a whole in an update')
+			if operator == 'set' and len(path) == 1:
+				fields[path[0]] = value
+		if 'borders' not in fields:
+			return
+		# An area set in the same update is kept, as on save
+		room = cls(borders=fields['borders'], area=fields.get('area'))
+		room.validate_borders(room._borders(), BORDERS_ERROR)
+		room.update_geometry()
+		for name in GEOMETRY_FIELDS:
+			if name not in fields:
+				update[f'set__{name}'] = room[name]
+
+	def save_if_current(self, **kwargs):
+		"""Save the room only if no other write changed it since it was loaded.
+
+		Raises:
+			SaveConditionError: The stored room has a newer version; nothing was written.
+		"""
+		if self._created:
+			return self.save(**kwargs)
+		version = self.version or 0
+		# Rooms stored before the version field existed have none
+		condition = {'version': version} if version else {'version': {'$in': [None, 0]}}
+		return self.save(save_condition={'__raw__': condition}, **kwargs)
+
+	@classmethod
+	def update_with_retry(cls, room_id, change, retries: int = 5, backoff: float = 0.001):
+		"""Load a room, apply change(room) and save it if no other write intervened.
+
+		On a conflict the room is reloaded and change applied again, up to retries
+		more times, after a jittered exponential backoff. change may run more than
+		once, so it must only depend on the room it is given.
+
+		Returns:
+			room (Room): The room as saved.
+		Raises:
+			SaveConditionError: Every attempt conflicted with another write.
+		"""
+		for attempt in range(retries + 1):
+			room = cls.objects.get(pk=room_id)
+			change(room)
+			try:
+				room.save_if_current()
+				return room
+			except SaveConditionError:
+				if attempt == retries:
+					raise
+				time.sleep(random.uniform(0, backoff * 2**attempt))
+
+	def add_occupants(self, delta: float) -> float:
+		"""Atomically add delta, which may be negative, to the stored occupants, floored at zero.
+
+		Runs as one server-side update, so concurrent calls never lose each other's
+		changes. The room's occupants and version are refreshed from the result.
+
+		Returns:
+			occupants (float): The stored value after the update.
+		"""
+		document = self._get_collection().find_one_and_update(
+			{'_id': self.pk},
+			occupants_change(delta),
+			projection={'occupants': 1, 'version': 1},
+			return_document=ReturnDocument.AFTER,
+		)
+		if document is None:
+			raise self.DoesNotExist(f'Room {self.pk} does not exist')
+		self._data['occupants'] = float(document['occupants'])
+		self._data['version'] = document['version']
+		Room.invalidate_cache([self.pk])
+		return self._data['occupants']
+
+	def delete(self, *args, **kwargs):
+		super().delete(*args, **kwargs)
+		Room.invalidate_cache([self.pk])
+
+	def validate(self, clean=True, checked=None):
+		"""Validate the room, checking each field once.
+
+		Rooms loaded from the database only re-check the fields changed since they
+		were loaded. Borders are checked by validate_borders alone instead of also
+		by the nested ListField/FloatField validators.
+
+		Args:
+			clean (bool): Run clean() first, which checks borders and derives the geometry.
+			checked (dict): Fields the caller already checked, as name -> the
+				ValidationError found or None; they are reported, not checked again.
+		"""
+		errors = {}
+		if clean:
+			try:
+				self.clean()
+			except ValidationError as error:
+				errors[NON_FIELD_ERRORS] = error
+
+		checked = checked or {}
+		for name in self._fields_to_validate():
+			if name in checked:
+				if checked[name] is not None:
+					errors[name] = checked[name]
+				continue
+			field = self._fields[name]
+			value = self._data.get(name)
+			try:
+				if value is None:
+					if field.required:
+						raise ValidationError('Field is required', field_name=name)
+				elif name == 'borders':
+					# clean() already checked them before deriving the geometry
+					if not clean:
+						self.validate_borders(value, BORDERS_ERROR)
+				else:
+					field._validate(value)
+			except ValidationError as error:
+				errors[name] = error.errors or error
+			except (ValueError, AttributeError, AssertionError) as error:
+				errors[name] = error
+
+		if errors:
+			raise ValidationError(f'ValidationError ({self._class_name}:{self.pk}) ', errors=errors)
 
 	def clean(self):
 		"""Custom validation rules."""
 		super().clean()
+		if self.borders_changed():
+			self.validate_borders(self._borders(), BORDERS_ERROR)
+			self.update_geometry()
 		self.run_validations()
 
-	def run_validations(self):
-		"""Run all validation rules."""
-		validations = [
-			(self.name, self.validate_non_empty, 'Name cannot be empty'),
-			(self.type, self.validate_choice, 'Type must be one of: ' + ', '.join(ROOM_TYPES)),
-			(
-				self.crowd_factor,
-				self.validate_non_negative_number,
-				'Crowd factor must be a non-negative number between 0.1 and 2.0',
-			),
-			(
-				self.popularity_factor,
-				self.validate_non_negative_number,
-				'Popularity factor must be a non-negative number between 0.1 and 2.0',
-			),
-			(self.area, self.validate_non_negative_number, 'Area must be a non-negative number'),
-			(
-				self.occupants,
-				self.validate_non_negative_number,
-				'Occupants must be a non-negative number',
-			),
-			(
-				self.longitude,
-				self.validate_non_negative_number,
-				'Longitude must be a non-negative number',
-			),
-			(
-				self.latitude,
-				self.validate_non_negative_number,
-				'Latitude must be a non-negative number',
-			),
-			(self.floor, self.validate_floor, 'Floor must be an integer from 1 to 3'),
-			(
-				self.borders,
-				self.validate_borders,
-				'Borders must be a list of lists containing two floats',
-			),
+	def _borders(self):
+		"""The stored borders, without the dereferencing pass self.borders makes on first access.
+
+		That pass walks every coordinate looking for references, which borders never hold.
+		"""
+		return self._data.get('borders')
+
+	@property
+	def borders_array(self) -> np.ndarray:
+		"""Borders as an (n, 2) float64 array; packed borders are returned without copying.
+
+		Assign it back (room.borders = room.borders_array) to store the room packed.
+		"""
+		return borders_array(self._borders())
+
+	def _changed_names(self) -> set[str]:
+		"""Database names of the top-level fields changed since the room was loaded.
+
+		Room has no embedded documents, so the paths mongoengine records on assignment
+		are complete; _get_changed_fields() would also walk every border coordinate.
+		"""
+		return {path.split('.', 1)[0] for path in self._changed_fields}
+
+	def _fields_to_validate(self) -> list[str]:
+		"""All fields of a new room, else the fields changed since it was loaded."""
+		if self._created:
+			return self._fields_ordered
+		changed = self._changed_names()
+		return [
+			name for name in self._fields_ordered if self._db_field_map.get(name, name) in changed
 		]
-		for value, validator, error_message in validations:
-			validator(value, error_message)
 
-	def validate_non_empty(self, value, error_message):
-		"""Validate that value is not empty or just whitespace."""
-		if not value or not value.strip():  # type: ignore
-			raise ValidationError(error_message)
+	def borders_changed(self) -> bool:
+		"""Whether borders are new or modified since the room was loaded."""
+		return self._created or 'borders' in self._changed_names()
 
-	def validate_choice(self, value, error_message):
-		"""Validate that value is one of the allowed choices."""
-		if value not in ROOM_TYPES:
-			raise ValidationError(error_message)
+	def update_geometry(self):
+		"""Recompute area, centroid and bounding box from borders.
 
-	def validate_non_negative_number(self, value, error_message):
-		"""Validate value is a number and non-negative."""
-		if value is None or not isinstance(value, (int, float)):
-			raise ValidationError(error_message)
-		if value < 0:
-			raise ValidationError(error_message)
+		An area set explicitly alongside the borders is kept as is.
+		"""
+		coords, offsets = pack_borders([self._borders()])
+		self._set_geometry(
+			polygon_areas(coords, offsets)[0],
+			polygon_centroids(coords, offsets)[0],
+			bounding_boxes(coords, offsets)[0],
+		)
+
+	def _set_geometry(self, area, centroid, bbox):
+		if self._area_derived:
+			# Derived from earlier borders by a previous clean(), so it follows them
+			area_set = False
+		elif self._created:
+			area_set = self.area is not None
+		else:
+			area_set = 'area' in self._changed_names()
+		if not area_set:
+			self.area = round(float(area), 2)
+			self._area_derived = True
+		self.centroid_longitude, self.centroid_latitude = (float(value) for value in centroid)
+		self.location = [self.centroid_longitude, self.centroid_latitude]
+		self.min_longitude, self.min_latitude, self.max_longitude, self.max_latitude = (
+			float(value) for value in bbox
+		)
+
+	@classmethod
+	def _validate_batch(cls, rooms) -> list:
+		"""Validate rooms, computing the geometry of the whole batch in one pass."""
+		pending = []
+		# Per room, the borders result for validate below, so they are checked only here
+		checked = []
+		for room in rooms:
+			if not room.borders_changed():
+				checked.append(None)
+				continue
+			try:
+				room.validate_borders(room._borders(), BORDERS_ERROR)
+				pending.append(room)
+				checked.append({'borders': None})
+			except ValidationError as error:
+				checked.append({'borders': error})
+		if pending:
+			coords, offsets = pack_borders(room._borders() for room in pending)
+			areas = polygon_areas(coords, offsets)
+			centroids = polygon_centroids(coords, offsets)
+			bboxes = bounding_boxes(coords, offsets)
+			for room, area, centroid, bbox in zip(pending, areas, centroids, bboxes):
+				room._set_geometry(area, centroid, bbox)
 
-	def validate_floor(self, value, error_message):
-		"""Validate floor: ensure floor is valid."""
-		if value is None or not isinstance(value, int) or value < 1 or value > 3:
+		errors = []
+		for room, room_checked in zip(rooms, checked):
+			try:
+				# Geometry is already up to date, so skip clean() and run the rules directly
+				room.validate(clean=False, checked=room_checked)
+				room.run_validations()
+				errors.append(None)
+			except ValidationError as error:
+				errors.append(error)
+		return errors
+
+	def run_validations(self, fields=None):
+		"""Run the rules for the given fields, or for the fields that need checking.
+
+		Ranges, choices and required fields are enforced by the field declarations,
+		so only checks those cannot express are run here.
+		"""
+		if fields is None:
+			fields = self._fields_to_validate()
+		for field in fields:
+			rule = ROOM_RULES.get(field)
+			if rule is not None:
+				validator, error_message = rule
+				getattr(self, validator)(getattr(self, field), error_message)
+
+	def validate_non_empty(self, value, error_message):
+		"""Validate that value is not empty or just whitespace."""
+		if not value or not value.strip():  # type: ignore
 			raise ValidationError(error_message)
 
 	def validate_borders(self, value, error_message):
 		"""Validate borders: ensure borders are valid."""
+		if isinstance(value, np.ndarray):
+			if not valid_borders_array(value):
+				raise ValidationError(error_message)
+			if not (np.abs(value) <= BORDERS_LIMITS).all():
+				raise ValidationError(BORDERS_RANGE_ERROR)
+			return
 		if value is None or not isinstance(value, list) or len(value) < 3:
 			raise ValidationError(error_message)
 		for border in value:
 			if not isinstance(border, list) or len(border) != 2:
 				raise ValidationError(error_message)
-			for coord in border:
+			for coord, limit in zip(border, BORDERS_LIMITS):
 				if coord is None or not isinstance(coord, float):
 					raise ValidationError(error_message)
+				if not -limit <= coord <= limit:
+					raise ValidationError(BORDERS_RANGE_ERROR)
 
 	def compute_area(self) -> float:
-		"""Computes geodesic area in square meters from lat/lon borders using pyproj."""
-		if not self.borders or len(self.borders) < 3:
-			return 0.0
-		# WGS84 ellipsoid (standard for lat/lon)
-		geod = Geod(ellps="WGS84")
-		# Extract longitudes and latitudes from borders
-		lons, lats = zip(*self.borders)
-		# Compute area (in square meters); may be negative if polygon is clockwise
-		area, _ = geod.polygon_area_perimeter(lons, lats)
-		return round(abs(area), 2)  # Always return positive area
+		"""Computes the area in square meters from lat/lon borders.
+
+		This is an authalic-sphere approximation (db/geometry.py:polygon_areas), not
+		pyproj's geodesic area. For room-sized polygons it agrees with pyproj's
+		Geod.polygon_area_perimeter to a relative 1e-5, and the result is rounded to
+		0.01 m2. Uses the same pass as compute_areas, so both always agree.
+		"""
+		return self.compute_areas([self])[0]
+
+	@classmethod
+	def compute_areas(cls, rooms) -> list[float]:
+		"""Computes areas as compute_area does, for many rooms in a single vectorised pass.
+
+		Args:
+			rooms: A Room queryset or an iterable of Room instances.
+		Returns:
+			areas (list[float]): Areas in square meters, in the same order as rooms.
+		"""
+		if isinstance(rooms, QuerySet):
+			# Only pull borders from the database instead of building full documents
+			borders_list = rooms.scalar('borders')
+		else:
+			borders_list = (room._borders() for room in rooms)
+		coords, offsets = pack_borders(borders_list)
+		return polygon_areas(coords, offsets).round(2).tolist()
+
+	@classmethod
+	def migrate_borders(cls, packed: bool = True, batch_size: int = 1000) -> int:
+		"""Rewrite stored borders into the packed format, or back into nested arrays.
+
+		Only rooms still in the other format are read, so an interrupted migration
+		can simply be run again. Rooms in either format load the same way meanwhile.
+
+		Returns:
+			count (int): Number of rooms converted.
+		"""
+		collection = cls._get_collection()
+		source = {'borders': {'$type': 'array' if packed else 'binData'}}
+		cursor = collection.find(source, {'borders': 1}, batch_size=batch_size)
+		converted = 0
+		while documents := list(islice(cursor, batch_size)):
+			operations = []
+			for document in documents:
+				points = borders_array(document['borders'])
+				value = encode_borders(points) if packed else points.tolist()
+				operations.append(
+					UpdateOne(
+						{'_id': document['_id'], **source},
+						{'$set': {'borders': value}, '$inc': {'version': 1}},
+					)
+				)
+			collection.bulk_write(operations, ordered=False)
+			cls._after_write([document['_id'] for document in documents])
+			converted += len(operations)
+		return converted
+
+	@classmethod
+	def backfill_geometry(cls, batch_size: int = 1000) -> int:
+		"""Store area, centroid, bounding box and location for rooms saved without them.
+
+		Rooms written before the geometry was derived from borders lack some of these
+		fields; an area they already have is kept. Like migrate_borders, only rooms
+		still missing a field are read, so an interrupted backfill can be run again.
 
+		Returns:
+			count (int): Number of rooms updated.
+		"""
+		collection = cls._get_collection()
+		source = {'$or': [{name: {'$exists': False}} for name in GEOMETRY_FIELDS]}
+		cursor = collection.find(source, {'borders': 1, 'area': 1}, batch_size=batch_size)
+		updated = 0
+		while documents := list(islice(cursor, batch_size)):
+			rooms = [(document, borders_array(document.get('borders'))) for document in documents]
+			# Rooms without usable borders have no geometry to store
+			rooms = [
+				(document, points) for document, points in rooms if valid_borders_array(points)
+			]
+			if not rooms:
+				continue
+			coords, offsets = pack_borders(points for _, points in rooms)
+			areas = polygon_areas(coords, offsets)
+			centroids = polygon_centroids(coords, offsets)
+			bboxes = bounding_boxes(coords, offsets)
+			operations = []
+			for (document, _), area, centroid, bbox in zip(rooms, areas, centroids, bboxes):
+				lon, lat = (float(value) for value in centroid)
+				min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox)
+				fields = {
+					'centroid_longitude': lon,
+					'centroid_latitude': lat,
+					'min_longitude': min_lon,
+					'min_latitude': min_lat,
+					'max_longitude': max_lon,
+					'max_latitude': max_lat,
+					'location': {'type': 'Point', 'coordinates': [lon, lat]},
+				}
+				if document.get('area') is None:
+					fields['area'] = round(float(area), 2)
+				operations.append(
+					UpdateOne({'_id': document['_id']}, {'$set': fields, '$inc': {'version': 1}})
+				)
+			collection.bulk_write(operations, ordered=False)
+			cls._after_write([document['_id'] for document, _ in rooms])
+			updated += len(operations)
+		return updated
@@ -7,12 +7,15 @@ from mongoengine import (
 	FloatField,
 	ObjectIdField,
 )
+from mongoengine.base import BaseList
 from mongoengine.fields import BooleanField
+from .bulk import BulkMixin
 from .room import Room
-from bson import ObjectId
+from bson import DBRef, ObjectId
+from typing import ClassVar
 
 
-class Sensor(Document):
+class Sensor(BulkMixin, Document):
 	_id = ObjectIdField(required=False, primary_key=True, default=ObjectId)
 	name = StringField(required=True)
 	rooms = ListField(ReferenceField(Room, dbref=False), required=True, min_length=2, max_length=2)
@@ -20,6 +23,12 @@ class Sensor(Document):
 	longitude = FloatField(required=True)
 	is_vertical = BooleanField(required=True)
 
+	meta: ClassVar[dict] = {
+		# rooms is a list, so this is a multikey index serving Sensor.objects(rooms=room)
+		'indexes': ['rooms', 'name'],
+		'auto_create_index': False,
+	}
+
 	def clean(self):
 		"""Custom validation rules."""
 		self.validate_name()
@@ -34,14 +43,83 @@ class Sensor(Document):
 			raise ValidationError('Name cannot be empty')
 
 	def validate_rooms(self):
-		"""Validate rooms: ensure each room is a valid Room instance."""
-		if self.rooms:
-			for room in self.rooms:  # type: ignore
+		"""Validate rooms: ensure each room is a Room instance or the id of a stored room.
+
+		Room ids are resolved with one query unless prefetch_rooms already did it,
+		as _validate_batch does for a whole batch.
+		"""
+		if self._data.get('rooms'):
+			Sensor.prefetch_rooms([self])
+			for room in self._data['rooms']:
 				if not isinstance(room, Room):
-					raise ValidationError('Each room must be a valid Room instance')
+					raise ValidationError(f'Room {self._room_id(room)} does not exist')
+
+	@classmethod
+	def _validate_batch(cls, documents) -> list:
+		"""Validate sensors, resolving the rooms of the whole batch with one query."""
+		cls.prefetch_rooms(documents)
+		return super()._validate_batch(documents)
 
 	def validate_coordinates(self, value, field_name: str):
 		"""Validate latitude: ensure lat is valid"""
 		if value is None or not isinstance(value, float):
 			raise ValidationError(f'{field_name} must be a non-empty float')
 
+	@classmethod
+	def load_with_rooms(cls, *args, **filters) -> list['Sensor']:
+		"""Load sensors matching the filters with their rooms in two queries."""
+		return cls.prefetch_rooms(cls.objects(*args, **filters))
+
+	@classmethod
+	def prefetch_rooms(cls, sensors, rooms=None, fetch_missing: bool = True) -> list['Sensor']:
+		"""Resolve the rooms of many sensors with a single $in query.
+
+		Sensors whose rooms are already resolved are left as they are, and rooms
+		already held as Room instances are kept.
+
+		Args:
+			sensors: Iterable of sensors whose rooms have not been accessed yet.
+			rooms: Optional iterable of already loaded rooms to reuse instead of fetching.
+			fetch_missing (bool): Query the rooms not given in rooms; if False they are
+				treated as deleted and left as references.
+		Returns:
+			sensors (list[Sensor]): The sensors, with rooms wired up in memory.
+		"""
+		sensors = list(sensors)
+		pending = [
+			sensor
+			for sensor in sensors
+			if not getattr(sensor._data.get('rooms'), '_dereferenced', False)
+		]
+		room_map = {room.pk: room for room in rooms or ()}
+		missing = set()
+		for sensor in pending:
+			for ref in sensor._data.get('rooms') or ():
+				room_id = cls._room_id(ref)
+				if not isinstance(ref, Room) and room_id not in room_map:
+					missing.add(room_id)
+		if missing and fetch_missing:
+			room_map.update((room.pk, room) for room in Room.objects(pk__in=list(missing)))
+
+		for sensor in pending:
+			refs = sensor._data.get('rooms') or ()
+			# Keep references whose room no longer exists, like mongoengine's own dereferencing
+			resolved = BaseList(
+				[
+					ref if isinstance(ref, Room) else room_map.get(cls._room_id(ref), ref)
+					for ref in refs
+				],
+				sensor,
+				'rooms',
+			)
+			resolved._dereferenced = True
+			sensor._data['rooms'] = resolved
+		return sensors
+
+	@staticmethod
+	def _room_id(ref):
+		if isinstance(ref, Room):
+			return ref.pk
+		if isinstance(ref, DBRef):
+			return ref.id
+		return ref
@@ -0,0 +1,252 @@
+import contextlib
+import contextvars
+import logging
+import threading
+from collections import defaultdict, deque
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Logical operation the current thread or task is running, see QueryMonitor.operation
+_operation = contextvars.ContextVar('db_operation', default=None)
+
+
+class _Histogram:
+	__slots__ = ('buckets', 'count', 'failures', 'slow', 'total')
+
+	def __init__(self):
+		self.buckets = [0] * len(LATENCY_BUCKETS)
+		self.count = 0
+		self.total = 0.0
+		self.failures = 0
+		self.slow = 0
+
+	def observe(self, seconds: float):
+		self.count += 1
+		self.total += seconds
+		for i, bound in enumerate(LATENCY_BUCKETS):
+			if seconds <= bound:
+				self.buckets[i] += 1
+				break
+
+
+class QueryMonitor(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+	"""Opt-in pymongo command and connection pool instrumentation.
+
+	Pass it to Database(monitor=...) before the alias connects. It keeps a latency
+	histogram per (collection, command), counts round trips per logical operation,
+	logs and keeps the most recent commands slower than slow_threshold, and tracks
+	pool checkouts. Read the data with snapshot() or prometheus().
+
+	Example:
+		monitor = QueryMonitor(slow_threshold=0.05)
+		Database(monitor=monitor)
+		with monitor.operation('dashboard'):
+			Room.objects(floor=2).count()
+		print(monitor.prometheus())
+	"""
+
+	def __init__(self, slow_threshold: float = 0.1, max_slow: int = 100):
+		"""
+		Args:
+			slow_threshold (float): Seconds above which a command is reported as slow.
+			max_slow (int): Number of most recent slow commands kept for snapshot().
+		"""
+		self.slow_threshold = slow_threshold
+		self.slow_commands = deque(maxlen=max_slow)
+		self._lock = threading.Lock()
+		self._histograms = defaultdict(_Histogram)
+		self._operations = defaultdict(lambda: {'calls': 0, 'commands': 0})
+		self._pending = {}
+		self._pool = dict.fromkeys(
+			('created', 'closed', 'checkouts', 'checkout_failures', 'cleared', 'checked_out'), 0
+		)
+
+	@contextlib.contextmanager
+	def operation(self, name: str):
+		"""Attribute the commands run inside the block to a named logical operation."""
+		token = _operation.set(name)
+		with self._lock:
+			self._operations[name]['calls'] += 1
+		try:
+			yield
+		finally:
+			_operation.reset(token)
+
+	def reset(self):
+		"""Forget everything recorded so far."""
+		with self._lock:
+			self._histograms.clear()
+			self._operations.clear()
+			self.slow_commands.clear()
+			for key in self._pool:
+				self._pool[key] = 0
+
+	# Command events
+
+	def started(self, event):
+		collection = event.command.get(event.command_name)
+		if event.command_name == 'getMore':
+			collection = event.command.get('collection')
+		operation = _operation.get()
+		with self._lock:
+			self._pending[event.request_id, event.connection_id] = (
+				collection if isinstance(collection, str) else '',
+				operation,
+			)
+			if operation is not None:
+				self._operations[operation]['commands'] += 1
+
+	def succeeded(self, event):
+		self._finish(event, failed=False)
+
+	def failed(self, event):
+		self._finish(event, failed=True)
+
+	def _finish(self, event, failed: bool):
+		seconds = event.duration_micros / 1e6
+		with self._lock:
+			collection, operation = self._pending.pop(
+				(event.request_id, event.connection_id), ('', None)
+			)
+			histogram = self._histograms[collection, event.command_name]
+			histogram.observe(seconds)
+			histogram.failures += failed
+			slow = seconds >= self.slow_threshold
+			if slow:
+				histogram.slow += 1
+				self.slow_commands.append(
+					{
+						'collection': collection,
+						'command': event.command_name,
+						'seconds': seconds,
+						'operation': operation,
+						'failed': failed,
+					}
+				)
+		if slow:
+			logger.warning(
+				'Slow %s on %s: %.1f ms (operation: %s)',
+				event.command_name,
+				collection or event.database_name,
+				seconds * 1000,
+				operation,
+			)
+
+	# Connection pool events
+
+	def _count(self, key: str, change: int = 1):
+		with self._lock:
+			self._pool[key] += change
+
+	def pool_created(self, event):
+		pass
+
+	def pool_ready(self, event):
+		pass
+
+	def pool_cleared(self, event):
+		self._count('cleared')
+
+	def pool_closed(self, event):
+		pass
+
+	def connection_created(self, event):
+		self._count('created')
+
+	def connection_ready(self, event):
+		pass
+
+	def connection_closed(self, event):
+		self._count('closed')
+
+	def connection_check_out_started(self, event):
+		pass
+
+	def connection_check_out_failed(self, event):
+		self._count('checkout_failures')
+
+	def connection_checked_out(self, event):
+		with self._lock:
+			self._pool['checkouts'] += 1
+			self._pool['checked_out'] += 1
+
+	def connection_checked_in(self, event):
+		self._count('checked_out', -1)
+
+	# Export
+
+	def snapshot(self) -> dict:
+		"""All recorded data as plain dicts and lists, e.g. for a JSON endpoint."""
+		with self._lock:
+			commands = [
+				{
+					'collection': collection,
+					'command': command,
+					'count': histogram.count,
+					'seconds': histogram.total,
+					'failures': histogram.failures,
+					'slow': histogram.slow,
+					'buckets': dict(zip(LATENCY_BUCKETS, histogram.buckets)),
+				}
+				for (collection, command), histogram in sorted(self._histograms.items())
+			]
+			operations = {
+				name: {
+					**counts,
+					'round_trips': counts['commands'] / counts['calls'] if counts['calls'] else 0.0,
+				}
+				for name, counts in sorted(self._operations.items())
+			}
+			return {
+				'commands': commands,
+				'operations': operations,
+				'slow_commands': list(self.slow_commands),
+				'pool': dict(self._pool),
+			}
+
+	def prometheus(self) -> str:
+		"""All recorded data in the Prometheus text exposition format."""
+		snapshot = self.snapshot()
+		lines = [
+			'# HELP db_command_duration_seconds MongoDB command latency.',
+			'# TYPE db_command_duration_seconds histogram',
+		]
+		for item in snapshot['commands']:
+			labels = f'collection="{item["collection"]}",command="{item["command"]}"'
+			cumulative = 0
+			for bound, count in item['buckets'].items():
+				cumulative += count
+				lines.append(
+					f'db_command_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+				)
+			lines.append(
+				f'db_command_duration_seconds_bucket{{{labels},le="+Inf"}} {item["count"]}'
+			)
+			lines.append(f'db_command_duration_seconds_sum{{{labels}}} {item["seconds"]}')
+			lines.append(f'db_command_duration_seconds_count{{{labels}}} {item["count"]}')
+		for name, kind, key in (
+			('db_command_failures_total', 'counter', 'failures'),
+			('db_slow_commands_total', 'counter', 'slow'),
+		):
+			lines.append(f'# TYPE {name} {kind}')
+			for item in snapshot['commands']:
+				labels = f'collection="{item["collection"]}",command="{item["command"]}"'
+				lines.append(f'{name}{{{labels}}} {item[key]}')
+		for name, key in (
+			('db_operation_calls_total', 'calls'),
+			('db_operation_commands_total', 'commands'),
+		):
+			lines.append(f'# TYPE {name} counter')
+			for operation, counts in snapshot['operations'].items():
+				lines.append(f'{name}{{operation="{operation}"}} {counts[key]}')
+		for key, value in snapshot['pool'].items():
+			kind = 'gauge' if key == 'checked_out' else 'counter'
+			name = f'db_pool_{key}' if kind == 'gauge' else f'db_pool_{key}_total'
+			lines.append(f'# TYPE {name} {kind}')
+			lines.append(f'{name} {value}')
+		return '\n'.join(lines) + '\n'
@@ -0,0 +1,95 @@
+from typing import NamedTuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+class Page(NamedTuple):
+	"""One page of a listing; pass next_cursor back to get the following page."""
+
+	items: list
+	next_cursor: str | None
+
+
+def iter_batches(model, batch_size: int = 1000, fields=None, raw: bool = False, **filters):
+	"""Walk the documents matching mongoengine-style filters in _id order, batch by batch.
+
+	Every batch is its own query starting after the last _id seen, so no server
+	cursor stays open, each batch costs the same however deep the walk is, and
+	only one batch is held in memory. Documents are not kept in a result cache.
+
+	Args:
+		model: Document class to read, e.g. Room or Sensor.
+		batch_size (int): Documents per query and per yielded batch.
+		fields: Names of the fields to load, or None for all of them.
+		raw (bool): Yield pymongo dicts instead of documents.
+	Yields:
+		batch (list): Up to batch_size documents, or dicts when raw.
+	"""
+	if batch_size < 1:
+		raise ValueError('batch_size must be at least 1')
+	last_id = None
+	while True:
+		batch = _fetch(model, last_id, batch_size, fields, raw, filters)
+		if not batch:
+			return
+		yield batch
+		if len(batch) < batch_size:
+			return
+		last_id = _id_of(batch[-1], raw)
+
+
+def iter_documents(model, batch_size: int = 1000, fields=None, raw: bool = False, **filters):
+	"""Like iter_batches, but yields the documents one by one."""
+	for batch in iter_batches(model, batch_size, fields, raw, **filters):
+		yield from batch
+
+
+def page(
+	model, cursor: str | None = None, limit: int = 50, fields=None, raw: bool = False, **filters
+) -> Page:
+	"""One page of a keyset-paginated listing in _id order, e.g. for an HTTP endpoint.
+
+	Unlike skip-based paging, every page is one indexed range query, so deep pages
+	are as fast as the first and rooms added meanwhile do not shift the pages.
+
+	Args:
+		cursor (str | None): next_cursor of the previous page, or None for the first page.
+		limit (int): Maximum number of items on the page.
+	Returns:
+		page (Page): The items and the cursor of the next page, None on the last page.
+	"""
+	if limit < 1:
+		raise ValueError('limit must be at least 1')
+	after = decode_cursor(cursor) if cursor else None
+	# One extra document tells whether another page follows
+	items = _fetch(model, after, limit + 1, fields, raw, filters)
+	if len(items) <= limit:
+		return Page(items, None)
+	items = items[:limit]
+	return Page(items, encode_cursor(_id_of(items[-1], raw)))
+
+
+def encode_cursor(last_id) -> str:
+	return str(last_id)
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+	try:
+		return ObjectId(cursor)
+	except (InvalidId, TypeError):
+		raise ValueError(f'Invalid page cursor: {cursor!r}') from None
+
+
+def _fetch(model, after, limit: int, fields, raw: bool, filters: dict) -> list:
+	queryset = model.objects(**filters).no_cache()
+	if after is not None:
+		queryset = queryset.filter(pk__gt=after)
+	if fields:
+		queryset = queryset.only(*fields)
+	queryset = queryset.order_by('pk').limit(limit)
+	return list(queryset.as_pymongo() if raw else queryset)
+
+
+def _id_of(item, raw: bool):
+	return item['_id'] if raw else item.pk
@@ -0,0 +1,222 @@
+import heapq
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from .geometry import EARTH_RADIUS, haversine
+from .graph import BuildingGraph
+
+# Landmarks whose bounds each route query checks, out of Router.landmarks
+ACTIVE_LANDMARKS = 4
+
+
+class Route(NamedTuple):
+	rooms: list
+	cost: float
+
+
+class Router:
+	"""Least-crowded routes between rooms over a BuildingGraph snapshot.
+
+	Moving into room v along a sensor edge costs the distance between the two
+	rooms (plus vertical_cost for stairs/elevators), scaled by how crowded v is:
+
+		cost = distance * (1 + crowd_weight * popularity_factor * crowd_factor * occupants / area)
+
+	The multiplier is never below 1, so the straight-line distance to the target
+	is an admissible A* heuristic, but crowds make it loose. refresh() therefore
+	also computes exact costs to and from a few landmark rooms, which by the
+	triangle inequality bound the cost to the target including crowds (ALT).
+	A* uses those bounds, or the straight-line one without landmarks, so
+	returned routes stay optimal.
+
+	Throughput depends on route length. At 10k rooms (benchmarks/routing_bench.py)
+	a Router answers thousands of short routes per second, between rooms a few
+	sensors apart, but only a few hundred cross-building routes, which search
+	hundreds of rooms each even with landmarks.
+	"""
+
+	def __init__(
+		self,
+		graph: BuildingGraph,
+		crowd_weight: float = 1.0,
+		vertical_cost: float = 10.0,
+		min_area: float = 1.0,
+		landmarks: int = 8,
+	):
+		"""
+		Args:
+			graph (BuildingGraph): Snapshot to route over.
+			crowd_weight (float): How strongly crowding is penalised; 0 gives shortest paths.
+			vertical_cost (float): Extra cost in meters for edges of vertical sensors.
+			min_area (float): Lower bound on room area, to keep density finite.
+			landmarks (int): Landmark rooms for the ALT bound; refresh() runs two
+				Dijkstra searches per landmark, 0 leaves only the straight-line bound.
+		"""
+		self.graph = graph
+		self.crowd_weight = crowd_weight
+		self.vertical_cost = vertical_cost
+		self.min_area = min_area
+		self.landmarks = landmarks
+		self.refresh()
+
+	def refresh(self):
+		"""Recompute edge and landmark costs, e.g. after graph.refresh_rooms() loaded new occupancy."""
+		graph = self.graph
+		rooms = graph.rooms
+		occupants = np.nan_to_num(rooms['occupants'], nan=0.0)
+		area = np.maximum(np.nan_to_num(rooms['area'], nan=0.0), self.min_area)
+		density = (
+			occupants
+			* np.nan_to_num(rooms['crowd_factor'], nan=1.0)
+			* np.nan_to_num(rooms['popularity_factor'], nan=1.0)
+			/ area
+		)
+
+		sources = np.repeat(np.arange(graph.n_rooms), np.diff(graph.indptr))
+		targets = graph.indices
+		self._lons = np.nan_to_num(rooms['longitude'])
+		self._lats = np.nan_to_num(rooms['latitude'])
+		distance = haversine(
+			self._lons[sources], self._lats[sources], self._lons[targets], self._lats[targets]
+		)
+		distance = distance + self.vertical_cost * graph.edge_vertical
+		weights = distance * (1 + self.crowd_weight * density[targets])
+		# Every sensor is stored in both directions with the same distance, so the edge
+		# i -> j of the reversed graph costs what entering i from j costs
+		reverse_weights = distance * (1 + self.crowd_weight * density[sources])
+
+		# Room positions in 3D on a sphere of EARTH_RADIUS: the straight chord between
+		# two rooms is never longer than their great-circle distance, so it is an
+		# admissible heuristic that costs one sqrt instead of haversine's trigonometry
+		lon_rad, lat_rad = np.radians(self._lons), np.radians(self._lats)
+		self._x = (EARTH_RADIUS * np.cos(lat_rad) * np.cos(lon_rad)).tolist()
+		self._y = (EARTH_RADIUS * np.cos(lat_rad) * np.sin(lon_rad)).tolist()
+		self._z = (EARTH_RADIUS * np.sin(lat_rad)).tolist()
+		# Plain lists index much faster than arrays inside the search loop
+		self._indptr = graph.indptr.tolist()
+		self._indices = targets.tolist()
+		self._weights = weights.tolist()
+		self._reverse_weights = reverse_weights.tolist()
+		self._select_landmarks()
+
+	def _select_landmarks(self):
+		"""Pick landmarks far apart and store the exact costs to and from each.
+
+		Each new landmark is the room farthest from the landmarks so far, which
+		puts them on the edges of the building where their bounds are tightest.
+		Rooms unreachable from all landmarks so far count as farthest, so every
+		connected part of the building gets a landmark before any gets a second.
+		"""
+		self._from_landmark = []
+		self._to_landmark = []
+		n_rooms = len(self._indptr) - 1
+		if n_rooms == 0:
+			return
+		costs = np.asarray(self._costs_from(0, self._weights))
+		landmark = int(np.argmax(np.where(np.isfinite(costs), costs, -1.0)))
+		nearest = np.full(n_rooms, math.inf)
+		for _ in range(min(self.landmarks, n_rooms)):
+			from_landmark = self._costs_from(landmark, self._weights)
+			self._from_landmark.append(from_landmark)
+			self._to_landmark.append(self._costs_from(landmark, self._reverse_weights))
+			nearest = np.minimum(nearest, from_landmark)
+			landmark = int(np.argmax(nearest))
+
+	def _costs_from(self, source: int, weights: list) -> list:
+		"""Dijkstra costs from source to every room over the given edge weights."""
+		indptr, indices = self._indptr, self._indices
+		costs = [math.inf] * (len(indptr) - 1)
+		costs[source] = 0.0
+		heap = [(0.0, source)]
+		pop, push = heapq.heappop, heapq.heappush
+		while heap:
+			cost, node = pop(heap)
+			if cost > costs[node]:
+				continue
+			for edge in range(indptr[node], indptr[node + 1]):
+				neighbor = indices[edge]
+				new_cost = cost + weights[edge]
+				if new_cost < costs[neighbor]:
+					costs[neighbor] = new_cost
+					push(heap, (new_cost, neighbor))
+		return costs
+
+	def _active_landmarks(self, source: int, target: int) -> list:
+		"""The landmarks with the best bounds at source, for the search loop.
+
+		Checking a few landmarks per room reached is cheaper than checking all of
+		them. Each is a (to landmark, to landmark from target, from landmark, from
+		landmark to target) tuple.
+		"""
+		bounds = []
+		for to_landmark, from_landmark in zip(self._to_landmark, self._from_landmark):
+			if math.isinf(to_landmark[source]) or math.isinf(to_landmark[target]):
+				continue  # Another part of the building, no bound
+			bound = max(
+				to_landmark[source] - to_landmark[target],
+				from_landmark[target] - from_landmark[source],
+			)
+			bounds.append(
+				(bound, (to_landmark, to_landmark[target], from_landmark, from_landmark[target]))
+			)
+		bounds.sort(key=lambda item: item[0], reverse=True)
+		return [landmark for _, landmark in bounds[:ACTIVE_LANDMARKS]]
+
+	def route(self, source_id, target_id) -> Route | None:
+		"""Cheapest route from source to target room, or None if unreachable."""
+		index = self.graph.room_index
+		source, target = index[source_id], index[target_id]
+		indptr, indices, weights = self._indptr, self._indices, self._weights
+		xs, ys, zs = self._x, self._y, self._z
+		target_x, target_y, target_z = xs[target], ys[target], zs[target]
+		sqrt = math.sqrt
+		active = self._active_landmarks(source, target)
+
+		best = [math.inf] * len(xs)
+		best[source] = 0.0
+		previous = {}
+		closed = bytearray(len(xs))
+		heap = [(0.0, 0.0, source)]
+		pop, push = heapq.heappop, heapq.heappush
+		while heap:
+			_, cost, node = pop(heap)
+			if node == target:
+				return Route(self._path(previous, source, target), cost)
+			if closed[node]:
+				continue
+			closed[node] = 1
+			for edge in range(indptr[node], indptr[node + 1]):
+				neighbor = indices[edge]
+				new_cost = cost + weights[edge]
+				if new_cost < best[neighbor]:
+					best[neighbor] = new_cost
+					previous[neighbor] = node
+					# Heuristic computed inline, only for rooms the search reaches
+					if active:
+						bound = 0.0
+						# Only call max() when a bound improves; calls are slow in this loop
+						for to_landmark, to_target, from_landmark, from_target in active:
+							to_bound = to_landmark[neighbor] - to_target
+							from_bound = from_target - from_landmark[neighbor]
+							if to_bound > bound or from_bound > bound:
+								bound = max(to_bound, from_bound)
+					else:
+						dx = xs[neighbor] - target_x
+						dy = ys[neighbor] - target_y
+						dz = zs[neighbor] - target_z
+						bound = sqrt(dx * dx + dy * dy + dz * dz)
+					push(heap, (new_cost + bound, new_cost, neighbor))
+		return None
+
+	def routes(self, pairs) -> list[Route | None]:
+		"""Answer many (source_id, target_id) route queries."""
+		return [self.route(source_id, target_id) for source_id, target_id in pairs]
+
+	def _path(self, previous: dict, source: int, target: int) -> list:
+		path = [target]
+		while path[-1] != source:
+			path.append(previous[path[-1]])
+		room_ids = self.graph.room_ids
+		return [room_ids[i] for i in reversed(path)]
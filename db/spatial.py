@@ -0,0 +1,140 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .geometry import borders_array, points_in_polygon
+from .models import Room
+
+
+class RoomIndex:
+	"""Grid index over room bounding boxes for point-in-room lookups.
+
+	Each room is registered in every (floor, column, row) grid cell its bounding
+	box overlaps. A lookup only tests the polygons of the rooms in the point's
+	cell, so its cost does not grow with the number of rooms in the building.
+	Rooms can be added, moved or removed one at a time without a full rebuild.
+	"""
+
+	def __init__(self, cell_size: float = 1e-4):
+		"""
+		Args:
+			cell_size (float): Grid cell size in degrees (1e-4 is roughly 10 m).
+		"""
+		self.cell_size = cell_size
+		self._rooms = {}
+		self._cells = defaultdict(set)
+
+	@classmethod
+	def load(cls, cell_size: float | None = None, **filters) -> 'RoomIndex':
+		"""Build an index from the stored rooms matching the filters.
+
+		Without a cell_size, the median room extent is used so a typical room
+		covers about one cell.
+		"""
+		query = Room.objects(**filters)._query
+		documents = [
+			(
+				document['_id'],
+				document.get('floor'),
+				borders_array(document['borders']),
+			)
+			for document in Room._get_collection().find(query, {'floor': 1, 'borders': 1})
+			if document.get('borders')
+		]
+		if cell_size is None:
+			extents = [np.ptp(coords, axis=0).max() for _, _, coords in documents]
+			median = float(np.median(extents)) if extents else 0.0
+			cell_size = median if median > 0 else 1e-4
+		index = cls(cell_size)
+		for room_id, floor, coords in documents:
+			index._insert(room_id, floor, coords)
+		return index
+
+	def __len__(self) -> int:
+		return len(self._rooms)
+
+	def add(self, room: Room):
+		"""Insert a room, or move it if it is already indexed."""
+		self.remove(room.pk)
+		coords = room.borders_array
+		if len(coords):
+			self._insert(room.pk, room.floor, coords)
+
+	def remove(self, room_id):
+		"""Drop a room from the index; unknown ids are ignored."""
+		entry = self._rooms.pop(room_id, None)
+		if entry is None:
+			return
+		for cell in self._cells_of(entry[0], entry[1]):
+			members = self._cells[cell]
+			members.discard(room_id)
+			if not members:
+				del self._cells[cell]
+
+	def refresh(self, room_ids):
+		"""Re-read the given rooms from the database; deleted rooms are removed."""
+		room_ids = list(room_ids)
+		for room_id in room_ids:
+			self.remove(room_id)
+		cursor = Room._get_collection().find({'_id': {'$in': room_ids}}, {'floor': 1, 'borders': 1})
+		for document in cursor:
+			if document.get('borders'):
+				coords = borders_array(document['borders'])
+				self._insert(document['_id'], document.get('floor'), coords)
+
+	def locate(self, longitude: float, latitude: float, floor: int | None = None):
+		"""Id of the room containing the point, or None.
+
+		Without a floor, every floor is searched and the lowest match is returned.
+		"""
+		return self.locate_many([longitude], [latitude], None if floor is None else [floor])[0]
+
+	def locate_many(self, longitudes, latitudes, floors=None) -> list:
+		"""Ids of the rooms containing each point (None where no room does)."""
+		longitudes = np.asarray(longitudes, dtype=np.float64)
+		latitudes = np.asarray(latitudes, dtype=np.float64)
+		columns = np.floor(longitudes / self.cell_size).astype(np.int64)
+		rows = np.floor(latitudes / self.cell_size).astype(np.int64)
+		floor_options = sorted({key[0] for key in self._cells}) if floors is None else None
+
+		# Group points by grid cell so each candidate polygon is tested once per cell
+		groups = defaultdict(list)
+		for i, (column, row) in enumerate(zip(columns.tolist(), rows.tolist())):
+			for floor in floor_options if floors is None else [floors[i]]:
+				groups[(floor, column, row)].append(i)
+
+		results = [None] * len(longitudes)
+		for cell, points in groups.items():
+			candidates = self._cells.get(cell)
+			if not candidates:
+				continue
+			points = np.array([i for i in points if results[i] is None], dtype=np.int64)
+			for room_id in sorted(candidates):
+				if len(points) == 0:
+					break
+				_, (min_lon, min_lat, max_lon, max_lat), coords = self._rooms[room_id]
+				xs, ys = longitudes[points], latitudes[points]
+				in_box = (xs >= min_lon) & (xs <= max_lon) & (ys >= min_lat) & (ys <= max_lat)
+				if not in_box.any():
+					continue
+				inside = np.zeros(len(points), dtype=bool)
+				inside[in_box] = points_in_polygon(xs[in_box], ys[in_box], coords)
+				for i in points[inside].tolist():
+					results[i] = room_id
+				points = points[~inside]
+		return results
+
+	def _insert(self, room_id, floor, coords: np.ndarray):
+		coords = coords.reshape(-1, 2)
+		bbox = (*coords.min(axis=0).tolist(), *coords.max(axis=0).tolist())
+		self._rooms[room_id] = (floor, bbox, coords)
+		for cell in self._cells_of(floor, bbox):
+			self._cells[cell].add(room_id)
+
+	def _cells_of(self, floor, bbox):
+		min_lon, min_lat, max_lon, max_lat = bbox
+		size = self.cell_size
+		for column in range(math.floor(min_lon / size), math.floor(max_lon / size) + 1):
+			for row in range(math.floor(min_lat / size), math.floor(max_lat / size) + 1):
+				yield (floor, column, row)
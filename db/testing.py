@@ -0,0 +1,23 @@
+import functools
+
+# Helpers for running the models against mongomock in tests and benchmarks.
+# mongomock is a development requirement only, so it is imported when used.
+
+
+def _drop_sort(method):
+	@functools.wraps(method)
+	def wrapper(self, *args, sort=None, **kwargs):
+		return method(self, *args, **kwargs)
+
+	return wrapper
+
+
+def patch_mongomock():
+	"""mongomock 4.3 predates the sort option pymongo 4.11 passes to bulk operations.
+
+	Patches mongomock to drop that option, so bulk writes run against it.
+	"""
+	from mongomock.collection import BulkOperationBuilder
+
+	BulkOperationBuilder.add_replace = _drop_sort(BulkOperationBuilder.add_replace)
+	BulkOperationBuilder.add_update = _drop_sort(BulkOperationBuilder.add_update)
@@ -0,0 +1,55 @@
+from typing import NamedTuple
+
+from bson import ObjectId
+
+from .models import Room, Sensor
+
+
+class RoomView(NamedTuple):
+	"""Read-only room row built straight from a projected pymongo result.
+
+	Much cheaper to create and hold than a Room document: no field descriptors,
+	change tracking or per-instance dicts. Use Room for anything that writes.
+	"""
+
+	id: ObjectId
+	name: str
+	type: str
+	floor: int
+	occupants: float
+	area: float
+	crowd_factor: float
+	popularity_factor: float
+	longitude: float
+	latitude: float
+
+	@classmethod
+	def find(cls, limit: int = 0, **filters) -> list['RoomView']:
+		"""Rooms matching mongoengine-style filters, e.g. RoomView.find(floor=2)."""
+		return _find(cls, Room, limit, filters)
+
+
+class SensorView(NamedTuple):
+	"""Read-only sensor row; rooms holds the ids of the two connected rooms."""
+
+	id: ObjectId
+	name: str
+	rooms: tuple
+	latitude: float
+	longitude: float
+	is_vertical: bool
+
+	@classmethod
+	def find(cls, limit: int = 0, **filters) -> list['SensorView']:
+		"""Sensors matching mongoengine-style filters, e.g. SensorView.find(rooms=room)."""
+		return [
+			view._replace(rooms=tuple(view.rooms or ()))
+			for view in _find(cls, Sensor, limit, filters)
+		]
+
+
+def _find(view, model, limit: int, filters: dict) -> list:
+	fields = view._fields[1:]
+	projection = dict.fromkeys(fields, 1)
+	cursor = model._get_collection().find(model.objects(**filters)._query, projection, limit=limit)
+	return [view(document['_id'], *map(document.get, fields)) for document in cursor]
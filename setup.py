@@ -3,8 +3,10 @@ from setuptools import setup, find_packages
 setup(
 	name='indoor_crowded_region_detection_database',
 	version='1.1.1',
+	python_requires='>=3.11',
 	packages=find_packages(),
-	install_requires=['pymongo', 'python-dotenv', 'mongoengine', 'pyproj'],
+	install_requires=['pymongo', 'python-dotenv', 'mongoengine', 'numpy'],
+	extras_require={'arrow': ['pyarrow']},
 	include_package_data=True,
 	package_data={
 		'': ['stubs/*.pyi'],
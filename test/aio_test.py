@@ -0,0 +1,354 @@
+import asyncio
+import functools
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from mongoengine.connection import ConnectionFailure
+from mongoengine.errors import SaveConditionError, ValidationError
+
+from db.aio import AsyncModel, add_occupants, load_sensors_with_rooms
+from db.database import Database
+from db.models import Room, Sensor
+
+
+class AsyncCursor:
+	def __init__(self, cursor):
+		self._cursor = cursor
+
+	async def to_list(self, length=None):
+		return list(self._cursor)
+
+
+class AsyncCollection:
+	"""Awaitable wrapper around a mongomock collection."""
+
+	def __init__(self, collection):
+		self._collection = collection
+
+	def find(self, *args, **kwargs):
+		return AsyncCursor(self._collection.find(*args, **kwargs))
+
+	def __getattr__(self, name):
+		method = getattr(self._collection, name)
+
+		async def call(*args, **kwargs):
+			return method(*args, **kwargs)
+
+		return call
+
+
+class AsyncDatabase:
+	def __init__(self, database):
+		self._database = database
+
+	def __getitem__(self, name):
+		return AsyncCollection(self._database[name])
+
+
+class AsyncMockClient:
+	"""Minimal stand-in for pymongo.AsyncMongoClient backed by mongomock."""
+
+	instances = 0
+
+	def __init__(self, uri, **options):
+		AsyncMockClient.instances += 1
+		self.options = options
+		self._client = mongomock.MongoClient(uri)
+
+	async def aconnect(self):
+		pass
+
+	async def close(self):
+		self._client.close()
+
+	def __getitem__(self, name):
+		return AsyncDatabase(self._client[name])
+
+	def get_default_database(self, default=None):
+		return AsyncDatabase(self._client.get_default_database(default))
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup an async mock connection before each test."""
+	asyncio.run(
+		Database.connect_async(
+			uri='mongodb://localhost/mongoenginetest', mongo_client_class=AsyncMockClient
+		)
+	)
+	yield
+	for alias in list(Database._async_settings):
+		asyncio.run(Database.disconnect_async(alias))
+
+
+@pytest.fixture
+def sync_connection():
+	"""A synchronous connection to the data of the async mock client."""
+	store = Database.async_database()._database.client._store
+	connect(
+		db='mongoenginetest',
+		mongo_client_class=functools.partial(mongomock.MongoClient, _store=store),
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def make_room(name='Room', **fields) -> Room:
+	values = {
+		'name': name,
+		'type': 'OFFICE',
+		'crowd_factor': 0.5,
+		'popularity_factor': 0.5,
+		'longitude': 12.34,
+		'latitude': 56.78,
+		'floor': 1,
+		'borders': [[1.1, 1.0], [1.2, 1.0], [1.2, 1.1]],
+	}
+	values.update(fields)
+	return Room(**values)
+
+
+def test_save_and_get():
+	"""Test that saved rooms are validated, derived and read back as documents."""
+
+	async def run():
+		rooms = AsyncModel(Room)
+		room = await rooms.save(make_room())
+		loaded = await rooms.get(room.pk)
+		return room, loaded
+
+	room, loaded = asyncio.run(run())
+	assert isinstance(loaded, Room)
+	assert loaded.name == 'Room'
+	assert loaded.area == room.area > 0
+	assert loaded.location['coordinates'] == room.location
+
+
+def test_save_loaded_room_keeps_concurrent_changes():
+	"""Test that saving a loaded room only writes its changed fields."""
+
+	async def run():
+		rooms = AsyncModel(Room)
+		room = await rooms.save(make_room())
+		loaded = await rooms.get(room.pk)
+		await rooms.update({'pk': room.pk}, set__occupants=7)
+		loaded.name = 'Hall'
+		await rooms.save(loaded)
+		return await rooms.get(room.pk)
+
+	stored = asyncio.run(run())
+	assert stored.name == 'Hall'
+	assert stored.occupants == 7
+
+
+def test_writes_conflict_with_stale_save(sync_connection):
+	"""Test that async saves, updates and bulk upserts bump the version of stored rooms."""
+
+	async def run(room, write):
+		stale = Room.objects.get(pk=room.pk)
+		await write(AsyncModel(Room))
+		stale.name = 'Stale'
+		with pytest.raises(SaveConditionError):
+			stale.save_if_current()
+		return Room.objects.get(pk=room.pk)
+
+	async def save(rooms):
+		loaded = await rooms.get(room.pk)
+		loaded.name = 'Saved'
+		await rooms.save(loaded)
+		assert loaded.version == (await rooms.get(room.pk)).version
+
+	async def update(rooms):
+		await rooms.update({'pk': room.pk}, set__name='Updated')
+
+	async def bulk_upsert(rooms):
+		loaded = await rooms.get(room.pk)
+		loaded.name = 'Upserted'
+		await rooms.bulk_upsert([loaded])
+
+	room = make_room().save()
+	versions = []
+	for write in (save, update, bulk_upsert):
+		stored = asyncio.run(run(room, write))
+		assert stored.name != 'Stale'
+		versions.append(stored.version)
+	assert versions == [1, 2, 3]
+
+
+def test_save_invalid_room_raises():
+	"""Test that async saves apply the same validation as Document.save."""
+	with pytest.raises(ValidationError):
+		asyncio.run(AsyncModel(Room).save(make_room(borders=[[1.1, 1.0]])))
+
+
+def test_find_count_update_delete():
+	"""Test mongoengine-style filters and updates on the async collection."""
+
+	async def run():
+		rooms = AsyncModel(Room)
+		first = await rooms.save(make_room('A', floor=1))
+		await rooms.save(make_room('B', floor=2))
+		found = await rooms.find(floor=2)
+		modified = await rooms.update({'floor__gte': 1}, inc__occupants=3)
+		occupants = sorted(room.occupants for room in await rooms.find())
+		deleted = await rooms.delete(first)
+		return found, modified, occupants, deleted, await rooms.count()
+
+	found, modified, occupants, deleted, count = asyncio.run(run())
+	assert [room.name for room in found] == ['B']
+	assert modified == 2
+	assert occupants == [3, 3]
+	assert deleted == 1
+	assert count == 1
+
+
+def test_update_borders_recomputes_geometry():
+	"""Test that async updates replacing borders also store their derived geometry."""
+
+	async def run():
+		rooms = AsyncModel(Room)
+		room = await rooms.save(make_room())
+		await rooms.update({'pk': room.pk}, set__borders=[[1.1, 1.0], [1.3, 1.0], [1.3, 1.2]])
+		return room, await rooms.get(room.pk)
+
+	room, stored = asyncio.run(run())
+	assert stored.area > room.area
+	assert stored.max_longitude == 1.3
+	assert stored.location['coordinates'] == [stored.centroid_longitude, stored.centroid_latitude]
+
+
+def test_bulk_upsert_reports_errors():
+	"""Test that async bulk upserts validate records like BulkMixin.bulk_upsert."""
+	records = [make_room('A'), {'name': 'Broken'}, make_room('C')]
+	result = asyncio.run(AsyncModel(Room).bulk_upsert(records, chunk_size=2))
+	assert result.inserted == 2
+	assert [index for index, _ in result.errors] == [1]
+
+
+def test_add_occupants_floors_at_zero():
+	"""Test that async occupancy deltas are applied and never go negative."""
+
+	async def run():
+		rooms = AsyncModel(Room)
+		room = await rooms.save(make_room(occupants=2))
+		await add_occupants({room.pk: -5})
+		return await rooms.get(room.pk)
+
+	assert asyncio.run(run()).occupants == 0
+
+
+def test_load_sensors_with_rooms():
+	"""Test that sensors are returned with their rooms already resolved."""
+
+	async def run():
+		first = await AsyncModel(Room).save(make_room('A'))
+		second = await AsyncModel(Room).save(make_room('B'))
+		await AsyncModel(Sensor).save(
+			Sensor(
+				name='S',
+				rooms=[first, second],
+				latitude=56.78,
+				longitude=12.34,
+				is_vertical=False,
+			)
+		)
+		return await load_sensors_with_rooms(name='S')
+
+	(sensor,) = asyncio.run(run())
+	assert [room.name for room in sensor.rooms] == ['A', 'B']
+
+
+def test_load_sensors_with_deleted_room():
+	"""Test that a reference to a deleted room stays unresolved without a synchronous query."""
+
+	async def run():
+		first = await AsyncModel(Room).save(make_room('A'))
+		second = await AsyncModel(Room).save(make_room('B'))
+		await AsyncModel(Sensor).save(
+			Sensor(
+				name='S',
+				rooms=[first, second],
+				latitude=56.78,
+				longitude=12.34,
+				is_vertical=False,
+			)
+		)
+		await AsyncModel(Room).delete(second)
+		return second.pk, await load_sensors_with_rooms(name='S')
+
+	# Only the async connection exists, so a synchronous room query would fail
+	room_id, (sensor,) = asyncio.run(run())
+	first, second = sensor._data['rooms']
+	assert first.name == 'A'
+	assert not isinstance(second, Room)
+	assert Sensor._room_id(second) == room_id
+
+
+def test_save_loaded_sensor_without_sync_connection():
+	"""Test that saving a loaded sensor checks its rooms with the async client only."""
+
+	async def run():
+		first = await AsyncModel(Room).save(make_room('A'))
+		second = await AsyncModel(Room).save(make_room('B'))
+		sensors = AsyncModel(Sensor)
+		await sensors.save(
+			Sensor(name='S', rooms=[first, second], latitude=1.0, longitude=1.0, is_vertical=False)
+		)
+		(loaded,) = await sensors.find(name='S')
+		loaded.name = 'Renamed'
+		await sensors.save(loaded)
+		await AsyncModel(Room).delete(second)
+		(stale,) = await sensors.find(name='Renamed')
+		stale.name = 'Stale'
+		with pytest.raises(ValidationError, match='does not exist'):
+			await sensors.save(stale)
+		records = [
+			{
+				'name': f'S{i}',
+				'rooms': [first.pk, room_id],
+				'latitude': 1.0,
+				'longitude': 1.0,
+				'is_vertical': False,
+			}
+			for i, room_id in enumerate([first.pk, second.pk])
+		]
+		result = await sensors.bulk_upsert(records)
+		return [sensor.name for sensor in await sensors.find()], result
+
+	# Only the async connection exists, so a synchronous room query would fail
+	names, result = asyncio.run(run())
+	assert sorted(names) == ['Renamed', 'S0']
+	assert [index for index, _ in result.errors] == [1]
+
+
+def test_connect_async_once_per_alias():
+	"""Test that connect_async reuses the client of an alias and applies options."""
+	before = AsyncMockClient.instances
+	client = asyncio.run(
+		Database.connect_async(
+			uri='mongodb://localhost/test',
+			alias='async-a',
+			mongo_client_class=AsyncMockClient,
+			max_pool_size=20,
+		)
+	)
+	again = asyncio.run(Database.connect_async(uri='mongodb://localhost/test', alias='async-a'))
+	assert again is client
+	assert AsyncMockClient.instances == before + 1
+	assert client.options == {'maxPoolSize': 20}
+
+
+def test_connect_async_missing_uri(monkeypatch):
+	"""Test that a missing connection string raises a ValueError."""
+	monkeypatch.setattr('db.database.load_dotenv', lambda **kwargs: None)
+	monkeypatch.delenv('MONGO_URL', raising=False)
+	with pytest.raises(ValueError):
+		asyncio.run(Database.connect_async(alias='nowhere'))
+
+
+def test_unknown_alias_raises():
+	"""Test that using an alias without connect_async fails clearly."""
+	with pytest.raises(ConnectionFailure):
+		asyncio.run(AsyncModel(Room, alias='missing').count())
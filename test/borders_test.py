@@ -0,0 +1,160 @@
+import mongomock
+import numpy as np
+import pytest
+from bson import Binary
+from mongoengine import connect, disconnect
+from mongoengine.errors import ValidationError
+
+from db.cache import RoomCache
+from db.models import Room
+
+square_borders = [
+	[12.340000, 56.780000],
+	[12.340180, 56.780000],
+	[12.340180, 56.780090],
+	[12.340000, 56.780090],
+]
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def make_room(borders, name='Packed') -> Room:
+	return Room(
+		name=name,
+		type='OFFICE',
+		crowd_factor=0.5,
+		popularity_factor=0.5,
+		longitude=12.34,
+		latitude=56.78,
+		floor=1,
+		borders=borders,
+	)
+
+
+def stored_borders(room: Room):
+	return Room._get_collection().find_one({'_id': room.pk})['borders']
+
+
+def test_array_borders_are_stored_packed():
+	"""Test that array borders are stored as one Binary of little-endian float64 pairs."""
+	room = make_room(np.array(square_borders)).save()
+	stored = stored_borders(room)
+	assert isinstance(stored, Binary)
+	assert len(stored) == 4 * 2 * 8
+	assert np.frombuffer(stored, dtype='<f8').reshape(-1, 2).tolist() == square_borders
+
+
+def test_queryset_update_stores_array_borders_packed():
+	"""Test that arrays set through a queryset update are packed, as on save."""
+	room = make_room(square_borders).save()
+	Room.objects(pk=room.pk).update(set__borders=np.array(square_borders))
+	assert isinstance(stored_borders(room), Binary)
+	assert Room.objects.get(pk=room.pk).borders_array.tolist() == square_borders
+	assert Room.objects(borders=np.array(square_borders)).count() == 1
+	Room.objects(pk=room.pk).update(set__borders=square_borders)
+	assert stored_borders(room) == square_borders
+
+
+def test_list_borders_keep_nested_format():
+	"""Test that list borders are still stored as nested arrays."""
+	room = make_room(square_borders).save()
+	assert stored_borders(room) == square_borders
+
+
+def test_packed_borders_load_as_read_only_array():
+	"""Test that packed borders load as a read-only (n, 2) float64 array."""
+	room = make_room(np.array(square_borders)).save()
+	loaded = Room.objects.get(pk=room.pk)
+	assert isinstance(loaded.borders, np.ndarray)
+	assert loaded.borders.shape == (4, 2)
+	assert loaded.borders.dtype == np.float64
+	assert not loaded.borders.flags.writeable
+	assert np.shares_memory(loaded.borders_array, loaded.borders)
+
+
+def test_assigned_array_is_frozen_copy():
+	"""Test that an assigned array is copied, so later edits to it are not saved silently."""
+	points = np.array(square_borders)
+	room = make_room(points)
+	points[0, 0] = 0.0
+	assert room.borders[0, 0] == 12.34
+	assert not room.borders.flags.writeable
+
+
+def test_packed_geometry_matches_list_geometry():
+	"""Test that area, centroid and bounding box do not depend on the storage format."""
+	packed = make_room(np.array(square_borders), name='A').save()
+	nested = make_room(square_borders, name='B').save()
+	for field in ('area', 'centroid_longitude', 'centroid_latitude', 'max_latitude'):
+		assert getattr(packed, field) == pytest.approx(getattr(nested, field))
+	assert packed.compute_area() == nested.compute_area()
+	assert Room.compute_areas(Room.objects.order_by('name')) == [packed.area, nested.area]
+
+
+@pytest.mark.parametrize(
+	'borders',
+	[
+		np.array([[1.0, 2.0], [3.0, 4.0]]),
+		np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0]),
+		np.array([[1.0, 2.0, 3.0]] * 3),
+		np.array([[1.0, np.nan], [2.0, 2.0], [3.0, 1.0]]),
+		np.array([[1, 2], [3, 4], [5, 6]]),
+	],
+)
+def test_invalid_packed_borders(borders):
+	"""Test that packed borders are checked as an array."""
+	room = make_room(borders)
+	if borders.dtype.kind == 'f':
+		with pytest.raises(ValidationError):
+			room.validate()
+	else:
+		# Assigned arrays are converted to float64, like the stored format
+		room.validate()
+
+
+def test_packed_borders_change_tracking():
+	"""Test that only reassigning packed borders marks them as changed."""
+	room = make_room(np.array(square_borders)).save()
+	loaded = Room.objects.get(pk=room.pk)
+	loaded.occupants = 3.0
+	assert not loaded.borders_changed()
+	loaded.save()
+	loaded.borders = loaded.borders * 1.0001
+	assert loaded.borders_changed()
+	loaded.save()
+	assert Room.objects.get(pk=room.pk).max_latitude == pytest.approx(56.78009 * 1.0001)
+
+
+def test_migrate_borders_round_trip():
+	"""Test that rooms are migrated to the packed format and back."""
+	rooms = [make_room(square_borders, name=f'Room {i}').save() for i in range(5)]
+	make_room(np.array(square_borders), name='Already packed').save()
+
+	assert Room.migrate_borders(batch_size=2) == 5
+	assert all(isinstance(stored_borders(room), Binary) for room in rooms)
+	assert Room.objects.get(pk=rooms[0].pk).borders.tolist() == square_borders
+	assert Room.migrate_borders() == 0
+
+	assert Room.migrate_borders(packed=False) == 6
+	assert all(stored_borders(room) == square_borders for room in rooms)
+
+
+def test_migrate_borders_invalidates_cache():
+	"""Test that migrated rooms are dropped from the room cache."""
+	room = make_room(square_borders).save()
+	cache = RoomCache()
+	assert isinstance(cache.get(room.pk).borders, list)
+	Room.migrate_borders()
+	assert isinstance(cache.get(room.pk).borders, np.ndarray)
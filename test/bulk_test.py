@@ -0,0 +1,121 @@
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.models import BulkResult, Room, Sensor
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def room_data(i: int) -> dict:
+	"""Build valid room fields for the i-th room."""
+	return {
+		'name': f'Room {i}',
+		'type': 'OFFICE',
+		'crowd_factor': 0.5,
+		'popularity_factor': 0.5,
+		'longitude': 12.34,
+		'latitude': 56.78,
+		'floor': 1,
+		'borders': [
+			[12.340000, 56.780000],
+			[12.340180, 56.780000],
+			[12.340180, 56.780090],
+			[12.340000, 56.780090],
+		],
+	}
+
+
+def test_bulk_upsert_inserts_rooms_in_chunks():
+	"""Test that rooms given as dicts and documents are inserted across chunks."""
+	records = [room_data(i) for i in range(5)] + [Room(**room_data(i)) for i in range(5, 7)]
+	result = Room.bulk_upsert(records, chunk_size=3)
+	assert isinstance(result, BulkResult)
+	assert result.inserted == 7
+	assert result.updated == 0
+	assert result.errors == []
+	assert Room.objects.count() == 7
+	room = Room.objects(name='Room 6').first()
+	assert room.area == 110.28
+	assert room.max_latitude == 56.78009
+
+
+def test_bulk_upsert_reports_invalid_records():
+	"""Test that invalid records are reported by index without aborting the batch."""
+	records = [room_data(i) for i in range(4)]
+	records[1]['floor'] = 7
+	records[2]['borders'] = [[1.0, 1.0]]
+	records[3]['unknown_field'] = 'x'
+	result = Room.bulk_upsert(records, chunk_size=2)
+	assert result.inserted == 1
+	assert [index for index, _ in result.errors] == [1, 2, 3]
+	assert Room.objects.count() == 1
+
+
+def test_bulk_upsert_updates_existing_rooms():
+	"""Test that upserting a stored room replaces it instead of inserting a copy."""
+	room = Room(**room_data(0))
+	room.save()
+	room.occupants = 12.0
+	result = Room.bulk_upsert([room, room_data(1)])
+	assert result.inserted == 1
+	assert result.updated == 1
+	assert Room.objects.count() == 2
+	assert Room.objects(_id=room.id).first().occupants == 12.0
+
+
+def test_bulk_upsert_marks_documents_saved():
+	"""Test that upserted documents behave like saved ones afterwards."""
+	room = Room(**room_data(0))
+	Room.bulk_upsert([room])
+	assert not room._created
+	assert room._get_changed_fields() == []
+
+
+def test_bulk_upsert_rejects_invalid_chunk_size():
+	"""Test that a chunk size below one raises a ValueError."""
+	with pytest.raises(ValueError):
+		Room.bulk_upsert([], chunk_size=0)
+
+
+def test_bulk_upsert_reports_write_errors():
+	"""Test that server-side write errors are reported per record."""
+	Room._get_collection().create_index('name', unique=True)
+	Room(**room_data(0)).save()
+	result = Room.bulk_upsert([room_data(0), room_data(1)])
+	assert result.inserted == 1
+	assert [index for index, _ in result.errors] == [0]
+
+
+def test_bulk_upsert_sensors():
+	"""Test that sensors are validated and inserted in bulk."""
+	rooms = [Room(**room_data(i)) for i in range(2)]
+	Room.bulk_upsert(rooms)
+	sensors = [
+		{
+			'name': f'Sensor {i}',
+			'rooms': rooms,
+			'latitude': 56.78,
+			'longitude': 12.34,
+			'is_vertical': False,
+		}
+		for i in range(3)
+	]
+	sensors[2]['name'] = ''
+	result = Sensor.bulk_upsert(sensors)
+	assert result.inserted == 2
+	assert [index for index, _ in result.errors] == [2]
+	sensor = Sensor.objects(name='Sensor 0').first()
+	assert [room.name for room in sensor.rooms] == ['Room 0', 'Room 1']
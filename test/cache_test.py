@@ -0,0 +1,180 @@
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.cache import RoomCache
+from db.ingestion import flush_occupancy
+from db.models import Room
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self) -> float:
+		return self.now
+
+
+def count_finds(monkeypatch) -> list:
+	"""Record every find() issued against the room collection."""
+	calls = []
+	collection = Room._get_collection()
+	original = collection.find
+
+	def find(*args, **kwargs):
+		calls.append(args)
+		return original(*args, **kwargs)
+
+	monkeypatch.setattr(collection, 'find', find)
+	return calls
+
+
+def test_get_reads_through_once(monkeypatch, room_factory):
+	"""Test that repeated lookups by id are served from the cache."""
+	room = room_factory('Lobby')
+	cache = RoomCache()
+	finds = count_finds(monkeypatch)
+	assert cache.get(room.pk).name == 'Lobby'
+	assert cache.get(str(room.pk)) is cache.get(room.pk)
+	assert len(finds) == 1
+	assert cache.stats()['hits'] == 2
+	assert cache.stats()['misses'] == 1
+
+
+def test_get_missing_room_is_not_cached():
+	"""Test that unknown ids return None without filling the cache."""
+	cache = RoomCache()
+	assert cache.get('0123456789ab0123456789ab') is None
+	assert len(cache) == 0
+
+
+def test_get_many_loads_misses_in_one_query(monkeypatch, room_factory):
+	"""Test that get_many only queries the ids that are not cached."""
+	rooms = [room_factory(f'Room {i}') for i in range(3)]
+	cache = RoomCache()
+	cache.get(rooms[0].pk)
+	finds = count_finds(monkeypatch)
+	result = cache.get_many(room.pk for room in rooms)
+	assert set(result) == {room.pk for room in rooms}
+	assert len(finds) == 1
+
+
+def test_by_floor_fills_id_entries(monkeypatch, room_factory):
+	"""Test that a floor listing also caches its rooms by id."""
+	room_factory('A', floor=1)
+	room_factory('B', floor=2)
+	cache = RoomCache()
+	(room,) = cache.by_floor(2)
+	finds = count_finds(monkeypatch)
+	assert cache.by_floor(2) == [room]
+	assert cache.get(room.pk) is room
+	assert finds == []
+
+
+def test_ttl_expiry(room_factory):
+	"""Test that entries are reloaded once their TTL has passed."""
+	room = room_factory('Lobby')
+	clock = FakeClock()
+	cache = RoomCache(ttl=10, clock=clock)
+	first = cache.get(room.pk)
+	clock.now = 9.9
+	assert cache.get(room.pk) is first
+	clock.now = 10.0
+	assert cache.get(room.pk) is not first
+	assert cache.stats()['misses'] == 2
+
+
+def test_lru_eviction(room_factory):
+	"""Test that the least recently used entry is evicted when full."""
+	rooms = [room_factory(f'Room {i}') for i in range(3)]
+	cache = RoomCache(max_size=2)
+	cache.get(rooms[0].pk)
+	cache.get(rooms[1].pk)
+	cache.get(rooms[0].pk)
+	cache.get(rooms[2].pk)
+	assert len(cache) == 2
+	assert cache.stats()['evictions'] == 1
+	hits = cache.hits
+	cache.get(rooms[0].pk)
+	assert cache.hits == hits + 1
+	cache.get(rooms[1].pk)
+	assert cache.hits == hits + 1
+
+
+def test_save_and_delete_invalidate(room_factory):
+	"""Test that Room.save() and Room.delete() drop the cached room and floors."""
+	room = room_factory('Lobby', floor=1)
+	cache = RoomCache()
+	cache.get(room.pk)
+	cache.by_floor(1)
+	room.name = 'Foyer'
+	room.save()
+	assert len(cache) == 0
+	assert cache.get(room.pk).name == 'Foyer'
+	room.delete()
+	assert cache.get(room.pk) is None
+
+
+def test_queryset_update_invalidates(room_factory):
+	"""Test that updates through Room.objects clear the cache."""
+	room = room_factory('Lobby')
+	cache = RoomCache()
+	cache.get(room.pk)
+	Room.objects(pk=room.pk).update(set__occupants=7)
+	assert cache.get(room.pk).occupants == 7
+
+
+def test_occupancy_flush_invalidates(room_factory):
+	"""Test that occupancy flushes drop the updated rooms."""
+	room = room_factory('Lobby', occupants=1)
+	cache = RoomCache()
+	cache.get(room.pk)
+	flush_occupancy({room.pk: 4})
+	assert cache.get(room.pk).occupants == 5
+
+
+def test_bulk_upsert_invalidates(room_factory):
+	"""Test that bulk upserts drop the written rooms."""
+	room = room_factory('Lobby')
+	cache = RoomCache()
+	cache.get(room.pk)
+	room.name = 'Foyer'
+	Room.bulk_upsert([room])
+	assert cache.get(room.pk).name == 'Foyer'
+
+
+def test_clear_resets_counters(room_factory):
+	"""Test that clear() empties the cache and its statistics."""
+	room = room_factory('Lobby')
+	cache = RoomCache()
+	cache.get(room.pk)
+	cache.get(room.pk)
+	assert cache.stats()['hit_ratio'] == 0.5
+	cache.clear()
+	assert cache.stats() == {
+		'hits': 0,
+		'misses': 0,
+		'hit_ratio': 0.0,
+		'evictions': 0,
+		'size': 0,
+		'max_size': 1024,
+	}
+
+
+def test_invalid_max_size():
+	with pytest.raises(ValueError):
+		RoomCache(max_size=0)
@@ -0,0 +1,261 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import mongomock
+import pytest
+from bson import ObjectId
+from mongoengine import connect, disconnect
+from mongoengine.errors import SaveConditionError
+from mongomock.collection import Collection
+
+from db.models import Room
+
+THREADS = 8
+UPDATES_PER_THREAD = 50
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+@pytest.fixture
+def atomic_writes(monkeypatch):
+	"""Make mongomock writes and document reads atomic, as they are per document on a server.
+
+	mongomock matches and modifies documents in place without holding a lock, so
+	concurrent conditional updates could both match the same version and readers
+	could copy a half-updated document.
+	"""
+	# Wraps private methods of mongomock 4.3.0, the version pinned in requirements.txt.
+	# Check their names still exist before upgrading mongomock.
+	lock = threading.RLock()
+
+	def atomic(method):
+		@functools.wraps(method)
+		def wrapper(*args, **kwargs):
+			with lock:
+				return method(*args, **kwargs)
+
+		return wrapper
+
+	monkeypatch.setattr(Collection, '_update', atomic(Collection._update))
+	monkeypatch.setattr(Collection, '_find_and_modify', atomic(Collection._find_and_modify))
+	monkeypatch.setattr(Collection, '_copy_only_fields', atomic(Collection._copy_only_fields))
+
+
+@pytest.fixture
+def room(room_factory):
+	return room_factory('Lobby', type='LOBBY', occupants=10.0)
+
+
+def stored(room: Room) -> dict:
+	return Room._get_collection().find_one({'_id': room.pk})
+
+
+def run_threads(target, threads: int = THREADS):
+	"""Run target(i) on several threads at once.
+
+	An exception raised by any thread is re-raised here.
+	"""
+	barrier = threading.Barrier(threads)
+
+	def worker(i):
+		barrier.wait()
+		target(i)
+
+	with ThreadPoolExecutor(threads) as pool:
+		futures = [pool.submit(worker, i) for i in range(threads)]
+		for future in futures:
+			future.result()
+
+
+def test_add_occupants_is_atomic_and_floored(room):
+	"""Test that add_occupants updates the stored value and never goes below zero."""
+	assert room.add_occupants(2.5) == 12.5
+	assert room.add_occupants(-20) == 0.0
+	assert room.occupants == 0.0
+	assert room.version == 2
+	assert stored(room)['occupants'] == 0.0
+	assert not room._changed_fields
+
+
+def test_add_occupants_on_deleted_room(room):
+	"""Test that adding occupants to a room that no longer exists raises DoesNotExist."""
+	Room.objects(pk=room.pk).delete()
+	with pytest.raises(Room.DoesNotExist):
+		room.add_occupants(1)
+
+
+def test_save_bumps_version(room):
+	"""Test that saving changes and updating through a queryset bump the version."""
+	assert room.version == 0
+	room.occupants = 1.0
+	room.save()
+	assert stored(room)['version'] == 1
+	room.save()
+	assert stored(room)['version'] == 1
+	Room.objects(pk=room.pk).update(set__name='Hall')
+	assert stored(room)['version'] == 2
+	Room.objects(pk=room.pk).update(set__version=7)
+	assert stored(room)['version'] == 7
+
+
+def test_save_if_current_detects_conflicts(room):
+	"""Test that a stale room is not saved over a newer write."""
+	first = Room.objects.get(pk=room.pk)
+	second = Room.objects.get(pk=room.pk)
+	first.name = 'Hall'
+	first.save_if_current()
+	second.name = 'Foyer'
+	with pytest.raises(SaveConditionError):
+		second.save_if_current()
+	assert second.version == 0
+	assert stored(room)['name'] == 'Hall'
+	assert stored(room)['version'] == 1
+
+
+def test_save_if_current_without_stored_version(room):
+	"""Test that rooms stored before the version field existed can be saved guarded."""
+	Room._get_collection().update_one({'_id': room.pk}, {'$unset': {'version': ''}})
+	loaded = Room.objects.get(pk=room.pk)
+	loaded.name = 'Hall'
+	loaded.save_if_current()
+	assert stored(room)['version'] == 1
+
+
+def test_atomic_increment_conflicts_with_stale_save(room):
+	"""Test that a guarded save notices an atomic update made after the room was loaded."""
+	stale = Room.objects.get(pk=room.pk)
+	room.add_occupants(1)
+	stale.occupants = 50.0
+	with pytest.raises(SaveConditionError):
+		stale.save_if_current()
+
+
+def test_save_after_atomic_increment_does_not_reuse_version(room):
+	"""Test that a save interleaved with add_occupants still fails a stale guarded save."""
+	first = Room.objects.get(pk=room.pk)
+	room.add_occupants(1)
+	stale = Room.objects.get(pk=room.pk)
+	first.name = 'Hall'
+	first.save()
+	assert stored(room)['version'] == 2
+	assert first.version == 1
+	stale.name = 'Foyer'
+	with pytest.raises(SaveConditionError):
+		stale.save_if_current()
+	assert stored(room)['name'] == 'Hall'
+	# first is behind the stored version, so its guarded saves fail instead of overwriting
+	first.name = 'Atrium'
+	with pytest.raises(SaveConditionError):
+		first.save_if_current()
+
+
+def test_save_explicit_version(room):
+	"""Test that an explicitly assigned version is stored instead of incremented."""
+	room.version = 5
+	room.name = 'Hall'
+	room.save()
+	assert stored(room)['version'] == 5
+	assert room.version == 5
+
+
+def test_bulk_upsert_conflicts_with_stale_save(room):
+	"""Test that bulk upserts bump the version, so a stale guarded save fails."""
+	stale = Room.objects.get(pk=room.pk)
+	fresh = Room.objects.get(pk=room.pk)
+	fresh.name = 'Hall'
+	new = Room(**{**room.to_mongo().to_dict(), '_id': None, 'name': 'New'})
+	assert Room.bulk_upsert([fresh, new]).errors == []
+	assert stored(room)['version'] == 1
+	assert fresh.version == 1
+	assert stored(new)['version'] == new.version == 1
+	stale.name = 'Foyer'
+	with pytest.raises(SaveConditionError):
+		stale.save_if_current()
+	assert stored(room)['name'] == 'Hall'
+	fresh.name = 'Atrium'
+	fresh.save_if_current()
+	assert stored(room)['name'] == 'Atrium'
+
+
+def test_replacement_update_increments_version():
+	"""Test that a whole-room upsert sets the given fields, unsets the others and bumps version."""
+	update = Room._replacement_update({'_id': ObjectId(), 'name': 'Hall', 'version': 3})
+	assert update['$set'] == {'name': 'Hall'}
+	assert update['$inc'] == {'version': 1}
+	assert 'borders' in update['$unset']
+	assert not {'_id', 'name', 'version'} & update['$unset'].keys()
+
+
+def test_save_new_room_over_stored_id_conflicts_with_stale_save(room):
+	"""Test that saving a new room with a stored _id bumps the version instead of resetting it."""
+	stale = Room.objects.get(pk=room.pk)
+	replacement = Room(**{**room.to_mongo().to_dict(), 'name': 'Hall'})
+	replacement.save()
+	assert stored(room)['name'] == 'Hall'
+	assert stored(room)['version'] == replacement.version == 1
+	stale.name = 'Foyer'
+	with pytest.raises(SaveConditionError):
+		stale.save_if_current()
+
+
+def test_migrate_borders_conflicts_with_stale_save(room):
+	"""Test that migrating borders bumps the version, so a stale guarded save fails."""
+	stale = Room.objects.get(pk=room.pk)
+	assert Room.migrate_borders(packed=True) == 1
+	assert stored(room)['version'] == 1
+	stale.name = 'Foyer'
+	with pytest.raises(SaveConditionError):
+		stale.save_if_current()
+
+
+def test_update_with_retry_gives_up(room):
+	"""Test that update_with_retry raises after the allowed number of conflicts."""
+	attempts = []
+
+	def change(loaded):
+		attempts.append(loaded.version)
+		loaded.name = 'Hall'
+		# Another writer gets in between every load and save
+		room.add_occupants(1)
+
+	with pytest.raises(SaveConditionError):
+		Room.update_with_retry(room.pk, change, retries=2, backoff=0)
+	assert attempts == [0, 1, 2]
+
+
+def test_concurrent_increments_lose_no_updates(room, atomic_writes):
+	"""Test that threads incrementing one room with add_occupants lose no updates."""
+	run_threads(lambda i: [room.add_occupants(1) for _ in range(UPDATES_PER_THREAD)])
+	total = THREADS * UPDATES_PER_THREAD
+	assert stored(room)['occupants'] == 10.0 + total
+	assert stored(room)['version'] == total
+
+
+def test_concurrent_guarded_updates_lose_no_updates(room, atomic_writes):
+	"""Test that threads doing read-modify-write of one room with update_with_retry lose none."""
+
+	def increment(loaded):
+		loaded.area = (loaded.area or 0) + 1
+
+	area = stored(room)['area']
+	run_threads(
+		lambda i: [
+			Room.update_with_retry(room.pk, increment, retries=100)
+			for _ in range(UPDATES_PER_THREAD)
+		]
+	)
+	total = THREADS * UPDATES_PER_THREAD
+	assert stored(room)['area'] == area + total
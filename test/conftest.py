@@ -0,0 +1,27 @@
+import pytest
+
+from db.models import Room
+from db.testing import patch_mongomock
+
+patch_mongomock()
+
+
+ROOM_DEFAULTS = {
+	'type': 'OFFICE',
+	'crowd_factor': 0.5,
+	'popularity_factor': 0.5,
+	'longitude': 12.34,
+	'latitude': 56.78,
+	'floor': 1,
+	'borders': [[1.1, 1.0], [1.2, 1.0], [1.2, 1.1]],
+}
+
+
+@pytest.fixture
+def room_factory():
+	"""Return a function that saves a Room named name, with any field overridden by keyword."""
+
+	def create_room(name: str, **fields) -> Room:
+		return Room(name=name, **{**ROOM_DEFAULTS, **fields}).save()
+
+	return create_room
@@ -0,0 +1,179 @@
+import os
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_connection
+from pymongo import ReadPreference
+
+from db.database import Database
+from db.models import OccupancyBucket, Room, Sensor
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	for alias in list(Database._settings):
+		Database.disconnect(alias)
+	disconnect()
+
+
+@pytest.fixture
+def recorded_connects(monkeypatch) -> list:
+	"""Record the keyword arguments of every connect() made by Database."""
+	calls = []
+	monkeypatch.setattr('db.database.connect', lambda **kwargs: calls.append(kwargs))
+	return calls
+
+
+def index_keys(model) -> list:
+	return [info['key'] for info in model._get_collection().index_information().values()]
+
+
+def test_indexes_not_created_implicitly():
+	"""Test that querying a model does not create its indexes."""
+	Room.objects(floor=1).first()
+	Sensor.objects(name='x').first()
+	assert [('name', 1)] not in index_keys(Room)
+	assert [('rooms', 1)] not in index_keys(Sensor)
+
+
+def test_ensure_indexes():
+	"""Test that ensure_indexes creates the declared indexes for all models."""
+	Database.ensure_indexes()
+	room_keys = index_keys(Room)
+	assert [('floor', 1), ('type', 1)] in room_keys
+	assert [('name', 1)] in room_keys
+	assert [('type', 1)] in room_keys
+	assert [('location', '2dsphere')] in room_keys
+	assert [('rooms', 1)] in index_keys(Sensor)
+	assert [('room', 1), ('start', 1)] in index_keys(OccupancyBucket)
+
+
+def test_pool_and_read_preference_options(recorded_connects):
+	"""Test that pool, timeout and read preference settings reach the driver."""
+	Database(
+		uri='mongodb://localhost/test',
+		alias='tuned',
+		max_pool_size=50,
+		min_pool_size=5,
+		server_selection_timeout_ms=2000,
+		socket_timeout_ms=1000,
+		read_preference='secondaryPreferred',
+		appname='occupancy-api',
+	)
+	assert recorded_connects == [
+		{
+			'host': 'mongodb://localhost/test',
+			'alias': 'tuned',
+			'maxPoolSize': 50,
+			'minPoolSize': 5,
+			'serverSelectionTimeoutMS': 2000,
+			'socketTimeoutMS': 1000,
+			'appname': 'occupancy-api',
+			'read_preference': ReadPreference.SECONDARY_PREFERRED,
+		}
+	]
+
+
+@pytest.mark.parametrize('alias', ['default', 'analytics'])
+def test_read_preference_reaches_client(alias):
+	"""Test that the client of an alias reads with the requested preference, also after a fork."""
+	Database.disconnect(alias)
+	Database(
+		uri='mongodb://localhost/test',
+		alias=alias,
+		read_preference='secondary',
+		uuidRepresentation='standard',
+	)
+	assert get_connection(alias).read_preference == ReadPreference.SECONDARY
+	Database.reconnect_after_fork()
+	assert get_connection(alias).read_preference == ReadPreference.SECONDARY
+
+
+def test_unknown_read_preference_raises():
+	"""Test that a misspelt read preference name is rejected."""
+	with pytest.raises(ValueError):
+		Database(uri='mongodb://localhost/test', alias='typo', read_preference='secondaries')
+
+
+def test_connects_once_per_alias(recorded_connects):
+	"""Test that repeated initialisation reuses the existing connection of an alias."""
+	Database(uri='mongodb://localhost/test', alias='a')
+	Database(uri='mongodb://localhost/test', alias='a')
+	Database(uri='mongodb://localhost/test', alias='b')
+	assert [call['alias'] for call in recorded_connects] == ['a', 'b']
+	Database.disconnect('a')
+	Database(uri='mongodb://localhost/test', alias='a')
+	assert len(recorded_connects) == 3
+
+
+def test_missing_uri_raises(monkeypatch):
+	"""Test that a missing connection string raises a ValueError."""
+	monkeypatch.setattr('db.database.load_dotenv', lambda **kwargs: None)
+	monkeypatch.delenv('MONGO_URL', raising=False)
+	with pytest.raises(ValueError):
+		Database(alias='nowhere')
+
+
+def test_secondary_alias_queries():
+	"""Test that models can be written and queried through a named alias."""
+	Database(
+		uri='mongodb://localhost/mongoenginetest',
+		alias='analytics',
+		read_preference='secondaryPreferred',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	room = Room(
+		name='Room',
+		type='OFFICE',
+		crowd_factor=0.5,
+		popularity_factor=0.5,
+		longitude=12.34,
+		latitude=56.78,
+		floor=1,
+		borders=[[1.1, 1.0], [1.2, 1.0], [1.2, 1.1]],
+	)
+	room.switch_db('analytics').save()
+	assert Room.objects.using('analytics').count() == 1
+	assert Room.objects.count() == 0
+
+
+def test_reconnect_after_fork_replaces_clients():
+	"""Test that the fork handler builds new clients with the same settings."""
+	Database(
+		uri='mongodb://localhost/test',
+		alias='worker',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	parent_client = get_connection('worker')
+	Database.reconnect_after_fork()
+	assert get_connection('worker') is not parent_client
+	assert 'worker' in Database._settings
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_forked_child_gets_fresh_client():
+	"""Test that a forked process does not reuse the parent's client."""
+	Database(
+		uri='mongodb://localhost/test',
+		alias='worker',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	parent_client = get_connection('worker')
+	pid = os.fork()
+	if pid == 0:  # pragma: no cover
+		os._exit(0 if get_connection('worker') is not parent_client else 1)
+	_, status = os.waitpid(pid, 0)
+	assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,135 @@
+import gc
+import weakref
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+from pymongo.errors import OperationFailure
+
+from db.density import DensityRanker
+from db.models import Room
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+@pytest.fixture
+def rooms(room_factory):
+	return [
+		room_factory('Quiet', occupants=1, area=100, crowd_factor=1.0),
+		room_factory('Packed', occupants=50, area=10, crowd_factor=2.0),
+		room_factory('Busy', occupants=20, area=10, crowd_factor=1.0, floor=2),
+		room_factory('Shop', occupants=30, area=10, crowd_factor=1.0, floor=2, type='SHOP'),
+		room_factory('Tiny', occupants=2, area=0.1, crowd_factor=1.0),
+	]
+
+
+@pytest.fixture(params=[True, False], ids=['pipeline', 'snapshot'])
+def ranker(request):
+	return DensityRanker(server_side=request.param)
+
+
+def test_top_rooms(ranker, rooms):
+	"""Test that rooms are ranked by occupants * crowd_factor / area."""
+	top = ranker.top(3)
+	assert [room.name for room in top] == ['Packed', 'Shop', 'Busy']
+	assert top[0].density == pytest.approx(10.0)
+	assert (top[0].floor, top[0].occupants, top[0].area) == (1, 50, 10)
+
+
+def test_filters(ranker, rooms):
+	"""Test floor and type filters."""
+	assert [room.name for room in ranker.top(5, floor=2)] == ['Shop', 'Busy']
+	assert [room.name for room in ranker.top(5, floor=2, type='OFFICE')] == ['Busy']
+	assert ranker.top(5, type='LOBBY') == []
+
+
+def test_min_area_bounds_density(rooms):
+	"""Test that tiny areas are clamped to min_area."""
+	ranker = DensityRanker(min_area=1.0)
+	tiny = next(room for room in ranker.top(5) if room.name == 'Tiny')
+	assert tiny.density == pytest.approx(2.0)
+
+
+def test_pipeline_and_snapshot_agree(rooms):
+	"""Test that the fallback ranks exactly like the aggregation pipeline."""
+	assert DensityRanker().top(5) == DensityRanker(server_side=False).top(5)
+
+
+def test_falls_back_when_pipeline_unsupported(rooms, monkeypatch):
+	"""Test that an unsupported pipeline switches to the snapshot ranking."""
+
+	def unsupported(*args, **kwargs):
+		raise NotImplementedError('$project')
+
+	monkeypatch.setattr(Room._get_collection(), 'aggregate', unsupported)
+	ranker = DensityRanker()
+	assert [room.name for room in ranker.top(1)] == ['Packed']
+	assert not ranker.server_side
+
+
+@pytest.mark.parametrize('code, remembered', [(40324, True), (168, True), (50, False)])
+def test_operation_failure_fallback(rooms, monkeypatch, code, remembered):
+	"""Test that only unsupported-pipeline errors turn off server-side ranking for good."""
+	aggregate = Room._get_collection().aggregate
+	calls = []
+
+	def failing(*args, **kwargs):
+		calls.append(code)
+		if len(calls) == 1:
+			raise OperationFailure('aggregate failed', code=code)
+		return aggregate(*args, **kwargs)
+
+	monkeypatch.setattr(Room._get_collection(), 'aggregate', failing)
+	ranker = DensityRanker()
+	assert [room.name for room in ranker.top(1)] == ['Packed']
+	assert ranker.server_side is not remembered
+	assert [room.name for room in ranker.top(1)] == ['Packed']
+	assert len(calls) == (1 if remembered else 2)
+
+
+def test_write_listener_is_held_weakly(rooms):
+	"""Test that rankers are told about writes without being kept alive or kept as caches."""
+	ranker = DensityRanker(server_side=False, ttl=60)
+	assert ranker not in Room._caches
+	reference = weakref.ref(ranker)
+	del ranker
+	gc.collect()
+	assert reference() is None
+	rooms[0].occupants = 1.0
+	rooms[0].save()
+
+
+def test_snapshot_refreshes_after_writes(rooms):
+	"""Test that the snapshot follows room writes made through the package."""
+	ranker = DensityRanker(server_side=False, ttl=60)
+	assert ranker.top(1)[0].name == 'Packed'
+	rooms[0].occupants = 10_000
+	rooms[0].save()
+	assert ranker.top(1)[0].name == 'Quiet'
+
+
+def test_snapshot_ttl(rooms):
+	"""Test that the snapshot is reused within its TTL."""
+	now = [0.0]
+	ranker = DensityRanker(server_side=False, ttl=5, clock=lambda: now[0])
+	ranker.top(1)
+	Room._get_collection().update_one({'_id': rooms[0].pk}, {'$set': {'occupants': 10_000}})
+	assert ranker.top(1)[0].name == 'Packed'
+	now[0] = 5.0
+	assert ranker.top(1)[0].name == 'Quiet'
+
+
+def test_non_positive_k(ranker, rooms):
+	assert ranker.top(0) == []
@@ -0,0 +1,128 @@
+import sys
+
+import mongomock
+import numpy as np
+import pytest
+from mongoengine import connect, disconnect
+
+from db.export import (
+	ROOM_DTYPE,
+	export_rooms,
+	export_sensors,
+	room_batches,
+	rooms_to_arrow,
+	sensors_to_arrow,
+	write_parquet,
+)
+from db.models import Sensor
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+@pytest.fixture
+def rooms(room_factory):
+	return [
+		room_factory('A', borders=[[1.1, 1.0], [1.2, 1.0], [1.2, 1.1]], occupants=3.0),
+		room_factory(
+			'B', borders=[[2.1, 2.0], [2.2, 2.0], [2.2, 2.1], [2.1, 2.1]], occupants=3.0, floor=2
+		),
+		room_factory('C', borders=[[3.1, 3.0], [3.2, 3.0], [3.2, 3.1]], occupants=3.0, floor=2),
+	]
+
+
+@pytest.fixture
+def sensor(rooms):
+	return Sensor(
+		name='Door',
+		rooms=[rooms[0], rooms[1]],
+		latitude=56.78,
+		longitude=12.34,
+		is_vertical=True,
+	).save()
+
+
+def test_export_rooms_columns(rooms):
+	"""Test that rooms are exported as typed columns with packed borders."""
+	columns = export_rooms(batch_size=2)
+	assert columns.rooms.dtype == ROOM_DTYPE
+	assert list(columns.rooms['id']) == [str(room.pk) for room in rooms]
+	assert list(columns.rooms['name']) == ['A', 'B', 'C']
+	assert list(columns.rooms['floor']) == [1, 2, 2]
+	np.testing.assert_allclose(columns.rooms['area'], [room.area for room in rooms])
+	assert list(columns.offsets) == [0, 3, 7, 10]
+	np.testing.assert_array_equal(columns.coords[3:7], rooms[1].borders)
+
+
+def test_room_batches_respect_size_and_filters(rooms):
+	"""Test that batches are bounded by batch_size and filtered."""
+	batches = list(room_batches(batch_size=1, floor=2))
+	assert [len(batch.rooms) for batch in batches] == [1, 1]
+	assert [list(batch.offsets) for batch in batches] == [[0, 4], [0, 3]]
+
+
+def test_export_empty():
+	"""Test that an empty collection exports empty, well-formed columns."""
+	columns = export_rooms()
+	assert len(columns.rooms) == 0
+	assert list(columns.offsets) == [0]
+	assert len(export_sensors()) == 0
+
+
+def test_export_sensors(rooms, sensor):
+	"""Test that sensors are exported with their two room ids."""
+	(row,) = export_sensors()
+	assert row['id'] == str(sensor.pk)
+	assert (row['room_a'], row['room_b']) == (str(rooms[0].pk), str(rooms[1].pk))
+	assert row['is_vertical']
+
+
+def test_invalid_batch_size():
+	with pytest.raises(ValueError):
+		export_rooms(batch_size=0)
+
+
+def test_rooms_to_arrow(rooms):
+	"""Test that Arrow tables keep the columns and nest borders per room."""
+	pytest.importorskip('pyarrow')
+	table = rooms_to_arrow(export_rooms())
+	assert table.num_rows == 3
+	assert table.column('name').to_pylist() == ['A', 'B', 'C']
+	assert table.column('borders').to_pylist()[1] == rooms[1].borders
+
+
+def test_write_parquet(tmp_path, rooms, sensor):
+	"""Test that Parquet files round-trip the exported rooms and sensors."""
+	pq = pytest.importorskip('pyarrow.parquet')
+	rooms_path, sensors_path = write_parquet(str(tmp_path), batch_size=2)
+	table = pq.read_table(rooms_path)
+	assert table.num_rows == 3
+	assert table.column('borders').to_pylist()[0] == rooms[0].borders
+	assert pq.read_table(sensors_path).column('name').to_pylist() == ['Door']
+
+
+def test_write_parquet_empty(tmp_path):
+	"""Test that empty collections still produce readable files."""
+	pq = pytest.importorskip('pyarrow.parquet')
+	rooms_path, sensors_path = write_parquet(str(tmp_path))
+	assert pq.read_table(rooms_path).num_rows == 0
+	assert 'borders' in pq.read_table(rooms_path).column_names
+	assert pq.read_table(sensors_path).num_rows == 0
+
+
+def test_missing_pyarrow(monkeypatch):
+	"""Test that Arrow export explains how to install the optional dependency."""
+	monkeypatch.setitem(sys.modules, 'pyarrow', None)
+	with pytest.raises(ImportError, match='pyarrow'):
+		sensors_to_arrow(export_sensors())
@@ -0,0 +1,138 @@
+import mongomock
+import numpy as np
+import pytest
+from mongoengine import connect, disconnect
+
+from db.graph import BuildingGraph
+from db.models import Room, Sensor
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def create_sensor(name: str, a: Room, b: Room, is_vertical: bool = False) -> Sensor:
+	sensor = Sensor(name=name, rooms=[a, b], latitude=1.0, longitude=1.0, is_vertical=is_vertical)
+	sensor.save()
+	return sensor
+
+
+@pytest.fixture
+def building(room_factory):
+	"""A corridor A - B - C on floor 1 with stairs from B up to D on floor 2."""
+	rooms = {name: room_factory(name) for name in 'ABC'}
+	rooms['D'] = room_factory('D', floor=2, occupants=4.0)
+	sensors = [
+		create_sensor('AB', rooms['A'], rooms['B']),
+		create_sensor('BC', rooms['B'], rooms['C']),
+		create_sensor('BD', rooms['B'], rooms['D'], is_vertical=True),
+	]
+	return rooms, sensors
+
+
+def names(graph: BuildingGraph, room_ids) -> set:
+	return {Room.objects(_id=room_id).first().name for room_id in room_ids}
+
+
+def test_load_builds_csr_adjacency(building):
+	"""Test that every sensor becomes an edge in both directions."""
+	rooms, _ = building
+	graph = BuildingGraph.load()
+	assert graph.n_rooms == 4
+	assert graph.n_sensors == 3
+	assert len(graph.indices) == 6
+	assert graph.indptr[-1] == 6
+	assert names(graph, graph.neighbors(rooms['B'].id)) == {'A', 'C', 'D'}
+	assert names(graph, graph.neighbors(rooms['A'].id)) == {'B'}
+
+
+def test_edge_and_room_attributes(building):
+	"""Test that is_vertical and room fields are available as arrays."""
+	rooms, sensors = building
+	graph = BuildingGraph.load()
+	b = graph.room_index[rooms['B'].id]
+	d = graph.room_index[rooms['D'].id]
+	edges = slice(graph.indptr[b], graph.indptr[b + 1])
+	vertical_targets = graph.indices[edges][graph.edge_vertical[edges]]
+	assert list(vertical_targets) == [d]
+	assert graph.rooms['floor'][d] == 2
+	assert graph.rooms['occupants'][d] == 4.0
+	sensor = graph.sensor_ids[graph.edge_sensor[edges][graph.edge_vertical[edges]][0]]
+	assert sensor == sensors[2].id
+
+
+def test_refresh_sensors_patches_edges(building, room_factory):
+	"""Test that changed, added and deleted sensors are reflected after a refresh."""
+	rooms, sensors = building
+	graph = BuildingGraph.load()
+	rooms['E'] = room_factory('E')
+	added = create_sensor('CE', rooms['C'], rooms['E'])
+	sensors[0].delete()
+	sensors[1].rooms = [rooms['A'], rooms['C']]
+	sensors[1].save()
+	graph.refresh_sensors([added.id, sensors[0].id, sensors[1].id])
+	assert graph.n_rooms == 5
+	assert graph.n_sensors == 3
+	assert names(graph, graph.neighbors(rooms['C'].id)) == {'A', 'E'}
+	assert names(graph, graph.neighbors(rooms['B'].id)) == {'D'}
+	assert np.all(np.diff(graph.indptr) >= 0)
+
+
+def test_refresh_rooms_updates_attributes(building, room_factory):
+	"""Test that room attributes are reloaded without rebuilding edges."""
+	rooms, _ = building
+	graph = BuildingGraph.load()
+	Room.objects(_id=rooms['A'].id).update(occupants=9.0)
+	graph.refresh_rooms([rooms['A'].id])
+	assert graph.rooms['occupants'][graph.room_index[rooms['A'].id]] == 9.0
+	room_factory('Isolated')
+	graph.refresh_rooms()
+	assert graph.n_rooms == 5
+	assert graph.neighbors(graph.room_ids[-1]) == []
+
+
+@pytest.mark.parametrize('all_rooms', [False, True])
+def test_refresh_rooms_drops_deleted_rooms(building, all_rooms):
+	"""Test that deleted rooms lose their node and sensors while other edges are renumbered."""
+	rooms, _ = building
+	graph = BuildingGraph.load()
+	rooms['A'].delete()
+	Room.objects(_id=rooms['D'].id).update(occupants=7.0)
+	graph.refresh_rooms(None if all_rooms else [rooms['A'].id, rooms['D'].id])
+	assert rooms['A'].id not in graph.room_index
+	assert graph.n_rooms == 3
+	assert graph.n_sensors == 2
+	assert len(graph.indices) == 4
+	assert graph.neighbors(rooms['B'].id) == [rooms['C'].id, rooms['D'].id]
+	assert graph.neighbors(rooms['C'].id) == [rooms['B'].id]
+	d = graph.room_index[rooms['D'].id]
+	assert graph.room_ids[d] == rooms['D'].id
+	assert graph.rooms['occupants'][d] == 7.0
+	assert graph.rooms['floor'][d] == 2
+	assert graph.edge_vertical[graph.indptr[d]]
+
+
+def test_sensors_with_missing_rooms_are_skipped(building):
+	"""Test that sensors referencing deleted rooms do not create edges."""
+	rooms, _ = building
+	rooms['C'].delete()
+	graph = BuildingGraph.load()
+	assert graph.n_sensors == 2
+	assert names(graph, graph.neighbors(rooms['B'].id)) == {'A', 'D'}
+
+
+def test_empty_graph():
+	"""Test that an empty database gives an empty graph."""
+	graph = BuildingGraph.load()
+	assert graph.n_rooms == 0
+	assert list(graph.indptr) == [0]
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+	"""Run code in a fresh interpreter so nothing is imported already."""
+	return subprocess.run(
+		[sys.executable, '-c', code],
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+
+
+# Modules `import db` may load beyond a bare interpreter; everything else is deferred
+IMPORT_ALLOWLIST = {'db'}
+
+
+def test_import_db_within_budget():
+	"""Test that importing the package loads nothing outside the allowlist.
+
+	Counting modules instead of timing them keeps the budget exact on any machine;
+	any new top-level import, e.g. numpy or pymongo, fails it.
+	"""
+	result = run_python(
+		'import sys\n'
+		'before = set(sys.modules)\n'
+		'import db\n'
+		'print(" ".join(sorted(set(sys.modules) - before)))'
+	)
+	assert set(result.stdout.split()) <= IMPORT_ALLOWLIST
+
+
+def test_models_do_not_import_pyproj():
+	"""Test that computing a WGS84 area does not need pyproj at all."""
+	result = run_python(
+		'import sys\n'
+		'from db.models import Room\n'
+		'print("pyproj" in sys.modules)\n'
+		'Room(borders=[[1.1, 1.0], [1.2, 1.0], [1.2, 1.1]]).compute_area()\n'
+		'print("pyproj" in sys.modules)'
+	)
+	assert result.stdout.split() == ['False', 'False']
+
+
+def test_lazy_exports():
+	"""Test that the top-level exports resolve to the real classes."""
+	import db
+	from db.database import Database
+	from db.models import Room, Sensor
+
+	assert (db.Database, db.Room, db.Sensor) == (Database, Room, Sensor)
+	assert {'Database', 'Room', 'Sensor'} <= set(dir(db))
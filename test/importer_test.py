@@ -0,0 +1,243 @@
+import io
+import json
+import tracemalloc
+
+import mongomock
+import numpy as np
+import pytest
+from bson import Binary, ObjectId
+from mongoengine import connect, disconnect
+
+from db.importer import (
+	MalformedFeature,
+	feature_room,
+	import_csv,
+	import_features,
+	import_geojson,
+	read_geojson,
+)
+from db.models import Room
+
+DEFAULTS = {'crowd_factor': 1.0, 'popularity_factor': 1.0}
+SQUARE = [[12.34, 56.78], [12.34018, 56.78], [12.34018, 56.78009], [12.34, 56.78009]]
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def feature(name: str, ring=SQUARE, **properties) -> dict:
+	return {
+		'type': 'Feature',
+		'properties': {'name': name, 'type': 'office', 'floor': 1, **properties},
+		'geometry': {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]},
+	}
+
+
+def collection(*features, **members) -> str:
+	return json.dumps({'type': 'FeatureCollection', **members, 'features': list(features)})
+
+
+def test_read_geojson_streams_across_chunks():
+	"""Test that features are decoded correctly when values span read chunks."""
+	features = [feature(f'Room {i}', occupants=1234.5678) for i in range(20)]
+	text = collection(*features, name='plan', crs={'type': 'name'})
+	assert list(read_geojson(io.StringIO(text), chunk_size=7)) == features
+	assert list(read_geojson(io.StringIO(collection()))) == []
+
+
+@pytest.mark.parametrize('chunk_size', range(1, 12))
+def test_read_geojson_values_cut_at_any_chunk_boundary(chunk_size):
+	"""Test that numbers and escaped strings split across chunks decode whole."""
+	text = '{"features": [1.5, 2e5, 1.x, {"name": "a\\\\\\"b"}]}'
+	features = list(read_geojson(io.StringIO(text), chunk_size=chunk_size))
+	assert features[:2] == [1.5, 2e5]
+	assert isinstance(features[2], MalformedFeature)
+	assert features[3] == {'name': 'a\\"b'}
+
+
+def test_read_geojson_rejects_malformed_file():
+	"""Test that a file that is not a FeatureCollection object raises a ValueError."""
+	with pytest.raises(ValueError):
+		list(read_geojson(io.StringIO('[1, 2]')))
+	with pytest.raises(ValueError):
+		list(read_geojson(io.StringIO('{"features": [{"type": "Feature"} {}]}')))
+
+
+@pytest.mark.parametrize('chunk_size', [5, 1 << 16])
+def test_read_geojson_yields_malformed_features(chunk_size):
+	"""Test that a feature that is not valid JSON is reported and reading goes on."""
+	good = [json.dumps(feature(f'Room {i}', note='a "quoted" [bracket}')) for i in range(3)]
+	malformed = '{"type": \'Feature\', "x": [1, {}]}'
+	text = f'{{"features": [{good[0]}, {malformed}, {good[1]}, {good[2]}]}}'
+	features = list(read_geojson(io.StringIO(text), chunk_size=chunk_size))
+	assert isinstance(features[1], MalformedFeature)
+	assert [item['properties']['name'] for item in features[::2]] == ['Room 0', 'Room 1']
+	assert features[3]['properties']['name'] == 'Room 2'
+
+
+def test_read_geojson_skips_oversized_feature_without_buffering():
+	"""Test that a feature over max_feature_size is rejected without holding it in memory."""
+	big = feature('Big', ring=[[12.34 + i * 1e-6, 56.78] for i in range(5000)])
+	text = collection(feature('A'), big, feature('B'), name='plan')
+	file = io.StringIO(text)
+	tracemalloc.start()
+	try:
+		features = list(read_geojson(file, chunk_size=256, max_feature_size=4096))
+		peak = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+	assert isinstance(features[1], MalformedFeature)
+	assert 'longer than 4096' in features[1].reason
+	assert [features[0]['properties']['name'], features[2]['properties']['name']] == ['A', 'B']
+	assert len(json.dumps(big)) > 20 * 4096
+	# The feature alone is over 80 KB; only a few chunks of it are held at a time
+	assert peak < 5 * 4096
+
+
+def test_read_geojson_truncated_file_raises():
+	"""Test that a file ending inside a feature raises a ValueError."""
+	text = collection(feature('A'), feature('B'))[:-30]
+	with pytest.raises(ValueError, match='end of file'):
+		list(read_geojson(io.StringIO(text), chunk_size=16))
+
+
+def test_import_geojson_rejects_malformed_feature(tmp_path):
+	"""Test that one malformed feature is rejected by position without stopping the import."""
+	path = tmp_path / 'plan.geojson'
+	good = [json.dumps(feature(name)) for name in ('Lobby', 'Shop')]
+	path.write_text(f'{{"features": [{good[0]}, {{"type": "Feature",, }}, {good[1]}]}}')
+	report = import_geojson(path, defaults=DEFAULTS)
+	assert report.inserted == 2
+	assert [index for index, _ in report.rejected] == [1]
+	assert 'Invalid GeoJSON' in report.rejected[0][1]
+
+
+def test_import_geojson_west_and_south(tmp_path):
+	"""Test that rooms west of Greenwich and south of the equator are imported."""
+	path = tmp_path / 'plan.geojson'
+	ring = [[-43.2100, -22.9000], [-43.2098, -22.9000], [-43.2098, -22.8999], [-43.2100, -22.8999]]
+	path.write_text(collection(feature('Rio', ring=ring)))
+	report = import_geojson(path, defaults=DEFAULTS)
+	assert (report.inserted, report.rejected) == (1, [])
+	room = Room.objects.get(name='Rio')
+	assert room.longitude == pytest.approx(-43.2099)
+	assert room.latitude == pytest.approx(-22.89995)
+
+
+def test_feature_room_maps_geometry():
+	"""Test that the outer ring becomes borders and its centroid the room position."""
+	values = feature_room(feature('Lobby', floor='2'), DEFAULTS)
+	assert values['borders'] == SQUARE
+	assert values['type'] == 'OFFICE'
+	assert values['floor'] == 2
+	assert values['longitude'] == pytest.approx(12.34009)
+	assert values['latitude'] == pytest.approx(56.780045)
+	assert 'area' not in values
+
+
+def test_feature_room_fields_mapping_and_id():
+	"""Test renamed properties, MultiPolygons and ObjectId feature ids."""
+	room_id = ObjectId()
+	values = feature_room(
+		{
+			'id': str(room_id),
+			'properties': {'label': 'Shop', 'type': 'SHOP', 'level': 3},
+			'geometry': {'type': 'MultiPolygon', 'coordinates': [[SQUARE]]},
+		},
+		DEFAULTS,
+		fields={'name': 'label', 'floor': 'level'},
+	)
+	assert (values['name'], values['floor'], values['_id']) == ('Shop', 3, room_id)
+
+
+@pytest.mark.parametrize(
+	'geometry',
+	[
+		None,
+		{'type': 'Point', 'coordinates': [12.3, 56.7]},
+		{'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [0, 0]]]},
+		'not a geometry',
+	],
+)
+def test_feature_room_rejects_bad_geometry(geometry):
+	"""Test that unusable geometries raise a TypeError or ValueError."""
+	with pytest.raises((TypeError, ValueError)):
+		feature_room({'properties': {'name': 'A'}, 'geometry': geometry})
+
+
+def test_import_geojson_writes_and_reports(tmp_path):
+	"""Test importing a file: valid rooms are stored, bad ones reported by position."""
+	path = tmp_path / 'plan.geojson'
+	path.write_text(
+		collection(
+			feature('Lobby'),
+			feature('Broken', floor=9),
+			{'type': 'Feature', 'properties': {'name': 'No geometry'}},
+			feature('Shop', type='shop', floor=2.0),
+			feature('Bad floor', floor='first'),
+		)
+	)
+	report = import_geojson(path, batch_size=2, defaults=DEFAULTS)
+	assert report.read == 5
+	assert (report.inserted, report.updated) == (2, 0)
+	assert [index for index, _ in report.rejected] == [1, 2, 4]
+	assert 'Invalid floor' in report.rejected[2][1]
+	assert report.rows_per_sec > 0
+	lobby = Room.objects.get(name='Lobby')
+	assert lobby.area == 110.28
+	assert lobby.borders == SQUARE
+	assert Room.objects.get(name='Shop').type == 'SHOP'
+
+
+def test_import_with_ids_updates_on_reimport():
+	"""Test that importing features with ObjectId ids twice updates instead of duplicating."""
+	features = [{**feature(f'Room {i}'), 'id': str(ObjectId())} for i in range(3)]
+	assert import_features(features, defaults=DEFAULTS).inserted == 3
+	report = import_features(features, defaults=DEFAULTS)
+	assert (report.inserted, report.updated) == (0, 3)
+	assert Room.objects.count() == 3
+
+
+def test_import_packed_borders():
+	"""Test that packed imports store borders as Binary."""
+	import_features([feature('Lobby')], defaults=DEFAULTS, packed=True)
+	room = Room.objects.get(name='Lobby')
+	assert isinstance(room.borders, np.ndarray)
+	stored = Room._get_collection().find_one({'_id': room.pk})['borders']
+	assert isinstance(stored, Binary)
+
+
+def test_import_csv_geometry_formats():
+	"""Test CSV rows with WKT, GeoJSON and borders outlines."""
+	wkt = 'POLYGON ((' + ', '.join(f'{lon} {lat}' for lon, lat in SQUARE + SQUARE[:1]) + '))'
+	geojson = json.dumps({'type': 'Polygon', 'coordinates': [SQUARE]})
+	rows = [
+		'name,type,floor,crowd_factor,popularity_factor,geometry,borders',
+		f'WKT,office,1,0.5,0.5,"{wkt}",',
+		f'GeoJSON,lobby,2,0.5,0.5,"{geojson.replace(chr(34), chr(34) * 2)}",',
+		f'Borders,shop,3,0.5,0.5,,"{json.dumps(SQUARE)}"',
+		'Missing,shop,3,0.5,0.5,,',
+	]
+	report = import_csv(io.StringIO('\n'.join(rows)))
+	assert report.inserted == 3
+	assert [index for index, _ in report.rejected] == [3]
+	for room in Room.objects:
+		assert room.borders == SQUARE
+		assert room.area == 110.28
+
+
+def test_import_rejects_bad_batch_size():
+	"""Test that a batch size below one raises a ValueError."""
+	with pytest.raises(ValueError):
+		import_features([], batch_size=0)
@@ -0,0 +1,267 @@
+import threading
+
+import mongomock
+import pytest
+from bson import ObjectId
+from mongoengine import connect, disconnect
+
+from db.ingestion import (
+	BACKWARD,
+	FORWARD,
+	OccupancyBuffer,
+	SensorEventIngestor,
+	flush_occupancy,
+)
+from db.models import Room, Sensor
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+@pytest.fixture
+def rooms(room_factory):
+	return [
+		room_factory('Lobby', occupants=10.0),
+		room_factory('Office', occupants=2.0),
+		room_factory('Shop', occupants=0.0),
+	]
+
+
+@pytest.fixture
+def sensors(rooms):
+	"""Two sensors: Lobby <-> Office and Office <-> Shop."""
+	result = []
+	for i, pair in enumerate([(rooms[0], rooms[1]), (rooms[1], rooms[2])]):
+		sensor = Sensor(
+			name=f'Sensor {i}', rooms=list(pair), latitude=56.78, longitude=12.34, is_vertical=False
+		)
+		sensor.save()
+		result.append(sensor)
+	return result
+
+
+def occupants(room: Room) -> float:
+	return Room.objects(_id=room.id).first().occupants
+
+
+def test_ingest_moves_people_between_rooms(rooms, sensors):
+	"""Test that events move people from one room of a sensor to the other."""
+	written = SensorEventIngestor().ingest(
+		[
+			(sensors[0].id, FORWARD, 3),
+			(sensors[0].id, BACKWARD, 1),
+			(str(sensors[1].id), FORWARD, 1),
+		]
+	)
+	assert written == 3
+	assert occupants(rooms[0]) == 8.0
+	assert occupants(rooms[1]) == 3.0
+	assert occupants(rooms[2]) == 1.0
+
+
+def test_occupants_floored_at_zero(rooms, sensors):
+	"""Test that moving more people out than are present leaves zero occupants."""
+	SensorEventIngestor().ingest([(sensors[1].id, BACKWARD, 5)])
+	assert occupants(rooms[2]) == 0.0
+	assert occupants(rooms[1]) == 7.0
+
+
+def test_events_are_coalesced_per_room(rooms, sensors):
+	"""Test that opposite flows cancel out and produce no write for that room."""
+	ingestor = SensorEventIngestor()
+	ingestor.add(sensors[0].id, FORWARD, 2)
+	ingestor.add(sensors[0].id, BACKWARD, 2)
+	assert ingestor.flush() == 0
+	assert occupants(rooms[0]) == 10.0
+
+
+def test_flush_on_window_and_size():
+	"""Test that the window and event limits trigger flushes."""
+	now = [0.0]
+	ingestor = SensorEventIngestor(window=1.0, max_events=3, clock=lambda: now[0])
+	sensor_id = ObjectId()
+	ingestor.add(sensor_id, FORWARD)
+	assert ingestor._events == 1
+	now[0] = 1.5
+	ingestor.add(sensor_id, FORWARD)
+	assert ingestor._events == 0
+	for _ in range(3):
+		ingestor.add(sensor_id, FORWARD)
+	assert ingestor._events == 0
+
+
+def test_unknown_sensors_are_reported(rooms):
+	"""Test that events for missing sensors are dropped and remembered."""
+	sensor_id = ObjectId()
+	with SensorEventIngestor() as ingestor:
+		ingestor.add(sensor_id, FORWARD, 1)
+	assert ingestor.unknown_sensors == {sensor_id}
+	assert occupants(rooms[0]) == 10.0
+
+
+def test_invalid_events_are_rejected():
+	"""Test that bad directions and negative counts raise a ValueError."""
+	ingestor = SensorEventIngestor()
+	with pytest.raises(ValueError):
+		ingestor.add(ObjectId(), 2, 1)
+	with pytest.raises(ValueError):
+		ingestor.add(ObjectId(), FORWARD, -1)
+
+
+def test_forget_reloads_sensor_rooms(rooms, sensors):
+	"""Test that forgetting a sensor picks up its new rooms on the next flush."""
+	ingestor = SensorEventIngestor()
+	ingestor.ingest([(sensors[0].id, FORWARD, 1)])
+	sensors[0].rooms = [rooms[0], rooms[2]]
+	sensors[0].save()
+	ingestor.forget(sensors[0].id)
+	ingestor.ingest([(sensors[0].id, FORWARD, 1)])
+	assert occupants(rooms[1]) == 3.0
+	assert occupants(rooms[2]) == 1.0
+	ingestor.forget()
+	assert ingestor._sensor_rooms == {}
+
+
+def test_flush_occupancy_skips_zero_deltas(rooms):
+	"""Test that only non-zero deltas are written."""
+	assert flush_occupancy({rooms[0].id: 0, rooms[1].id: -1.5}) == 1
+	assert occupants(rooms[1]) == 0.5
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self):
+		return self.now
+
+
+def test_buffer_coalesces_deltas_per_room(rooms):
+	"""Test that many deltas become one update per room when flushed."""
+	buffer = OccupancyBuffer(window=60)
+	for _ in range(100):
+		assert buffer.add(rooms[0].id, 1) == 0
+		assert buffer.add(str(rooms[1].id), 0.5) == 0
+	assert occupants(rooms[0]) == 10.0
+	assert buffer.pending(rooms[0].id) == 100.0
+	assert buffer.flush() == 2
+	assert occupants(rooms[0]) == 110.0
+	assert occupants(rooms[1]) == 52.0
+	assert buffer.pending(rooms[0].id) == 0.0
+	assert buffer.flush() == 0
+
+
+def test_buffer_flushes_on_window_and_size(rooms):
+	"""Test that a flush is triggered by the time window or the number of deltas."""
+	clock = FakeClock()
+	buffer = OccupancyBuffer(window=1.0, max_events=3, clock=clock)
+	buffer.add(rooms[0].id, 1)
+	clock.now = 1.0
+	assert buffer.add(rooms[1].id, 1) == 2
+	assert occupants(rooms[0]) == 11.0
+	buffer.add(rooms[0].id, 1)
+	buffer.add(rooms[0].id, 1)
+	assert buffer.add(rooms[0].id, 1) == 1
+	assert occupants(rooms[0]) == 14.0
+
+
+def test_buffer_reads_include_pending_deltas(rooms):
+	"""Test that buffered reads add unwritten deltas to the stored value, floored at zero."""
+	buffer = OccupancyBuffer(window=60)
+	buffer.add(rooms[0].id, 5)
+	buffer.add(rooms[2].id, -3)
+	unknown = ObjectId()
+	buffer.add(unknown, 1)
+	assert buffer.occupants([rooms[0].id, rooms[1].id, rooms[2].id, unknown]) == {
+		rooms[0].id: 15.0,
+		rooms[1].id: 2.0,
+		rooms[2].id: 0.0,
+	}
+
+
+def test_buffer_flushes_on_close(rooms):
+	"""Test that leaving the context manager writes the remaining deltas."""
+	with OccupancyBuffer(window=60) as buffer:
+		buffer.add(rooms[1].id, 3)
+	assert occupants(rooms[1]) == 5.0
+
+
+def test_buffer_background_flush(rooms):
+	"""Test that a started buffer flushes without further deltas and stops on close."""
+	buffer = OccupancyBuffer(window=0.01)
+	flushed = threading.Event()
+	original = buffer.flush
+
+	def flush():
+		written = original()
+		if written:
+			flushed.set()
+		return written
+
+	buffer.flush = flush
+	with buffer.start():
+		buffer._deltas[rooms[0].id] += 2
+		assert flushed.wait(5)
+		assert occupants(rooms[0]) == 12.0
+	assert buffer._thread is None
+
+
+def test_buffer_keeps_deltas_when_write_fails(rooms, monkeypatch):
+	"""Test that deltas are kept for the next flush when the bulk write fails."""
+	buffer = OccupancyBuffer(window=60)
+	buffer.add(rooms[0].id, 4)
+
+	def fail(deltas):
+		raise ConnectionError('primary unavailable')
+
+	monkeypatch.setattr('db.ingestion.flush_occupancy', fail)
+	with pytest.raises(ConnectionError):
+		buffer.flush()
+	assert buffer.pending(rooms[0].id) == 4.0
+	monkeypatch.undo()
+	assert buffer.flush() == 1
+	assert occupants(rooms[0]) == 14.0
+
+
+def test_ingestor_keeps_flows_when_write_fails(rooms, sensors, monkeypatch):
+	"""Test that room deltas whose write failed are written by the next flush."""
+	ingestor = SensorEventIngestor(window=60)
+	ingestor.add(sensors[0].id, FORWARD, 3)
+
+	def fail(deltas):
+		raise ConnectionError('primary unavailable')
+
+	monkeypatch.setattr('db.ingestion.flush_occupancy', fail)
+	with pytest.raises(ConnectionError):
+		ingestor.flush()
+	monkeypatch.undo()
+	ingestor.add(sensors[1].id, FORWARD, 1)
+	assert ingestor.flush() == 3
+	assert [occupants(room) for room in rooms] == [7.0, 4.0, 1.0]
+
+
+def test_ingestor_keeps_flows_when_resolving_fails(rooms, sensors, monkeypatch):
+	"""Test that flows are kept when the sensors cannot be resolved."""
+	ingestor = SensorEventIngestor(window=60)
+	ingestor.add(sensors[0].id, BACKWARD, 2)
+
+	def fail(sensor_ids):
+		raise ConnectionError('primary unavailable')
+
+	monkeypatch.setattr(ingestor, '_resolve', fail)
+	with pytest.raises(ConnectionError):
+		ingestor.flush()
+	monkeypatch.undo()
+	assert ingestor.flush() == 2
+	assert [occupants(room) for room in rooms] == [12.0, 0.0, 0.0]
@@ -0,0 +1,177 @@
+import logging
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.database import Database
+from db.monitoring import LATENCY_BUCKETS, QueryMonitor
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	for alias in list(Database._settings):
+		Database.disconnect(alias)
+	disconnect()
+
+
+def run_command(monitor, name, collection, seconds, request_id=1, failed=False):
+	"""Feed a started/succeeded (or failed) event pair to the monitor."""
+	command = {name: collection} if name != 'getMore' else {name: 42, 'collection': collection}
+	monitor.started(
+		SimpleNamespace(
+			command_name=name, command=command, request_id=request_id, connection_id=('h', 1)
+		)
+	)
+	finished = SimpleNamespace(
+		command_name=name,
+		request_id=request_id,
+		connection_id=('h', 1),
+		duration_micros=int(seconds * 1e6),
+		database_name='test',
+	)
+	(monitor.failed if failed else monitor.succeeded)(finished)
+
+
+def test_latency_histograms_per_collection_and_command():
+	"""Test that commands are bucketed by collection and command name."""
+	monitor = QueryMonitor()
+	run_command(monitor, 'find', 'room', 0.002)
+	run_command(monitor, 'find', 'room', 0.02, request_id=2)
+	run_command(monitor, 'getMore', 'room', 0.0005, request_id=3)
+	run_command(monitor, 'insert', 'sensor', 0.003, request_id=4, failed=True)
+
+	commands = {
+		(item['collection'], item['command']): item for item in monitor.snapshot()['commands']
+	}
+	find = commands['room', 'find']
+	assert find['count'] == 2
+	assert find['seconds'] == pytest.approx(0.022)
+	assert find['buckets'][0.0025] == 1
+	assert find['buckets'][0.025] == 1
+	assert sum(find['buckets'].values()) == 2
+	assert commands['room', 'getMore']['buckets'][LATENCY_BUCKETS[0]] == 1
+	assert commands['sensor', 'insert']['failures'] == 1
+
+
+def test_round_trips_per_operation():
+	"""Test that commands inside operation() blocks are counted per operation."""
+	monitor = QueryMonitor()
+	for call in range(2):
+		with monitor.operation('dashboard'):
+			run_command(monitor, 'find', 'room', 0.001, request_id=call * 10)
+			run_command(monitor, 'find', 'sensor', 0.001, request_id=call * 10 + 1)
+	run_command(monitor, 'find', 'room', 0.001, request_id=99)
+	assert monitor.snapshot()['operations'] == {
+		'dashboard': {'calls': 2, 'commands': 4, 'round_trips': 2.0}
+	}
+
+
+def test_slow_commands(caplog):
+	"""Test that commands above the threshold are kept and logged."""
+	monitor = QueryMonitor(slow_threshold=0.05, max_slow=2)
+	with caplog.at_level(logging.WARNING, logger='db.monitoring'):
+		with monitor.operation('report'):
+			run_command(monitor, 'aggregate', 'room', 0.2)
+		run_command(monitor, 'find', 'room', 0.01, request_id=2)
+	(slow,) = monitor.snapshot()['slow_commands']
+	assert slow == {
+		'collection': 'room',
+		'command': 'aggregate',
+		'seconds': 0.2,
+		'operation': 'report',
+		'failed': False,
+	}
+	assert 'Slow aggregate on room' in caplog.text
+	for request_id in range(3):
+		run_command(monitor, 'find', 'room', 0.1, request_id=request_id)
+	assert len(monitor.slow_commands) == 2
+
+
+def test_pool_events():
+	"""Test the connection pool counters and checked-out gauge."""
+	monitor = QueryMonitor()
+	event = SimpleNamespace()
+	monitor.connection_created(event)
+	monitor.connection_checked_out(event)
+	monitor.connection_checked_out(event)
+	monitor.connection_checked_in(event)
+	monitor.connection_check_out_failed(event)
+	monitor.pool_cleared(event)
+	assert monitor.snapshot()['pool'] == {
+		'created': 1,
+		'closed': 0,
+		'checkouts': 2,
+		'checkout_failures': 1,
+		'cleared': 1,
+		'checked_out': 1,
+	}
+
+
+def test_prometheus_text():
+	"""Test the Prometheus exposition of histograms and counters."""
+	monitor = QueryMonitor()
+	with monitor.operation('dashboard'):
+		run_command(monitor, 'find', 'room', 0.002)
+	text = monitor.prometheus()
+	labels = 'collection="room",command="find"'
+	assert f'db_command_duration_seconds_bucket{{{labels},le="0.001"}} 0' in text
+	assert f'db_command_duration_seconds_bucket{{{labels},le="0.0025"}} 1' in text
+	assert f'db_command_duration_seconds_bucket{{{labels},le="2.5"}} 1' in text
+	assert f'db_command_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+	assert f'db_command_duration_seconds_count{{{labels}}} 1' in text
+	assert 'db_operation_commands_total{operation="dashboard"} 1' in text
+	assert 'db_pool_checked_out 0' in text
+	assert '# TYPE db_pool_created_total counter' in text
+
+
+def test_reset():
+	monitor = QueryMonitor()
+	run_command(monitor, 'find', 'room', 0.2)
+	monitor.reset()
+	assert monitor.snapshot() == {
+		'commands': [],
+		'operations': {},
+		'slow_commands': [],
+		'pool': dict.fromkeys(
+			('created', 'closed', 'checkouts', 'checkout_failures', 'cleared', 'checked_out'), 0
+		),
+	}
+
+
+def test_database_registers_monitor(monkeypatch):
+	"""Test that Database passes the monitor to the driver as an event listener."""
+	calls = []
+	monkeypatch.setattr('db.database.connect', lambda **kwargs: calls.append(kwargs))
+	monitor = QueryMonitor()
+	Database(uri='mongodb://localhost/test', alias='monitored', monitor=monitor)
+	assert calls[0]['event_listeners'] == [monitor]
+	assert Database.get_monitor('monitored') is monitor
+	Database.disconnect('monitored')
+	assert Database.get_monitor('monitored') is None
+
+
+def test_monitor_accepted_by_pymongo():
+	"""Test that pymongo accepts the monitor as command and pool listener."""
+	monitor = QueryMonitor()
+	Database(
+		uri='mongodb://localhost:1/test',
+		alias='real',
+		monitor=monitor,
+		connect=False,
+		uuidRepresentation='standard',
+	)
+	from mongoengine.connection import get_connection
+
+	listeners = get_connection('real').options.event_listeners
+	assert monitor in listeners
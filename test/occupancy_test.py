@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.models import OccupancyBucket, OccupancyPoint
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+T0 = datetime(2025, 3, 1, 10, 0)
+
+
+@pytest.fixture
+def room(room_factory):
+	room = room_factory('Lobby')
+	OccupancyBucket.record_many(
+		[
+			(room.pk, 4, T0 + timedelta(seconds=10)),
+			(room.pk, 8, T0 + timedelta(seconds=40)),
+			(room.pk, 6, T0 + timedelta(minutes=1, seconds=5)),
+			(room.pk, 2, T0 + timedelta(hours=1, minutes=30)),
+		]
+	)
+	return room
+
+
+def test_samples_are_bucketed_per_room_and_hour(room):
+	"""Test that samples share one document per room and hour, with rollups."""
+	buckets = OccupancyBucket.objects(room=room).order_by('start')
+	assert [bucket.start for bucket in buckets] == [T0, T0 + timedelta(hours=1)]
+	first = buckets[0]
+	assert [sample.occupants for sample in first.samples] == [4, 8, 6]
+	assert (first.hour.count, first.hour.total, first.hour.min, first.hour.max) == (3, 18, 4, 8)
+	assert (first.minutes['0'].count, first.minutes['0'].max) == (2, 8)
+	assert first.minutes['1'].min == 6
+
+
+def test_series_minute_resolution(room):
+	"""Test minute rollups over a range spanning two buckets."""
+	series = OccupancyBucket.series([room.pk], T0, T0 + timedelta(hours=2))
+	assert series[room.pk] == [
+		OccupancyPoint(T0, 4, 8, 6, 2),
+		OccupancyPoint(T0 + timedelta(minutes=1), 6, 6, 6, 1),
+		OccupancyPoint(T0 + timedelta(hours=1, minutes=30), 2, 2, 2, 1),
+	]
+
+
+def test_series_hour_resolution_overlapping_range(room):
+	"""Test that hour rollups overlapping the range are included."""
+	series = OccupancyBucket.series(
+		[room.pk], T0 + timedelta(minutes=30), T0 + timedelta(hours=1), 'hour'
+	)
+	assert series[room.pk] == [OccupancyPoint(T0, 4, 8, 6, 3)]
+
+
+def test_series_raw_resolution(room):
+	"""Test that raw samples are filtered to the exact range."""
+	series = OccupancyBucket.series(
+		[str(room.pk)], T0 + timedelta(seconds=20), T0 + timedelta(minutes=1, seconds=5), 'raw'
+	)
+	assert series[room.pk] == [OccupancyPoint(T0 + timedelta(seconds=40), 8, 8, 8, 1)]
+
+
+def test_series_reads_only_needed_buckets(room, monkeypatch):
+	"""Test that rollup queries skip raw samples and buckets outside the range."""
+	collection = OccupancyBucket._get_collection()
+	calls = []
+	original = collection.find
+
+	def find(query, projection):
+		calls.append((query, projection))
+		return original(query, projection)
+
+	monkeypatch.setattr(collection, 'find', find)
+	OccupancyBucket.series([room.pk], T0 + timedelta(hours=1), T0 + timedelta(hours=2), 'hour')
+	((query, projection),) = calls
+	assert 'samples' not in projection
+	assert len(list(original(query))) == 1
+
+
+def test_series_timezone_aware_and_empty(room_factory):
+	"""Test that aware datetimes are converted to UTC and unknown rooms are empty."""
+	room = room_factory('Office')
+	aware = datetime(2025, 3, 1, 11, 15, tzinfo=timezone(timedelta(hours=1)))
+	OccupancyBucket.record(room.pk, 3, aware)
+	other = room_factory('Shop')
+	series = OccupancyBucket.series([room.pk, other.pk], T0, T0 + timedelta(hours=1), 'raw')
+	assert series == {
+		room.pk: [OccupancyPoint(T0 + timedelta(minutes=15), 3, 3, 3, 1)],
+		other.pk: [],
+	}
+
+
+def test_invalid_input(room_factory):
+	room = room_factory('Office')
+	with pytest.raises(ValueError):
+		OccupancyBucket.record(room.pk, -1, T0)
+	with pytest.raises(ValueError):
+		OccupancyBucket.series([room.pk], T0, T0, 'second')
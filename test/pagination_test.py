@@ -0,0 +1,124 @@
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.models import Room, Sensor
+from db.pagination import Page, iter_batches, iter_documents, page
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+@pytest.fixture
+def rooms():
+	return [
+		Room(
+			name=f'Room {i}',
+			type='OFFICE',
+			crowd_factor=0.5,
+			popularity_factor=0.5,
+			occupants=float(i),
+			longitude=12.34,
+			latitude=56.78,
+			floor=i % 3 + 1,
+			borders=[[1.1, 1.0], [1.2, 1.0], [1.2, 1.1]],
+		).save()
+		for i in range(7)
+	]
+
+
+def test_iter_batches_walks_in_id_order(rooms):
+	"""Test that batches cover every room once, in _id order, with the given size."""
+	batches = list(iter_batches(Room, batch_size=3))
+	assert [len(batch) for batch in batches] == [3, 3, 1]
+	assert [room.pk for batch in batches for room in batch] == sorted(room.pk for room in rooms)
+
+
+def test_iter_batches_exact_multiple(rooms):
+	"""Test that a collection filling the last batch exactly yields no empty batch."""
+	assert [len(batch) for batch in iter_batches(Room, batch_size=7)] == [7]
+	assert list(iter_batches(Room, floor=3, occupants__gt=100)) == []
+
+
+def test_iter_documents_filters_and_fields(rooms):
+	"""Test filters, field projections and raw dicts."""
+	documents = list(iter_documents(Room, batch_size=2, fields=['name'], floor=1))
+	assert [room.name for room in documents] == ['Room 0', 'Room 3', 'Room 6']
+	assert all(room.occupants == 0 for room in documents)
+	raw = list(iter_documents(Room, batch_size=2, fields=['name'], raw=True, floor=1))
+	assert raw == [{'_id': room.pk, 'name': room.name} for room in documents]
+
+
+def test_iter_batches_sees_rooms_added_ahead(rooms):
+	"""Test that rooms inserted while walking are reached if their _id is ahead."""
+	seen = []
+	for batch in iter_batches(Room, batch_size=4):
+		seen.extend(room.name for room in batch)
+		if len(seen) == 4:
+			rooms[0].delete()
+			Room(**{**rooms[1].to_mongo().to_dict(), '_id': None, 'name': 'New'}).save()
+	assert seen == [f'Room {i}' for i in range(7)] + ['New']
+
+
+def test_iter_batches_rejects_bad_size():
+	"""Test that a batch size below one raises a ValueError."""
+	with pytest.raises(ValueError):
+		next(iter_batches(Room, batch_size=0))
+
+
+def test_page_cursor_walk(rooms):
+	"""Test that following next_cursor returns every room once and ends with None."""
+	names = []
+	cursor = None
+	pages = 0
+	while True:
+		result = page(Room, cursor, limit=3)
+		assert isinstance(result, Page)
+		names.extend(room.name for room in result.items)
+		pages += 1
+		cursor = result.next_cursor
+		if cursor is None:
+			break
+	assert names == [f'Room {i}' for i in range(7)]
+	assert pages == 3
+
+
+def test_page_exact_last_page(rooms):
+	"""Test that a full last page has no next cursor."""
+	first = page(Room, limit=5, floor__in=[1, 2])
+	assert len(first.items) == 5
+	assert first.next_cursor is None
+
+
+def test_page_raw_sensors(rooms):
+	"""Test paging raw sensor documents with a projection."""
+	for i in range(3):
+		Sensor(
+			name=f'Sensor {i}',
+			rooms=rooms[i : i + 2],
+			latitude=56.78,
+			longitude=12.34,
+			is_vertical=False,
+		).save()
+	first = page(Sensor, limit=2, fields=['name'], raw=True)
+	assert [item['name'] for item in first.items] == ['Sensor 0', 'Sensor 1']
+	second = page(Sensor, first.next_cursor, limit=2, fields=['name'], raw=True)
+	assert second == Page([{'_id': second.items[0]['_id'], 'name': 'Sensor 2'}], None)
+
+
+@pytest.mark.parametrize('cursor', ['nope', '0' * 23])
+def test_page_invalid_cursor(cursor):
+	"""Test that malformed cursors raise a ValueError."""
+	with pytest.raises(ValueError):
+		page(Room, cursor)
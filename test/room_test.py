@@ -1,12 +1,20 @@
+import numpy as np
 import pytest
 from mongoengine import connect, disconnect
 import mongomock
 from db.models import Room
-from mongoengine.errors import ValidationError
+from mongoengine.errors import InvalidQueryError, ValidationError
 
-numeric_fields = ['crowd_factor', 'popularity_factor', 'area', 'longitude', 'latitude']
-numerics_with_no_bounds = ['area', 'longitude', 'latitude']
+numeric_fields = ['crowd_factor', 'popularity_factor', 'area']
+numerics_with_no_bounds = ['area']
+coordinate_limits = {'longitude': 180.0, 'latitude': 90.0}
 numeric_factors = ['crowd_factor', 'popularity_factor']
+square_borders = [
+	[12.340000, 56.780000],
+	[12.340180, 56.780000],
+	[12.340180, 56.780090],
+	[12.340000, 56.780090],
+]
 
 
 @pytest.fixture(autouse=True)
@@ -75,6 +83,18 @@ def test_missing_required_fields():
 		room.validate()
 
 
+@pytest.mark.parametrize(('field', 'limit'), coordinate_limits.items())
+def test_coordinate_bounds(valid_room_data, field, limit):
+	"""Test that coordinates are valid anywhere on Earth, west and south included."""
+	for value in (-limit, -1.0, 0.0, limit):
+		valid_room_data[field] = value
+		Room(**valid_room_data).validate()
+	for value in (-limit - 0.1, limit + 0.1):
+		valid_room_data[field] = value
+		with pytest.raises(ValidationError):
+			Room(**valid_room_data).validate()
+
+
 def test_zero_values(valid_room_data):
 	# Test boundary case with zero values (should be valid)
 
@@ -235,9 +255,19 @@ def test_popularity_factor_none(valid_room_data):
 
 
 def test_area_none(valid_room_data):
-	"""Test that a None value for area raises a ValidationError."""
+	"""Test that a missing area is derived from the borders."""
 	valid_room_data['area'] = None
+	valid_room_data['borders'] = square_borders
 	room = Room(**valid_room_data)
+	room.validate()
+	assert room.area == 110.28
+
+
+def test_area_none_on_loaded_room(valid_room_data):
+	"""Test that clearing the area of a stored room raises a ValidationError."""
+	room = Room(**valid_room_data)
+	room.save()
+	room.area = None
 	with pytest.raises(ValidationError):
 		room.validate()
 
@@ -325,6 +355,31 @@ def test_invalid_borders_non_float_coordinates(valid_room_data):
 			room.validate()
 
 
+@pytest.mark.parametrize(
+	'borders',
+	[
+		[[181.0, 1.0], [1.2, 1.0], [1.3, 1.1]],
+		[[1.1, 1.0], [1.2, -90.5], [1.3, 1.1]],
+		np.array([[1.1, 1.0], [-180.1, 1.0], [1.3, 1.1]]),
+		np.array([[1.1, 1.0], [1.2, 1.0], [1.3, 91.0]]),
+	],
+)
+def test_invalid_borders_out_of_range(valid_room_data, borders):
+	"""Test that borders the location index would reject fail validation, also in batches."""
+	valid_room_data['borders'] = borders
+	with pytest.raises(ValidationError, match='longitude -180 to 180'):
+		Room(**valid_room_data).validate()
+	result = Room.bulk_upsert([valid_room_data])
+	assert [index for index, _ in result.errors] == [0]
+	assert Room.objects.count() == 0
+
+
+def test_borders_at_range_limits(valid_room_data):
+	"""Test that coordinates on the range limits are accepted."""
+	valid_room_data['borders'] = [[-180.0, -90.0], [180.0, -90.0], [180.0, 90.0]]
+	Room(**valid_room_data).validate()
+
+
 def test_valid_borders(valid_room_data):
 	"""Test that valid borders pass validation."""
 	valid_room_data['borders'] = [[1.1, 1.0], [1.2, 1.0], [1.3, 1.1]]
@@ -373,3 +428,260 @@ def test_compute_area_with_five_borders(valid_room_data):
 	area = room.compute_area()
 	assert area == 72.5
 
+
+def test_compute_areas_matches_compute_area(valid_room_data):
+	"""Test that the batch computation agrees with compute_area for every room."""
+	borders_list = [
+		[
+			[12.340000, 56.780000],
+			[12.340180, 56.780000],
+			[12.340180, 56.780090],
+			[12.340000, 56.780090],
+		],
+		[
+			[12.340000, 56.780000],
+			[12.340090, 56.780000],
+			[12.340130, 56.780050],
+			[12.340045, 56.780120],
+			[12.339990, 56.780050],
+		],
+		[[0.0, 0.0], [4.0, 0.0]],
+	]
+	rooms = []
+	for borders in borders_list:
+		valid_room_data['borders'] = borders
+		rooms.append(Room(**valid_room_data))
+	assert Room.compute_areas(rooms) == [room.compute_area() for room in rooms]
+	assert Room.compute_areas(rooms) == [110.28, 72.5, 0.0]
+
+
+def test_compute_areas_matches_pyproj(valid_room_data):
+	"""Test that the batched areas agree with pyproj's geodesic area on random rooms."""
+	from pyproj import Geod
+
+	geod = Geod(ellps='WGS84')
+	rng = np.random.default_rng(0)
+	rooms = []
+	expected = []
+	# Rooms from about 10 m to about 200 m across, at latitudes all over the globe
+	for spread in (1e-4, 1e-3):
+		for _ in range(1000):
+			lon, lat = rng.uniform(-180, 180), rng.uniform(-80, 80)
+			count = rng.integers(3, 13)
+			lons = lon + rng.uniform(-spread, spread, count)
+			lats = lat + rng.uniform(-spread / 2, spread / 2, count)
+			valid_room_data['borders'] = np.column_stack([lons, lats]).tolist()
+			rooms.append(Room(**valid_room_data))
+			expected.append(abs(geod.polygon_area_perimeter(lons, lats)[0]))
+	# Within rounding to 0.01 m² plus a relative error far below a room's precision
+	np.testing.assert_allclose(Room.compute_areas(rooms), expected, rtol=1e-5, atol=0.01)
+
+
+def test_compute_areas_from_queryset(valid_room_data):
+	"""Test that compute_areas accepts a queryset and keeps its order."""
+	valid_room_data['borders'] = [
+		[12.340000, 56.780000],
+		[12.340180, 56.780000],
+		[12.340180, 56.780090],
+		[12.340000, 56.780090],
+	]
+	Room(**valid_room_data).save()
+	valid_room_data['name'] = 'Second Room'
+	valid_room_data['borders'] = [[1.1, 1.0], [1.2, 1.0], [1.2, 1.0]]
+	Room(**valid_room_data).save()
+	assert Room.compute_areas(Room.objects().order_by('name')) == [0.0, 110.28]
+
+
+def test_compute_areas_empty():
+	"""Test that compute_areas returns an empty list when no rooms are given."""
+	assert Room.compute_areas([]) == []
+
+
+def test_geometry_computed_on_save(valid_room_data):
+	"""Test that centroid and bounding box are stored when a room is saved."""
+	del valid_room_data['area']
+	valid_room_data['borders'] = square_borders
+	Room(**valid_room_data).save()
+	room = Room.objects(name=valid_room_data['name']).first()
+	assert room is not None
+	assert room.area == 110.28
+	assert room.centroid_longitude == pytest.approx(12.34009)
+	assert room.centroid_latitude == pytest.approx(56.780045)
+	assert room.min_longitude == 12.34
+	assert room.min_latitude == 56.78
+	assert room.max_longitude == 12.34018
+	assert room.max_latitude == 56.78009
+
+
+def test_explicit_area_is_kept(valid_room_data):
+	"""Test that an area given alongside the borders is not overwritten."""
+	valid_room_data['borders'] = square_borders
+	room = Room(**valid_room_data)
+	room.save()
+	assert room.area == 100.0
+	assert room.min_longitude == 12.34
+
+
+def test_derived_area_follows_changed_borders(valid_room_data):
+	"""Test that an area derived by an earlier validation is recomputed for new borders."""
+	del valid_room_data['area']
+	valid_room_data['borders'] = square_borders[:3]
+	room = Room(**valid_room_data)
+	room.validate()
+	assert room.area == 55.14
+	room.borders = square_borders
+	room.save()
+	assert room.area == 110.28
+	loaded = Room.objects(_id=room.id).first()
+	loaded.borders = square_borders[:3]
+	loaded.validate()
+	loaded.borders = square_borders
+	loaded.save()
+	assert Room.objects(_id=room.id).first().area == 110.28
+	# An area assigned after a validation is kept
+	loaded.area = 80.0
+	loaded.borders = square_borders[:3]
+	loaded.save()
+	assert Room.objects(_id=room.id).first().area == 80.0
+
+
+def test_degenerate_borders_centroid(valid_room_data):
+	"""Test that borders without enclosed area use the vertex mean as centroid."""
+	room = Room(**valid_room_data)
+	room.save()
+	assert room.centroid_longitude == pytest.approx(3.5 / 3)
+	assert room.centroid_latitude == pytest.approx(1.0)
+
+
+def test_geometry_recomputed_when_borders_change(valid_room_data):
+	"""Test that changing borders on a stored room refreshes its derived geometry."""
+	room = Room(**valid_room_data)
+	room.save()
+	loaded = Room.objects(_id=room.id).first()
+	loaded.borders = square_borders
+	loaded.save()
+	reloaded = Room.objects(_id=room.id).first()
+	assert reloaded.area == 110.28
+	assert reloaded.max_latitude == 56.78009
+
+
+def test_geometry_not_recomputed_when_borders_unchanged(valid_room_data, monkeypatch):
+	"""Test that saving other field changes skips the geometry computation."""
+	room = Room(**valid_room_data)
+	room.save()
+	loaded = Room.objects(_id=room.id).first()
+
+	def fail():
+		raise AssertionError('geometry should not be recomputed')
+
+	monkeypatch.setattr(loaded, 'update_geometry', fail)
+	loaded.occupants = 5.0
+	loaded.save()
+	assert Room.objects(_id=room.id).first().occupants == 5.0
+
+
+def test_queryset_update_recomputes_geometry(valid_room_data):
+	"""Test that replacing borders through a queryset update refreshes the derived geometry."""
+	room = Room(**valid_room_data)
+	room.save()
+	Room.objects(_id=room.id).update(set__borders=square_borders)
+	stored = Room._get_collection().find_one({'_id': room.id})
+	assert stored['area'] == 110.28
+	assert stored['centroid_longitude'] == pytest.approx(12.34009)
+	assert stored['max_latitude'] == 56.78009
+	assert stored['location']['coordinates'] == pytest.approx([12.34009, 56.780045])
+	# An area set in the same update is kept, as on save
+	Room.objects(_id=room.id).update(borders=square_borders[:3], area=50.0)
+	assert Room.objects(_id=room.id).first().area == 50.0
+
+
+@pytest.mark.parametrize(
+	'update',
+	[
+		{'push__borders': [1.0, 1.0]},
+		{'set__borders__0': [1.0, 1.0]},
+		{'unset__borders': True},
+	],
+)
+def test_queryset_update_rejects_partial_border_updates(valid_room_data, update):
+	"""Test that border updates the geometry cannot follow are rejected."""
+	room = Room(**valid_room_data)
+	room.save()
+	with pytest.raises(InvalidQueryError):
+		Room.objects(_id=room.id).update(**update)
+	with pytest.raises(ValidationError):
+		Room.objects(_id=room.id).update(set__borders=[[1.0, 1.0]])
+
+
+def test_backfill_geometry(valid_room_data):
+	"""Test that rooms stored without derived geometry get it, keeping a stored area."""
+	valid_room_data['borders'] = square_borders
+	rooms = [Room(**valid_room_data).save() for _ in range(3)]
+	collection = Room._get_collection()
+	unset = {name: '' for name in ('centroid_longitude', 'min_latitude', 'location')}
+	collection.update_many({}, {'$unset': {**unset, 'area': ''}})
+	collection.update_one({'_id': rooms[0].id}, {'$set': {'area': 100.0}})
+	assert Room.backfill_geometry(batch_size=2) == 3
+	assert Room.backfill_geometry() == 0
+	stored = [collection.find_one({'_id': room.id}) for room in rooms]
+	assert [document['area'] for document in stored] == [100.0, 110.28, 110.28]
+	assert stored[1]['centroid_longitude'] == pytest.approx(12.34009)
+	assert stored[1]['min_latitude'] == 56.78
+	assert stored[1]['location']['coordinates'] == pytest.approx([12.34009, 56.780045])
+	assert stored[1]['version'] == 1
+
+
+def test_location_point_follows_centroid(valid_room_data):
+	"""Test that the GeoJSON location is kept at the centroid."""
+	valid_room_data['borders'] = square_borders
+	room = Room(**valid_room_data)
+	room.save()
+	stored = Room._get_collection().find_one({'_id': room.id})
+	assert stored['location']['type'] == 'Point'
+	assert stored['location']['coordinates'] == pytest.approx([12.34009, 56.780045])
+
+
+def test_loaded_room_validates_only_changed_fields(valid_room_data, monkeypatch):
+	"""Test that an occupancy change on a stored room does not re-check its borders."""
+	room = Room(**valid_room_data)
+	room.save()
+	loaded = Room.objects(_id=room.id).first()
+
+	def fail(*args):
+		raise AssertionError('borders should not be validated')
+
+	monkeypatch.setattr(loaded, 'validate_borders', fail)
+	loaded.occupants = 5.0
+	loaded.validate()
+
+
+def test_validate_batch_checks_borders_once(valid_room_data, monkeypatch):
+	"""Test that batch validation checks each room's borders once and still reports them."""
+	rooms = [Room(**valid_room_data) for _ in range(3)]
+	rooms[1].borders = [[0.0, 0.0]]
+	calls = []
+	validate_borders = Room.validate_borders
+
+	def counting(self, value, error_message):
+		calls.append(self)
+		return validate_borders(self, value, error_message)
+
+	monkeypatch.setattr(Room, 'validate_borders', counting)
+	errors = Room._validate_batch(rooms)
+	assert [id(room) for room in calls] == [id(room) for room in rooms]
+	assert errors[0] is None and errors[2] is None
+	assert 'borders' in errors[1].errors
+
+
+def test_loaded_room_invalid_change_raises(valid_room_data):
+	"""Test that a changed field on a stored room is still validated."""
+	room = Room(**valid_room_data)
+	room.save()
+	loaded = Room.objects(_id=room.id).first()
+	loaded.occupants = -1.0
+	with pytest.raises(ValidationError):
+		loaded.validate()
+	loaded.occupants = 1.0
+	loaded.borders = [[0.0, 0.0]]
+	with pytest.raises(ValidationError):
+		loaded.validate()
@@ -0,0 +1,179 @@
+import heapq
+import random
+
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.graph import BuildingGraph
+from db.models import Room, Sensor
+from db.routing import Router
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+# Routing costs scale with crowd_factor * popularity_factor / area
+ROUTED = {'crowd_factor': 1.0, 'popularity_factor': 1.0, 'area': 100.0}
+
+
+def connect_rooms(a: Room, b: Room, is_vertical: bool = False):
+	Sensor(
+		name=f'{a.name}{b.name}', rooms=[a, b], latitude=1.0, longitude=1.0, is_vertical=is_vertical
+	).save()
+
+
+@pytest.fixture
+def rooms(room_factory):
+	"""A short route A - B - D and a longer detour A - C - E - D."""
+	rooms = {
+		'A': room_factory('A', longitude=12.0000, latitude=56.0000, **ROUTED),
+		'B': room_factory('B', longitude=12.0002, latitude=56.0000, **ROUTED),
+		'C': room_factory('C', longitude=12.0000, latitude=56.0002, **ROUTED),
+		'D': room_factory('D', longitude=12.0004, latitude=56.0000, **ROUTED),
+		'E': room_factory('E', longitude=12.0004, latitude=56.0002, **ROUTED),
+		'F': room_factory('F', longitude=12.0010, latitude=56.0010, **ROUTED),
+	}
+	for a, b in ['AB', 'BD', 'AC', 'CE', 'ED']:
+		connect_rooms(rooms[a], rooms[b])
+	return rooms
+
+
+def names(route) -> str:
+	return ''.join(Room.objects(_id=room_id).first().name for room_id in route.rooms)
+
+
+def test_shortest_route_without_crowds(rooms):
+	"""Test that empty rooms give the geometrically shortest route."""
+	route = Router(BuildingGraph.load()).route(rooms['A'].id, rooms['D'].id)
+	assert names(route) == 'ABD'
+	assert route.cost == pytest.approx(2 * 12.43, rel=0.01)
+
+
+def test_route_avoids_crowded_room(rooms):
+	"""Test that a crowded room on the short route makes the detour cheaper."""
+	Room.objects(_id=rooms['B'].id).update(occupants=1000.0)
+	router = Router(BuildingGraph.load())
+	assert names(router.route(rooms['A'].id, rooms['D'].id)) == 'ACED'
+	assert names(Router(router.graph, crowd_weight=0).route(rooms['A'].id, rooms['D'].id)) == 'ABD'
+
+
+def test_refresh_picks_up_new_occupancy(rooms):
+	"""Test that refreshing the graph and router updates the edge costs."""
+	graph = BuildingGraph.load()
+	router = Router(graph)
+	assert names(router.route(rooms['A'].id, rooms['D'].id)) == 'ABD'
+	Room.objects(_id=rooms['B'].id).update(occupants=1000.0)
+	graph.refresh_rooms([rooms['B'].id])
+	router.refresh()
+	assert names(router.route(rooms['A'].id, rooms['D'].id)) == 'ACED'
+
+
+def test_vertical_edges_cost_extra(rooms, room_factory):
+	"""Test that vertical sensors add their fixed cost."""
+	upstairs = room_factory('U', longitude=12.0000, latitude=56.0000, floor=2, **ROUTED)
+	connect_rooms(rooms['A'], upstairs, is_vertical=True)
+	route = Router(BuildingGraph.load(), vertical_cost=25.0).route(rooms['A'].id, upstairs.id)
+	assert route.cost == pytest.approx(25.0)
+
+
+def test_unreachable_and_trivial_routes(rooms):
+	"""Test that disconnected rooms give None and a room routes to itself for free."""
+	router = Router(BuildingGraph.load())
+	assert router.route(rooms['A'].id, rooms['F'].id) is None
+	route = router.route(rooms['A'].id, rooms['A'].id)
+	assert route.rooms == [rooms['A'].id]
+	assert route.cost == 0.0
+
+
+def test_routes_answers_many_queries(rooms):
+	"""Test that routes returns one answer per pair."""
+	router = Router(BuildingGraph.load())
+	results = router.routes([(rooms['A'].id, rooms['E'].id), (rooms['F'].id, rooms['A'].id)])
+	assert names(results[0]) == 'ACE'
+	assert results[1] is None
+
+
+def crowded_grid(room_factory) -> dict:
+	"""A 6x6 grid of rooms with random crowds, missing a fifth of its sensors."""
+	rng = random.Random(0)
+	grid = {}
+	for row in range(6):
+		for column in range(6):
+			room = room_factory(
+				f'{row}{column}',
+				longitude=12.0 + column * 2e-4,
+				latitude=56.0 + row * 1e-4,
+				**ROUTED,
+			)
+			room.occupants = float(rng.randint(0, 300))
+			room.save()
+			grid[row, column] = room
+	for (row, column), room in grid.items():
+		for neighbor in (grid.get((row, column + 1)), grid.get((row + 1, column))):
+			if neighbor is not None and rng.random() < 0.8:
+				connect_rooms(room, neighbor)
+	return grid
+
+
+def test_routes_match_dijkstra(room_factory):
+	"""Test that A* returns the optimal cost on a crowded random grid, with and without landmarks."""
+	grid = crowded_grid(room_factory)
+	graph = BuildingGraph.load()
+	router = Router(graph)
+	routers = [router, Router(graph, landmarks=0), Router(graph, landmarks=graph.n_rooms)]
+
+	def dijkstra(source: int) -> dict:
+		costs = {source: 0.0}
+		heap = [(0.0, source)]
+		while heap:
+			cost, node = heapq.heappop(heap)
+			if cost > costs[node]:
+				continue
+			for edge in range(router._indptr[node], router._indptr[node + 1]):
+				neighbor, new_cost = router._indices[edge], cost + router._weights[edge]
+				if new_cost < costs.get(neighbor, float('inf')):
+					costs[neighbor] = new_cost
+					heapq.heappush(heap, (new_cost, neighbor))
+		return costs
+
+	index = router.graph.room_index
+	for source in grid.values():
+		costs = dijkstra(index[source.id])
+		for target in grid.values():
+			for each in routers:
+				route = each.route(source.id, target.id)
+				if index[target.id] in costs:
+					assert route.cost == pytest.approx(costs[index[target.id]])
+				else:
+					assert route is None
+
+
+def test_refresh_updates_landmark_bounds(room_factory):
+	"""Test that landmark costs follow cleared crowds, so routes stay optimal."""
+	grid = crowded_grid(room_factory)
+	graph = BuildingGraph.load()
+	router = Router(graph, landmarks=graph.n_rooms)
+	Room.objects.update(occupants=0.0)
+	graph.refresh_rooms()
+	router.refresh()
+	shortest = Router(graph, landmarks=0)
+	for source in grid.values():
+		for target in grid.values():
+			route = router.route(source.id, target.id)
+			expected = shortest.route(source.id, target.id)
+			if expected is None:
+				assert route is None
+			else:
+				assert route.cost == pytest.approx(expected.cost)
@@ -4,6 +4,7 @@ import mongomock
 from db.models.sensor import Sensor
 from db.models.room import Room
 from mongoengine.errors import ValidationError
+from bson import ObjectId
 
 
 @pytest.fixture(autouse=True)
@@ -111,3 +112,123 @@ def test_invalid_coordinates_invalid_longitude(valid_sensor_data):
 	with pytest.raises(ValidationError):
 		sensor.validate()
 
+
+def count_finds(monkeypatch) -> dict:
+	"""Count find() calls per collection name."""
+	import mongomock.collection
+
+	counts = {}
+	original = mongomock.collection.Collection.find
+
+	def find(self, *args, **kwargs):
+		counts[self.name] = counts.get(self.name, 0) + 1
+		return original(self, *args, **kwargs)
+
+	monkeypatch.setattr(mongomock.collection.Collection, 'find', find)
+	return counts
+
+
+def create_sensors(num: int) -> list[Sensor]:
+	"""Create num sensors, each between two freshly created rooms."""
+	sensors = []
+	for i in range(num):
+		rooms = []
+		for j in range(2):
+			room = Room(
+				name=f'Room {i}-{j}',
+				type='OFFICE',
+				crowd_factor=0.5,
+				popularity_factor=0.5,
+				area=100.0,
+				longitude=12.34,
+				latitude=56.78,
+				floor=1,
+				borders=[[1.1, 1.0], [1.2, 1.0], [1.2, 1.0]],
+			)
+			room.save()
+			rooms.append(room)
+		sensor = Sensor(
+			name=f'Sensor {i}', rooms=rooms, latitude=1.0, longitude=1.0, is_vertical=False
+		)
+		sensor.save()
+		sensors.append(sensor)
+	return sensors
+
+
+def test_load_with_rooms_uses_two_queries(monkeypatch):
+	"""Test that sensors and all their rooms are loaded with one query each."""
+	create_sensors(5)
+	counts = count_finds(monkeypatch)
+	sensors = Sensor.load_with_rooms()
+	names = [[room.name for room in sensor.rooms] for sensor in sensors]
+	assert counts == {'sensor': 1, 'room': 1}
+	assert sorted(names) == [[f'Room {i}-0', f'Room {i}-1'] for i in range(5)]
+	assert all(sensor._get_changed_fields() == [] for sensor in sensors)
+
+
+def test_load_with_rooms_filters():
+	"""Test that filters are passed on to the sensor query."""
+	create_sensors(3)
+	sensors = Sensor.load_with_rooms(name='Sensor 1')
+	assert [sensor.name for sensor in sensors] == ['Sensor 1']
+	assert sensors[0].rooms[1].name == 'Room 1-1'
+
+
+def test_prefetch_rooms_reuses_given_rooms(monkeypatch):
+	"""Test that already loaded rooms are not fetched again."""
+	create_sensors(2)
+	rooms = list(Room.objects())
+	sensors = list(Sensor.objects())
+	counts = count_finds(monkeypatch)
+	Sensor.prefetch_rooms(sensors, rooms=rooms)
+	assert counts == {}
+	assert sensors[0].rooms[0] is rooms[0]
+
+
+def test_prefetch_rooms_keeps_missing_references():
+	"""Test that references to deleted rooms are left unresolved."""
+	sensor = create_sensors(1)[0]
+	missing_id = sensor.rooms[1].id
+	sensor.rooms[1].delete()
+	loaded = Sensor.load_with_rooms()[0]
+	assert loaded.rooms[0].name == 'Room 0-0'
+	assert loaded.rooms[1].id == missing_id
+
+
+def test_bulk_upsert_resolves_rooms_with_one_query(monkeypatch):
+	"""Test that bulk upserted sensors have their rooms checked with one query per chunk."""
+	rooms = [sensor.rooms[0] for sensor in create_sensors(3)]
+	missing_id = ObjectId()
+	records = [
+		{
+			'name': f'Bulk {i}',
+			'rooms': [rooms[i % 3].id, rooms[(i + 1) % 3].id],
+			'latitude': 1.0,
+			'longitude': 1.0,
+			'is_vertical': False,
+		}
+		for i in range(10)
+	]
+	records[4]['rooms'][1] = missing_id
+	counts = count_finds(monkeypatch)
+	result = Sensor.bulk_upsert(records)
+	assert counts == {'room': 1}
+	assert result.inserted == 9
+	[(index, error)] = result.errors
+	assert index == 4
+	assert str(missing_id) in str(error)
+
+
+def test_validate_resolves_room_ids(monkeypatch):
+	"""Test that a sensor given room ids is validated with one room query."""
+	rooms = [sensor.rooms[0] for sensor in create_sensors(2)]
+	sensor = Sensor(
+		name='S', rooms=[room.id for room in rooms], latitude=1.0, longitude=1.0, is_vertical=False
+	)
+	counts = count_finds(monkeypatch)
+	sensor.validate()
+	assert counts == {'room': 1}
+	rooms[1].delete()
+	sensor.rooms = [room.id for room in rooms]
+	with pytest.raises(ValidationError, match='does not exist'):
+		sensor.validate()
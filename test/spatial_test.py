@@ -0,0 +1,134 @@
+import mongomock
+import numpy as np
+import pytest
+from mongoengine import connect, disconnect
+
+from db.geometry import points_in_polygon
+from db.models import Room
+from db.spatial import RoomIndex
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def square(lon: float, lat: float, size: float = 1e-4) -> list:
+	return [[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size]]
+
+
+@pytest.fixture
+def rooms(room_factory):
+	"""Two rooms side by side on floor 1, an L-shaped room next to them and one room on floor 2."""
+	return {
+		'west': room_factory('west', borders=square(12.0, 56.0)),
+		'east': room_factory('east', borders=square(12.0001, 56.0)),
+		'corner': room_factory(
+			'corner',
+			borders=[
+				[12.0002, 56.0],
+				[12.0004, 56.0],
+				[12.0004, 56.0001],
+				[12.0003, 56.0001],
+				[12.0003, 56.0002],
+				[12.0002, 56.0002],
+			],
+		),
+		'upstairs': room_factory('upstairs', borders=square(12.0, 56.0), floor=2),
+	}
+
+
+def test_points_in_polygon():
+	"""Test the ray casting test on a square."""
+	polygon = np.array(square(0.0, 0.0, 1.0))
+	inside = points_in_polygon([0.5, 1.5, 0.5], [0.5, 0.5, -0.1], polygon)
+	assert list(inside) == [True, False, False]
+
+
+def test_locate_by_floor(rooms):
+	"""Test that points resolve to the room on the requested floor."""
+	index = RoomIndex.load()
+	assert len(index) == 4
+	assert index.locate(12.00005, 56.00005, floor=1) == rooms['west'].id
+	assert index.locate(12.00015, 56.00005, floor=1) == rooms['east'].id
+	assert index.locate(12.00005, 56.00005, floor=2) == rooms['upstairs'].id
+	assert index.locate(12.00015, 56.00005, floor=2) is None
+
+
+def test_locate_without_floor_prefers_lowest(rooms):
+	"""Test that a lookup without floor returns the lowest matching room."""
+	index = RoomIndex.load(cell_size=5e-5)
+	assert index.locate(12.00005, 56.00005) == rooms['west'].id
+
+
+def test_locate_respects_polygon_shape(rooms):
+	"""Test that points in the bounding box but outside the polygon are not matched."""
+	index = RoomIndex.load(cell_size=5e-5)
+	assert index.locate(12.00025, 56.00015, floor=1) == rooms['corner'].id
+	assert index.locate(12.00035, 56.00015, floor=1) is None
+
+
+def test_locate_many(rooms):
+	"""Test batch lookups across floors and cells."""
+	index = RoomIndex.load(cell_size=5e-5)
+	found = index.locate_many(
+		[12.00005, 12.00015, 12.00035, 12.00005, 13.0],
+		[56.00005, 56.00005, 56.00005, 56.00005, 57.0],
+		[1, 1, 1, 2, 1],
+	)
+	assert found == [
+		rooms['west'].id,
+		rooms['east'].id,
+		rooms['corner'].id,
+		rooms['upstairs'].id,
+		None,
+	]
+
+
+def test_load_with_filters(rooms):
+	"""Test that filters restrict which rooms are indexed."""
+	index = RoomIndex.load(floor=2)
+	assert len(index) == 1
+	assert index.locate(12.00005, 56.00005) == rooms['upstairs'].id
+
+
+def test_add_move_and_remove(rooms, room_factory):
+	"""Test that the index follows rooms being added, moved and removed."""
+	index = RoomIndex.load()
+	extra = room_factory('extra', borders=square(12.001, 56.001))
+	index.add(extra)
+	assert index.locate(12.00105, 56.00105, floor=1) == extra.id
+	extra.borders = square(12.002, 56.002)
+	extra.save()
+	index.add(extra)
+	assert index.locate(12.00105, 56.00105, floor=1) is None
+	assert index.locate(12.00205, 56.00205, floor=1) == extra.id
+	index.remove(extra.id)
+	index.remove(extra.id)
+	assert index.locate(12.00205, 56.00205, floor=1) is None
+	assert len(index) == 4
+
+
+def test_refresh_rereads_rooms(rooms):
+	"""Test that refresh picks up moved and deleted rooms from the database."""
+	index = RoomIndex.load()
+	Room.objects(_id=rooms['east'].id).update(borders=square(12.01, 56.01))
+	rooms['west'].delete()
+	index.refresh([rooms['east'].id, rooms['west'].id])
+	assert index.locate(12.00005, 56.00005, floor=1) is None
+	assert index.locate(12.01005, 56.01005, floor=1) == rooms['east'].id
+
+
+def test_empty_index():
+	"""Test that an empty database gives an index that finds nothing."""
+	index = RoomIndex.load()
+	assert index.locate(12.0, 56.0) is None
@@ -0,0 +1,64 @@
+import mongomock
+import pytest
+from mongoengine import connect, disconnect
+
+from db.models import Sensor
+from db.views import RoomView, SensorView
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_db():
+	"""Setup mock database before each test."""
+	disconnect()
+	connect(
+		db='mongoenginetest',
+		host='mongodb://localhost',
+		mongo_client_class=mongomock.MongoClient,
+		uuidRepresentation='standard',
+	)
+	yield
+	disconnect()
+
+
+def test_room_view_fields(room_factory):
+	"""Test that room views carry the projected fields of the stored room."""
+	room = room_factory('Lobby', floor=2, occupants=4)
+	(view,) = RoomView.find()
+	assert view.id == room.pk
+	assert (view.name, view.type, view.floor, view.occupants) == ('Lobby', 'OFFICE', 2, 4)
+	assert view.area == room.area
+	assert (view.longitude, view.latitude) == (12.34, 56.78)
+
+
+def test_room_view_filters_and_limit(room_factory):
+	"""Test mongoengine-style filters and limits on room views."""
+	room_factory('A', floor=1)
+	room_factory('B', floor=2, occupants=10)
+	room_factory('C', floor=2)
+	assert {view.name for view in RoomView.find(floor=2)} == {'B', 'C'}
+	assert [view.name for view in RoomView.find(occupants__gte=5)] == ['B']
+	assert len(RoomView.find(limit=2)) == 2
+
+
+def test_room_view_is_read_only(room_factory):
+	"""Test that views cannot be modified."""
+	room_factory('A')
+	(view,) = RoomView.find()
+	with pytest.raises(AttributeError):
+		view.name = 'B'
+	assert not hasattr(view, '__dict__')
+
+
+def test_sensor_view(room_factory):
+	"""Test that sensor views hold the ids of their rooms."""
+	first, second = room_factory('A'), room_factory('B')
+	sensor = Sensor(
+		name='Door',
+		rooms=[first, second],
+		latitude=56.78,
+		longitude=12.34,
+		is_vertical=False,
+	).save()
+	(view,) = SensorView.find(rooms=first)
+	assert view == SensorView(sensor.pk, 'Door', (first.pk, second.pk), 56.78, 12.34, False)
+	assert SensorView.find(name='Other') == []